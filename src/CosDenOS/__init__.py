@@ -3,13 +3,43 @@ CosDenOS Python package initializer.
 This file allows imports like:
 
     import CosDenOS
+    from CosDenOS import CosDenOS
     from CosDenOS.api import cosden_router
 
-and ensures the package is recognized during validation.
+Public names are resolved lazily (PEP 562), so `import CosDenOS` does not
+pull in FastAPI, build the app, load the catalog or touch StegCore. Batch
+jobs that only need the engine pay only for the engine.
 """
 
-# Optional: expose commonly used components
-try:
-    from .api import cosden_router  # if api.py exists
-except Exception:
-    pass
+from __future__ import annotations
+
+import importlib
+from typing import Any, List
+
+# Public name -> submodule that defines it.
+_LAZY_ATTRS = {
+    "CosDenOS": ".engine",
+    "CosmeticPlannerAgent": ".ai_planner",
+    "CosmeticUserProfile": ".user_profile",
+    "DigitalTwin": ".twin_render",
+    "SmilePreviewer": ".ar_preview",
+    "TwinRenderer": ".twin_render",
+    "app": ".api",
+    "create_app": ".api",
+    "cosden_router": ".api",
+}
+
+__all__ = sorted(_LAZY_ATTRS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
@@ -5,9 +5,11 @@ from typing import Any, Dict, Optional
 
 from .age import AgeProfile, AgeGroup
 from .engine import CosDenOS
+from .event_schedule import EventSchedule
 from .goals import CosmeticGoal, CosmeticGoalType
 from .llm_client import LLMClient
 from .models import ProductStack, SimulationResult
+from .tracing import traced
 from .user_profile import CosmeticUserProfile
 
 
@@ -19,6 +21,7 @@ class CosmeticPlannerAgent:
     - Interpret a user's cosmetic intent (natural language) into a CosmeticGoal
     - Ask CosDenOS for a recommended product stack
     - Simulate the cosmetic effect on the user's Digital Twin (if present)
+    - For an event, schedule timed applications up to the event
     - Return a structured, cosmetic-only plan
 
     This agent is designed so that:
@@ -71,21 +74,33 @@ class CosmeticPlannerAgent:
             stack=stack,
             age_profile=user.age_profile,
             age_years=user.age_years,
+            baseline=user.baseline,
         )
 
-        # 4) Package into a structured response
+        # 4) Event countdown: when to apply what before the event
+        schedule = None
+        if goal.target_event_hours is not None:
+            schedule = self.engine.schedule_for_event(
+                goal=goal,
+                age_years=user.age_years,
+                sensitivity_flag=user.sensitivity_flag,
+            )
+
+        # 5) Package into a structured response
         return self._build_plan_response(
             user=user,
             goal=goal,
             stack=stack,
             sim_result=sim_result,
             raw_request=request_text,
+            schedule=schedule,
         )
 
     # -----------------------------
     # Internal helpers
     # -----------------------------
 
+    @traced("planner.interpret_goal")
     def _interpret_goal(
         self,
         user: CosmeticUserProfile,
@@ -125,6 +140,9 @@ class CosmeticPlannerAgent:
                 tone = "warm"
             elif "neutral" in text or "porcelain" in text:
                 tone = "neutral"
+            elif user.baseline is not None and user.baseline.tone == "warm":
+                # Measured warm cast and no stated preference: counter it.
+                tone = "cool"
 
         # Event time hint from text, if not already set
         event_hours = user.event_time_hours
@@ -144,6 +162,7 @@ class CosmeticPlannerAgent:
             target_event_hours=event_hours,
         )
 
+    @traced("planner.build_plan_response")
     def _build_plan_response(
         self,
         user: CosmeticUserProfile,
@@ -151,6 +170,7 @@ class CosmeticPlannerAgent:
         stack: ProductStack,
         sim_result: SimulationResult,
         raw_request: str,
+        schedule: Optional[EventSchedule] = None,
     ) -> Dict[str, Any]:
         """
         Build a JSON-friendly plan object for use by other StegVerse pieces.
@@ -166,6 +186,7 @@ class CosmeticPlannerAgent:
                 "sensitivity_flag": user.sensitivity_flag,
                 "event_time_hours": user.event_time_hours,
                 "notes": user.notes,
+                "baseline": user.baseline.to_dict() if user.baseline else None,
             },
             "interpreted_goal": {
                 "goal_type": goal.goal_type.value,
@@ -187,6 +208,7 @@ class CosmeticPlannerAgent:
                 ],
             },
             "simulation": sim_result.to_dict(),
+            "event_schedule": schedule.to_dict() if schedule is not None else None,
             "legal_disclaimer": (
                 "This plan is cosmetic-only. It does not diagnose, treat, "
                 "or prevent any disease or condition. For medical or dental "
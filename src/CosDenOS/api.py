@@ -1,14 +1,43 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import hmac
+import json
 import os
+import threading
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+import anyio
 
-from . import CosDenOS
+from fastapi import APIRouter, Body, Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+
+from .engine import CosDenOS
 from .ai_planner import CosmeticPlannerAgent
-from .user_profile import CosmeticUserProfile
+from .catalog_payload import CatalogPayloadCache, etag_matches
+from .catalog_snapshot import CatalogFileWatcher, load_catalog_file
+from .models import ProductSeries
+from .render_cache import RenderCache
+from .telemetry import DeviceInfo, TelemetryFormatError, TelemetryHub, UnknownDeviceError
+from .twin_store import TwinStore, UnknownTwinError
+from .user_profile import CosmeticUserProfile, ShadeBaseline
 from .errors import CosDenError
 from .api_models import (
+    BatchItemResult,
+    BatchResponse,
+    PlanBatchRequest,
+    SimulateBatchRequest,
+    CatalogReloadRequest,
+    DeviceRegistration,
+    TelemetryIngestResponse,
+    CatalogReloadResponse,
     PlanRequest,
     PlanResponse,
     SimulateRequest,
@@ -17,10 +46,34 @@ from .api_models import (
     SimulationEffect,
     InterpretedGoal,
 )
-from .logging_utils import log_event
+from .logging_utils import (
+    log_event,
+    log_stats,
+    start_background_logging,
+    stop_background_logging,
+)
+from .metrics import (
+    REGISTRY,
+    LoadSampler,
+    MetricsMiddleware,
+    label_set,
+    record_cache_lookup,
+    record_error,
+    record_stage,
+)
+from .tracing import (
+    TracingMiddleware,
+    add_stage_timer,
+    configure_tracing,
+    remove_span_exporter,
+    remove_stage_timer,
+    span,
+)
 from .stegcore_integration import (
     initialize_stegcore_integration,
     send_stegcore_heartbeat,
+    shutdown_stegcore_integration,
+    stegcore_stats,
 )
 
 
@@ -32,44 +85,202 @@ COSDEN_NODE_NAME = os.getenv("COSDEN_NODE_NAME", "CosDenOS")
 COSDEN_VERSION = os.getenv("COSDEN_VERSION", "0.1.0")
 COSDEN_PUBLIC_ENDPOINT = os.getenv("COSDEN_PUBLIC_ENDPOINT", "")
 
+# If set, attach to a shared memory-mapped catalog snapshot published in this
+# directory (see shared_catalog.py) instead of loading a per-worker copy.
+COSDEN_SHARED_CATALOG_DIR = os.getenv("COSDEN_SHARED_CATALOG_DIR", "")
+
+# If set, load the catalog from this JSON file and hot-reload it on change.
+COSDEN_CATALOG_FILE = os.getenv("COSDEN_CATALOG_FILE", "")
+
+# Poll interval for catalog hot reload (file or shared directory); 0 disables.
+COSDEN_CATALOG_WATCH_SECONDS = float(os.getenv("COSDEN_CATALOG_WATCH_SECONDS", "2.0"))
+
+# Shared secret for /admin endpoints; admin endpoints are disabled if unset.
+COSDEN_ADMIN_TOKEN = os.getenv("COSDEN_ADMIN_TOKEN", "")
+
+# Write logs from a background batching thread (set to 0 for synchronous writes).
+COSDEN_LOG_ASYNC = os.getenv("COSDEN_LOG_ASYNC", "1") != "0"
+
+# Expose /metrics and record per-stage latencies (set to 0 to disable).
+COSDEN_METRICS = os.getenv("COSDEN_METRICS", "1") != "0"
+
+# Upper bound on items in one /simulate/batch or /plan/batch request.
+COSDEN_BATCH_MAX_ITEMS = int(os.getenv("COSDEN_BATCH_MAX_ITEMS", "1000"))
+
+# Upper bound on NDJSON lines being simulated concurrently per stream.
+COSDEN_STREAM_MAX_IN_FLIGHT = int(os.getenv("COSDEN_STREAM_MAX_IN_FLIGHT", "32"))
+# Longest NDJSON line /simulate/stream accepts; longer lines get a 413 line.
+COSDEN_STREAM_MAX_LINE_BYTES = int(os.getenv("COSDEN_STREAM_MAX_LINE_BYTES", str(64 << 10)))
+
+# Multi-twin store: directory of <twin_id>.cdtwin files and memory budget.
+COSDEN_TWIN_DIR = os.getenv("COSDEN_TWIN_DIR", "")
+COSDEN_TWIN_MEMORY_MB = int(os.getenv("COSDEN_TWIN_MEMORY_MB", "1024"))
+# LOD pyramid built for each twin at load (max rows per level, comma separated).
+COSDEN_TWIN_LOD_LEVELS = os.getenv("COSDEN_TWIN_LOD_LEVELS", "4096,65536")
+
+# Rendered twin preview cache (only with a twin store); optional disk spill.
+COSDEN_RENDER_CACHE_MB = int(os.getenv("COSDEN_RENDER_CACHE_MB", "256"))
+COSDEN_RENDER_SPILL_DIR = os.getenv("COSDEN_RENDER_SPILL_DIR", "")
+
+# Device telemetry: where closed aggregate windows are written ("" = memory
+# only), per-device ring size, window width and consumer interval.
+COSDEN_TELEMETRY_DIR = os.getenv("COSDEN_TELEMETRY_DIR", "")
+COSDEN_TELEMETRY_RING = int(os.getenv("COSDEN_TELEMETRY_RING", "65536"))
+COSDEN_TELEMETRY_WINDOW_SECONDS = int(os.getenv("COSDEN_TELEMETRY_WINDOW_SECONDS", "60"))
+COSDEN_TELEMETRY_FLUSH_SECONDS = float(os.getenv("COSDEN_TELEMETRY_FLUSH_SECONDS", "1.0"))
+# Largest accepted telemetry upload (bytes); larger bodies get a 413.
+COSDEN_TELEMETRY_MAX_BYTES = int(os.getenv("COSDEN_TELEMETRY_MAX_BYTES", str(1 << 20)))
+
+# Periodic StegCore heartbeats (in addition to one per /health); 0 disables.
+COSDEN_STEGCORE_HEARTBEAT_SECONDS = float(os.getenv("COSDEN_STEGCORE_HEARTBEAT_SECONDS", "30"))
+
 
 # -------------------------
-# App + engine initialization
+# Engine services (built once per app, at startup)
 # -------------------------
 
-app = FastAPI(
-    title="CosDenOS Cosmetic Engine API",
-    version=COSDEN_VERSION,
-    description=(
-        "CosDenOS cosmetic-only engine + StegVerse AI Cosmetic Planner.\n\n"
-        "Important: This API is cosmetic-only and does not diagnose, treat, "
-        "or prevent any disease or condition."
-    ),
-)
+@dataclass
+class CosDenServices:
+    """
+    Everything the endpoints need, built by the app lifespan hook rather
+    than as an import side effect of this module.
+    """
+    engine: CosDenOS
+    planner: CosmeticPlannerAgent
+    catalog_payloads: CatalogPayloadCache
+    telemetry: TelemetryHub
+    catalog_watcher: Optional[CatalogFileWatcher] = None
 
-_engine = CosDenOS()
-_engine.load_default_catalog()
 
-# Planner with no external LLM client yet (rule-based interpretation).
-_planner = CosmeticPlannerAgent(engine=_engine, llm_client=None)
+_services_lock = threading.Lock()
 
-# Initialize StegCore integration (no-op if stegcore is not installed).
-initialize_stegcore_integration(
-    node_name=COSDEN_NODE_NAME,
-    version=COSDEN_VERSION,
-    endpoint=COSDEN_PUBLIC_ENDPOINT or None,
-)
+
+def build_services() -> CosDenServices:
+    engine = CosDenOS()
+
+    # Serialized /catalog bodies; registered as a catalog hook so they are
+    # rebuilt before each new catalog snapshot is swapped in.
+    catalog_payloads = CatalogPayloadCache(engine)
+
+    watcher: Optional[CatalogFileWatcher] = None
+    if COSDEN_CATALOG_FILE:
+        engine.set_catalog(load_catalog_file(COSDEN_CATALOG_FILE), source=COSDEN_CATALOG_FILE)
+        watcher = CatalogFileWatcher(engine, COSDEN_CATALOG_FILE, COSDEN_CATALOG_WATCH_SECONDS)
+    elif COSDEN_SHARED_CATALOG_DIR:
+        engine.attach_shared_catalog(COSDEN_SHARED_CATALOG_DIR)
+        watcher = CatalogFileWatcher(engine, None, COSDEN_CATALOG_WATCH_SECONDS)
+    else:
+        engine.load_default_catalog()
+
+    if COSDEN_TWIN_DIR:
+        engine.attach_twin_store(
+            TwinStore(
+                COSDEN_TWIN_DIR,
+                memory_budget_bytes=COSDEN_TWIN_MEMORY_MB << 20,
+                lod_levels=[int(n) for n in COSDEN_TWIN_LOD_LEVELS.split(",") if n.strip()],
+            )
+        )
+        if COSDEN_RENDER_CACHE_MB > 0:
+            engine.attach_render_cache(
+                RenderCache(
+                    memory_budget_bytes=COSDEN_RENDER_CACHE_MB << 20,
+                    spill_dir=COSDEN_RENDER_SPILL_DIR or None,
+                )
+            )
+
+    telemetry = TelemetryHub(
+        engine.get_device,
+        directory=COSDEN_TELEMETRY_DIR or None,
+        ring_capacity=COSDEN_TELEMETRY_RING,
+        window_seconds=COSDEN_TELEMETRY_WINDOW_SECONDS,
+    )
+
+    # Planner with no external LLM client yet (rule-based interpretation).
+    planner = CosmeticPlannerAgent(engine=engine, llm_client=None)
+
+    # Initialize StegCore integration (no-op if stegcore is not installed).
+    # Publishing runs on a worker thread; heartbeats carry live load figures.
+    initialize_stegcore_integration(
+        node_name=COSDEN_NODE_NAME,
+        version=COSDEN_VERSION,
+        endpoint=COSDEN_PUBLIC_ENDPOINT or None,
+        load_fn=LoadSampler(REGISTRY).sample if COSDEN_METRICS else None,
+        heartbeat_interval_seconds=COSDEN_STEGCORE_HEARTBEAT_SECONDS,
+    )
+
+    return CosDenServices(
+        engine=engine,
+        planner=planner,
+        catalog_payloads=catalog_payloads,
+        telemetry=telemetry,
+        catalog_watcher=watcher,
+    )
+
+
+def get_services(app: FastAPI) -> CosDenServices:
+    """
+    Return the app's services, building them on first use if the lifespan
+    hook has not run (e.g. a TestClient used outside a `with` block).
+    """
+    services = getattr(app.state, "services", None)
+    if services is None:
+        with _services_lock:
+            services = getattr(app.state, "services", None)
+            if services is None:
+                services = build_services()
+                app.state.services = services
+    return services
+
+
+def _services(request: Request) -> CosDenServices:
+    return get_services(request.app)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if COSDEN_LOG_ASYNC:
+        start_background_logging()
+    # Span exporter from COSDEN_TRACING (None = tracing off, near-zero cost).
+    span_exporter = configure_tracing()
+    if COSDEN_METRICS:
+        # Stage timings only; spans are created just when tracing is on.
+        add_stage_timer(record_stage)
+    services = await run_in_threadpool(get_services, app)
+    watcher = services.catalog_watcher
+    if watcher is not None and COSDEN_CATALOG_WATCH_SECONDS > 0:
+        watcher.start()
+    telemetry_task = asyncio.create_task(
+        services.telemetry.run(COSDEN_TELEMETRY_FLUSH_SECONDS), name="cosden-telemetry"
+    )
+    try:
+        yield
+    finally:
+        telemetry_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await telemetry_task
+        if watcher is not None:
+            watcher.stop()
+        shutdown_stegcore_integration()
+        if span_exporter is not None:
+            remove_span_exporter(span_exporter)
+        if COSDEN_METRICS:
+            remove_stage_timer(record_stage)
+        if COSDEN_LOG_ASYNC:
+            stop_background_logging()
+
+
+cosden_router = APIRouter()
 
 
 # -------------------------
 # Health check
 # -------------------------
 
-@app.get("/health")
-def health() -> dict:
+@cosden_router.get("/health")
+def health(services: CosDenServices = Depends(_services)) -> dict:
     """
     Simple health endpoint to verify the service is up.
-    Also sends a heartbeat to StegCore if integration is available.
+    Also queues a heartbeat to StegCore if integration is available.
     """
     log_event("health_check", extra={"endpoint": "/health"})
 
@@ -81,69 +292,260 @@ def health() -> dict:
 
     return {
         "status": "ok",
-        "engine_twin_loaded": _engine.twin_loaded,
+        "engine_twin_loaded": services.engine.twin_loaded,
         "cosmetic_only": True,
         "node": COSDEN_NODE_NAME,
         "version": COSDEN_VERSION,
+        "log_queue": log_stats(),
+        "stegcore": stegcore_stats(),
+        "twins": services.engine.twin_store.stats() if services.engine.twin_store else None,
+        "telemetry": services.telemetry.stats(),
     }
 
 
 # -------------------------
-# /plan endpoint
+# /catalog endpoint
 # -------------------------
 
-@app.post("/plan", response_model=PlanResponse)
-def plan_cosmetic_stack(payload: PlanRequest):
+@cosden_router.get("/catalog")
+def get_catalog(
+    request: Request,
+    series: Optional[str] = Query(None, description="Product series, e.g. 'A'"),
+    age_years: Optional[int] = Query(
+        None, ge=1, description="Only products allowed for this age"
+    ),
+    services: CosDenServices = Depends(_services),
+) -> Response:
     """
-    High-level AI Cosmetic Planner endpoint.
+    Product catalog, pre-serialized once per catalog version.
 
-    - Interprets a user's natural language request
-    - Recommends a cosmetic stack for that user
-    - Simulates the cosmetic effect
+    Supports conditional GET (If-None-Match → 304) and serves precomputed
+    gzip / brotli variants according to Accept-Encoding.
+    """
+    if series is not None:
+        try:
+            series = ProductSeries(series.upper()).value
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown product series: {series}"
+            ) from exc
+
+    payload = services.catalog_payloads.get(series=series, age_years=age_years)
+    body, encoding = payload.select(request.headers.get("accept-encoding"))
+
+    headers = {
+        "ETag": payload.etag(encoding),
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+
+    if payload.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# -------------------------
+# /admin/catalog/reload endpoint
+# -------------------------
+
+def _require_admin(x_cosden_admin_token: Optional[str] = Header(None)) -> None:
+    if not COSDEN_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_cosden_admin_token or not hmac.compare_digest(
+        x_cosden_admin_token, COSDEN_ADMIN_TOKEN
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@cosden_router.post(
+    "/admin/catalog/reload",
+    response_model=CatalogReloadResponse,
+    dependencies=[Depends(_require_admin)],
+)
+def reload_catalog(
+    body: Optional[Dict[str, Any]] = Body(None),
+    services: CosDenServices = Depends(_services),
+):
+    """
+    Hot-swap the catalog without a restart.
+
+    - With a `products` list in the body, installs exactly those products.
+    - Otherwise reloads from the configured source (catalog file, shared
+      snapshot directory, or the built-in default catalog).
+
+    The new snapshot (and its derived indexes / serialized payloads) is
+    built on this request's worker thread and swapped in atomically;
+    requests already in flight finish on the previous version.
     """
+    engine = services.engine
+    # Validated here rather than by FastAPI so a bad catalog is a 400.
+    try:
+        payload = CatalogReloadRequest.model_validate(body) if body is not None else None
+    except ValidationError as exc:
+        errors = exc.errors(include_url=False, include_context=False, include_input=False)
+        raise HTTPException(status_code=400, detail=errors) from exc
+
+    try:
+        if payload is not None and payload.products is not None:
+            engine.set_catalog(payload.catalog(), source="admin")
+        elif COSDEN_CATALOG_FILE:
+            engine.set_catalog(load_catalog_file(COSDEN_CATALOG_FILE), source=COSDEN_CATALOG_FILE)
+        elif COSDEN_SHARED_CATALOG_DIR:
+            engine.refresh_shared_catalog()
+        else:
+            engine.load_default_catalog()
+    except (KeyError, TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid catalog: {exc}") from exc
+
+    snapshot = engine.catalog_snapshot
     log_event(
-        "plan_request",
+        "catalog_reloaded",
         extra={
-            "endpoint": "/plan",
-            "age_years": payload.user.age_years,
+            "endpoint": "/admin/catalog/reload",
+            "catalog_version": snapshot.version,
+            "source": snapshot.source,
         },
     )
+    return CatalogReloadResponse(
+        catalog_version=snapshot.version,
+        product_count=len(snapshot.products),
+        source=snapshot.source,
+    )
+
 
+# -------------------------
+# Devices and telemetry
+# -------------------------
+
+@cosden_router.put(
+    "/admin/devices/{device_id}",
+    dependencies=[Depends(_require_admin)],
+)
+def register_device(
+    device_id: str,
+    payload: DeviceRegistration,
+    services: CosDenServices = Depends(_services),
+) -> dict:
+    """
+    Register (or re-register) a device so it may upload telemetry.
+    """
     try:
-        user_info = payload.user
-
-        user_profile = CosmeticUserProfile.from_age(
-            age_years=user_info.age_years,
-            tone_preference=user_info.tone_preference,
-            sensitivity_flag=user_info.sensitivity_flag,
-            event_time_hours=user_info.event_time_hours,
-            notes=user_info.notes,
-        )
+        device = DeviceInfo(device_id=device_id, model=payload.model)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    services.engine.register_device(device_id, device)
+    log_event("device_registered", extra={"device_id": device_id, "model": device.model})
+    return {"device_id": device_id, "model": device.model}
 
-        plan_dict = _planner.plan_for_request(
-            user=user_profile,
-            request_text=payload.request_text,
-        )
 
-        # Extract and normalize simulation section into pydantic model
-        sim = plan_dict["simulation"]
-        agg = sim["aggregated_effect"]
-
-        simulation = SimulationData(
-            stack_codes=sim["stack_codes"],
-            aggregated_effect=SimulationEffect(
-                brightness_delta=agg["brightness_delta"],
-                gloss_delta=agg["gloss_delta"],
-                tone_shift=agg["tone_shift"],
-                opalescence_delta=agg["opalescence_delta"],
-            ),
-            notes=sim["notes"],
-            cosmetic_only=sim["cosmetic_only"],
-        )
+async def _read_capped(request: Request, limit: int) -> bytes:
+    too_large = HTTPException(status_code=413, detail=f"Upload too large (limit {limit} bytes)")
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+
+@cosden_router.post(
+    "/devices/{device_id}/telemetry",
+    response_model=TelemetryIngestResponse,
+    status_code=202,
+)
+async def ingest_telemetry(
+    device_id: str,
+    request: Request,
+    services: CosDenServices = Depends(_services),
+) -> TelemetryIngestResponse:
+    """
+    Accept a burst of session events: binary frames with
+    Content-Type application/octet-stream, NDJSON otherwise (see
+    CosDenOS.telemetry). Events are aggregated asynchronously.
+    """
+    body = await _read_capped(request, COSDEN_TELEMETRY_MAX_BYTES)
+    binary = request.headers.get("content-type", "").startswith("application/octet-stream")
+    try:
+        result = await run_in_threadpool(services.telemetry.ingest, device_id, body, binary)
+    except UnknownDeviceError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except TelemetryFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return TelemetryIngestResponse(
+        device_id=device_id,
+        accepted=result.accepted,
+        rejected=result.rejected,
+        dropped=result.dropped,
+    )
+
+
+@cosden_router.get("/devices/{device_id}/telemetry")
+def telemetry_summary(
+    device_id: str,
+    services: CosDenServices = Depends(_services),
+) -> dict:
+    try:
+        return services.telemetry.summary(device_id)
+    except UnknownDeviceError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+# -------------------------
+# /plan endpoint
+# -------------------------
+
+def _run_plan(planner: CosmeticPlannerAgent, payload: PlanRequest) -> PlanResponse:
+    """
+    Per-item planning path shared by /plan and /plan/batch.
+
+    Raises CosDenError for unknown codes / age-gated products.
+    """
+    user_info = payload.user
+
+    user_profile = CosmeticUserProfile.from_age(
+        age_years=user_info.age_years,
+        tone_preference=user_info.tone_preference,
+        sensitivity_flag=user_info.sensitivity_flag,
+        event_time_hours=user_info.event_time_hours,
+        notes=user_info.notes,
+        baseline=(
+            ShadeBaseline(**user_info.baseline.model_dump()) if user_info.baseline else None
+        ),
+    )
+
+    plan_dict = planner.plan_for_request(
+        user=user_profile,
+        request_text=payload.request_text,
+    )
 
-        goal = plan_dict["interpreted_goal"]
+    # Extract and normalize simulation section into pydantic model
+    sim = plan_dict["simulation"]
+    agg = sim["aggregated_effect"]
 
-        return PlanResponse(
+    simulation = SimulationData(
+        stack_codes=sim["stack_codes"],
+        aggregated_effect=SimulationEffect(
+            brightness_delta=agg["brightness_delta"],
+            gloss_delta=agg["gloss_delta"],
+            tone_shift=agg["tone_shift"],
+            opalescence_delta=agg["opalescence_delta"],
+        ),
+        notes=sim["notes"],
+        cosmetic_only=sim["cosmetic_only"],
+        baseline_lightness=sim["baseline_lightness"],
+        projected_lightness=sim["projected_lightness"],
+    )
+
+    goal = plan_dict["interpreted_goal"]
+
+    with span("api.build_response"):
+        response = PlanResponse(
             version=plan_dict["version"],
             cosmetic_only=plan_dict["cosmetic_only"],
             raw_request=plan_dict["raw_request"],
@@ -156,11 +558,44 @@ def plan_cosmetic_stack(payload: PlanRequest):
             ),
             recommended_stack=plan_dict["recommended_stack"],
             simulation=simulation,
+            event_schedule=plan_dict["event_schedule"],
             legal_disclaimer=plan_dict["legal_disclaimer"],
         )
 
+    return response
+
+
+@cosden_router.post("/plan", response_model=PlanResponse)
+def plan_cosmetic_stack(
+    payload: PlanRequest,
+    services: CosDenServices = Depends(_services),
+):
+    """
+    High-level AI Cosmetic Planner endpoint.
+
+    - Interprets a user's natural language request
+    - Recommends a cosmetic stack for that user
+    - Simulates the cosmetic effect
+    """
+    log_event(
+        "plan_request",
+        extra={
+            "endpoint": "/plan",
+            "age_years": payload.user.age_years,
+        },
+    )
+
+    try:
+        response = _run_plan(services.planner, payload)
+
+        # Serialize here (the model is already validated) so the cost shows
+        # up as its own span instead of inside FastAPI's response handling.
+        with span("api.serialize"):
+            return Response(content=response.model_dump_json(), media_type="application/json")
+
     except CosDenError as exc:
         # Known CosDenOS errors → 400-series to the caller
+        record_error("/plan", exc)
         log_event(
             "plan_request_error",
             level="WARN",
@@ -173,6 +608,7 @@ def plan_cosmetic_stack(payload: PlanRequest):
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     except Exception as exc:  # pragma: no cover - generic guardrail
+        record_error("/plan", exc)
         log_event(
             "plan_request_error_internal",
             level="ERROR",
@@ -188,12 +624,101 @@ def plan_cosmetic_stack(payload: PlanRequest):
 # /simulate endpoint
 # -------------------------
 
-@app.post("/simulate", response_model=SimulateResponse)
-def simulate_stack(payload: SimulateRequest):
+def _run_simulation(engine: CosDenOS, payload: SimulateRequest) -> SimulateResponse:
+    """
+    Per-item simulation path shared by /simulate and /simulate/stream.
+
+    Raises CosDenError for unknown codes / age-gated products.
+    """
+    user_info = payload.user
+
+    user_profile = CosmeticUserProfile.from_age(
+        age_years=user_info.age_years,
+        tone_preference=user_info.tone_preference,
+        sensitivity_flag=user_info.sensitivity_flag,
+        event_time_hours=user_info.event_time_hours,
+        notes=user_info.notes,
+        baseline=(
+            ShadeBaseline(**user_info.baseline.model_dump()) if user_info.baseline else None
+        ),
+    )
+
+    # Build stack from product codes
+    stack = engine.build_stack(payload.codes)
+
+    # Simulate cosmetic-only effect
+    sim_result = engine.simulate_stack(
+        stack=stack,
+        age_profile=user_profile.age_profile,
+        age_years=user_profile.age_years,
+        twin_id=payload.twin_id,
+        baseline=user_profile.baseline,
+    )
+
+    agg = sim_result.aggregated_effect
+
+    simulation = SimulationData(
+        stack_codes=sim_result.stack_codes,
+        aggregated_effect=SimulationEffect(
+            brightness_delta=agg.brightness_delta,
+            gloss_delta=agg.gloss_delta,
+            tone_shift=agg.tone_shift,
+            opalescence_delta=agg.opalescence_delta,
+        ),
+        notes=sim_result.notes,
+        cosmetic_only=sim_result.cosmetic_only,
+        twin_id=sim_result.twin_id,
+        baseline_lightness=sim_result.baseline_lightness,
+        projected_lightness=sim_result.projected_lightness,
+    )
+
+    return SimulateResponse(
+        cosmetic_only=True,
+        simulation=simulation,
+    )
+
+
+def _simulate_etag(catalog_digest: str, payload: SimulateRequest, engine: CosDenOS) -> str:
+    """
+    Strong ETag for a /simulate result: it depends on the request, the
+    catalog content and the twin state behind the notes (the targeted
+    twin's version, or whether a twin is attached).
+    """
+    twin_version: Optional[int] = None
+    if payload.twin_id is not None and engine.twin_store is not None:
+        try:
+            twin_version = engine.twin_store.peek_version(payload.twin_id)
+        except UnknownTwinError:
+            pass  # the simulation itself reports it
+    twin_state = f"{twin_version}:{engine.twin_loaded}"
+    key = f"{catalog_digest}:{twin_state}:{payload.model_dump_json()}".encode()
+    return f'"{hashlib.sha256(key).hexdigest()[:32]}"'
+
+
+@cosden_router.post("/simulate", response_model=SimulateResponse)
+def simulate_stack(
+    payload: SimulateRequest,
+    request: Request,
+    services: CosDenServices = Depends(_services),
+):
     """
     Lower-level endpoint: directly simulate a given product code stack
     for a user, without natural-language planning.
+
+    Responses carry an ETag and X-CosDen-Catalog-Version. Simulation is
+    side-effect free, so a matching If-None-Match is answered with 304
+    without simulating again (used by client-side caches to revalidate).
     """
+    catalog_digest = services.catalog_payloads.catalog_digest
+    headers = {
+        "ETag": _simulate_etag(catalog_digest, payload, services.engine),
+        "X-CosDen-Catalog-Version": catalog_digest,
+    }
+    revalidated = etag_matches(request.headers.get("if-none-match"), (headers["ETag"],))
+    record_cache_lookup("simulate_etag", revalidated)
+    if revalidated:
+        return Response(status_code=304, headers=headers)
+
     log_event(
         "simulate_request",
         extra={
@@ -204,46 +729,16 @@ def simulate_stack(payload: SimulateRequest):
     )
 
     try:
-        user_info = payload.user
-
-        user_profile = CosmeticUserProfile.from_age(
-            age_years=user_info.age_years,
-            tone_preference=user_info.tone_preference,
-            sensitivity_flag=user_info.sensitivity_flag,
-            event_time_hours=user_info.event_time_hours,
-            notes=user_info.notes,
-        )
-
-        # Build stack from product codes
-        stack = _engine.build_stack(payload.codes)
-
-        # Simulate cosmetic-only effect
-        sim_result = _engine.simulate_stack(
-            stack=stack,
-            age_profile=user_profile.age_profile,
-            age_years=user_profile.age_years,
-        )
-
-        agg = sim_result.aggregated_effect
-
-        simulation = SimulationData(
-            stack_codes=sim_result.stack_codes,
-            aggregated_effect=SimulationEffect(
-                brightness_delta=agg.brightness_delta,
-                gloss_delta=agg.gloss_delta,
-                tone_shift=agg.tone_shift,
-                opalescence_delta=agg.opalescence_delta,
-            ),
-            notes=sim_result.notes,
-            cosmetic_only=sim_result.cosmetic_only,
-        )
-
-        return SimulateResponse(
-            cosmetic_only=True,
-            simulation=simulation,
-        )
+        response = _run_simulation(services.engine, payload)
+        with span("api.serialize"):
+            return Response(
+                content=response.model_dump_json(),
+                media_type="application/json",
+                headers=headers,
+            )
 
     except CosDenError as exc:
+        record_error("/simulate", exc)
         log_event(
             "simulate_request_error",
             level="WARN",
@@ -257,6 +752,7 @@ def simulate_stack(payload: SimulateRequest):
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     except Exception as exc:  # pragma: no cover
+        record_error("/simulate", exc)
         log_event(
             "simulate_request_error_internal",
             level="ERROR",
@@ -266,3 +762,377 @@ def simulate_stack(payload: SimulateRequest):
             },
         )
         raise HTTPException(status_code=500, detail="Internal server error") from exc
+
+
+# -------------------------
+# /simulate/batch and /plan/batch endpoints
+# -------------------------
+
+def _run_batch(
+    endpoint: str,
+    items: List[Any],
+    run_one: Callable[[Any], Any],
+) -> Response:
+    if len(items) > COSDEN_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(items)} > {COSDEN_BATCH_MAX_ITEMS} items",
+        )
+
+    log_event("batch_request", extra={"endpoint": endpoint, "items": len(items)})
+
+    results: List[BatchItemResult] = []
+    for item in items:
+        try:
+            results.append(BatchItemResult(status=200, body=run_one(item).model_dump()))
+        except CosDenError as exc:
+            record_error(endpoint, exc)
+            results.append(BatchItemResult(status=400, detail=str(exc)))
+
+    with span("api.serialize"):
+        return Response(
+            content=BatchResponse(results=results).model_dump_json(),
+            media_type="application/json",
+        )
+
+
+@cosden_router.post("/simulate/batch", response_model=BatchResponse)
+def simulate_batch(
+    payload: SimulateBatchRequest,
+    services: CosDenServices = Depends(_services),
+):
+    """
+    Many /simulate requests in one call; results are returned in order,
+    each with its own status (200, or 400 with a detail).
+    """
+    return _run_batch(
+        "/simulate/batch",
+        payload.items,
+        lambda item: _run_simulation(services.engine, item),
+    )
+
+
+@cosden_router.post("/plan/batch", response_model=BatchResponse)
+def plan_batch(
+    payload: PlanBatchRequest,
+    services: CosDenServices = Depends(_services),
+):
+    """
+    Many /plan requests in one call; results are returned in order,
+    each with its own status (200, or 400 with a detail).
+    """
+    return _run_batch(
+        "/plan/batch",
+        payload.items,
+        lambda item: _run_plan(services.planner, item),
+    )
+
+
+# -------------------------
+# /simulate/stream endpoint (NDJSON in, NDJSON out)
+# -------------------------
+
+async def _iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int,
+) -> AsyncIterator[Optional[bytes]]:
+    """
+    Re-frame an arbitrary chunked byte stream into NDJSON lines.
+
+    Lines longer than `max_line_bytes` are dropped as they arrive and
+    yielded as None, so one runaway line cannot grow the buffer without
+    bound. Only the new chunk is scanned for newlines.
+    """
+    buffer = bytearray()
+    overflow = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            if not overflow and len(buffer) + end - start <= max_line_bytes:
+                buffer += chunk[start:end]
+                yield bytes(buffer)
+            else:
+                yield None
+            buffer.clear()
+            overflow = False
+            start = end + 1
+        if not overflow:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_bytes:
+                buffer.clear()
+                overflow = True
+    if overflow:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+def _ndjson_record(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record).encode() + b"\n"
+
+
+def _simulate_ndjson_line(engine: CosDenOS, line_no: int, line: bytes) -> bytes:
+    """
+    Simulate one NDJSON line; errors are reported inline so that one bad
+    row does not abort the rest of the upload.
+    """
+    try:
+        payload = SimulateRequest.model_validate_json(line)
+    except ValidationError as exc:
+        return _ndjson_record({
+            "line": line_no,
+            "status": 422,
+            "detail": exc.errors(
+                include_url=False,
+                include_context=False,
+                include_input=False,
+            ),
+        })
+
+    try:
+        response = _run_simulation(engine, payload)
+        record = {"line": line_no, "status": 200, "result": response.model_dump()}
+    except CosDenError as exc:
+        record_error("/simulate/stream", exc)
+        return _ndjson_record({"line": line_no, "status": 400, "detail": str(exc)})
+    except Exception as exc:
+        record_error("/simulate/stream", exc)
+        log_event(
+            "simulate_stream_error_internal",
+            level="ERROR",
+            extra={"endpoint": "/simulate/stream", "line": line_no, "error": str(exc)},
+        )
+        return _ndjson_record(
+            {"line": line_no, "status": 500, "detail": "Internal server error"}
+        )
+    return _ndjson_record(record)
+
+
+async def _stream_simulations(
+    engine: CosDenOS,
+    chunks: AsyncIterator[bytes],
+    max_in_flight: int,
+    max_line_bytes: int,
+) -> AsyncIterator[bytes]:
+    """
+    Simulate NDJSON lines concurrently and yield results in input order.
+
+    At most `max_in_flight` lines are being simulated at any time. The upload
+    is only read further when the window has room, and the window only drains
+    as the client consumes the response, so a slow reader on either side
+    applies backpressure instead of buffering the whole file.
+    """
+    pending: Deque[asyncio.Future] = deque()
+    line_no = 0
+    try:
+        async for line in _iter_ndjson_lines(chunks, max_line_bytes):
+            line_no += 1
+            if line is None:
+                done: asyncio.Future = asyncio.get_running_loop().create_future()
+                done.set_result(_ndjson_record({
+                    "line": line_no,
+                    "status": 413,
+                    "detail": f"Line too long (limit {max_line_bytes} bytes)",
+                }))
+                pending.append(done)
+            elif not line.strip():
+                continue
+            else:
+                pending.append(
+                    asyncio.ensure_future(
+                        run_in_threadpool(_simulate_ndjson_line, engine, line_no, line)
+                    )
+                )
+
+            # Emit whatever is already finished at the head of the window.
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+
+            if len(pending) >= max_in_flight:
+                yield await pending.popleft()
+
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator is still reading the request.
+
+    On ASGI servers older than spec 2.4, StreamingResponse runs a
+    disconnect listener that calls receive() concurrently with the body
+    iterator and would swallow upload chunks. Here the generator consumes
+    receive() itself (request.stream() raises ClientDisconnect on
+    disconnect), so the listener is skipped.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:  # pragma: no cover - client went away mid-response
+            return
+        if self.background is not None:
+            await self.background()
+
+
+@cosden_router.post("/simulate/stream")
+async def simulate_stream(
+    request: Request,
+    services: CosDenServices = Depends(_services),
+) -> _DuplexStreamingResponse:
+    """
+    Bulk simulation over NDJSON.
+
+    The request body is one SimulateRequest JSON object per line (chunked
+    uploads are fine). The response streams one JSON object per input line,
+    in the same order, as soon as each result is ready:
+
+      {"line": 1, "status": 200, "result": {...SimulateResponse...}}
+      {"line": 2, "status": 400, "detail": "Unknown product code: Z9"}
+
+    Lines over COSDEN_STREAM_MAX_LINE_BYTES are answered with status 413.
+    """
+    log_event(
+        "simulate_stream_request",
+        extra={
+            "endpoint": "/simulate/stream",
+            "max_in_flight": COSDEN_STREAM_MAX_IN_FLIGHT,
+        },
+    )
+
+    return _DuplexStreamingResponse(
+        _stream_simulations(
+            services.engine,
+            request.stream(),
+            max_in_flight=max(1, COSDEN_STREAM_MAX_IN_FLIGHT),
+            max_line_bytes=COSDEN_STREAM_MAX_LINE_BYTES,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+# -------------------------
+# /metrics endpoint
+# -------------------------
+
+def _thread_limiter_stats() -> Dict[str, float]:
+    # Must run on the event loop thread (the async /metrics handler).
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return {
+        "busy": float(stats.borrowed_tokens),
+        "waiting": float(stats.tasks_waiting),
+        "limit": float(limiter.total_tokens),
+    }
+
+
+# Apps built with metrics on; the process-wide gauges read their services.
+_metric_apps: "weakref.WeakSet[FastAPI]" = weakref.WeakSet()
+_gauges_lock = threading.Lock()
+_gauges_registered = False
+
+
+def _cache_entries() -> Dict:
+    entries: Dict = {}
+
+    def add(cache: str, count: int) -> None:
+        key = label_set(cache=cache)
+        entries[key] = entries.get(key, 0) + count
+
+    for application in list(_metric_apps):
+        services = getattr(application.state, "services", None)
+        if services is None:
+            continue
+        add("catalog_payloads", services.catalog_payloads.size())
+        store = services.engine.twin_store
+        if store is not None:
+            add("twins", store.stats()["entries"])
+        render_cache = services.engine.render_cache
+        if render_cache is not None:
+            add("render", render_cache.stats()["entries"])
+    return entries
+
+
+def _register_gauges(application: FastAPI) -> None:
+    # Gauges live on the global REGISTRY, so they are registered once and
+    # read whichever apps are alive instead of closing over one of them.
+    global _gauges_registered
+    _metric_apps.add(application)
+    with _gauges_lock:
+        if _gauges_registered:
+            return
+        _gauges_registered = True
+
+    REGISTRY.gauge(
+        "cosden_cache_entries", "Entries held by in-process caches.", _cache_entries
+    )
+    REGISTRY.gauge(
+        "cosden_threadpool_busy_threads",
+        "Worker threads currently running sync endpoints.",
+        lambda: _thread_limiter_stats()["busy"],
+    )
+    REGISTRY.gauge(
+        "cosden_threadpool_queue_depth",
+        "Sync endpoint calls waiting for a worker thread.",
+        lambda: _thread_limiter_stats()["waiting"],
+    )
+    REGISTRY.gauge(
+        "cosden_log_queue_depth",
+        "Log records waiting for the background writer.",
+        lambda: log_stats()["queued"],
+    )
+    REGISTRY.gauge(
+        "cosden_log_records_dropped",
+        "Log records dropped because the writer queue was full.",
+        lambda: log_stats()["dropped_total"],
+    )
+
+
+@cosden_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Prometheus scrape endpoint.
+    """
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+# -------------------------
+# App factory
+# -------------------------
+
+def create_app() -> FastAPI:
+    """
+    Build the CosDenOS FastAPI app.
+
+    The engine, planner and StegCore integration are created by the
+    lifespan hook, so building (or importing) the app stays cheap.
+    """
+    application = FastAPI(
+        title="CosDenOS Cosmetic Engine API",
+        version=COSDEN_VERSION,
+        description=(
+            "CosDenOS cosmetic-only engine + StegVerse AI Cosmetic Planner.\n\n"
+            "Important: This API is cosmetic-only and does not diagnose, treat, "
+            "or prevent any disease or condition."
+        ),
+        lifespan=_lifespan,
+    )
+    application.include_router(cosden_router)
+    application.add_middleware(TracingMiddleware)
+    if COSDEN_METRICS:
+        # Added last so it is outermost and times the whole request.
+        application.add_middleware(MetricsMiddleware)
+        _register_gauges(application)
+    return application
+
+
+app = create_app()
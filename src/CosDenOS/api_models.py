@@ -2,13 +2,24 @@ from __future__ import annotations
 
 from typing import List, Optional, Dict, Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from .age import AgeGroup
+from .models import Product
 
 
 # ---------- Shared models ----------
 
+class ShadeBaselineInfo(BaseModel):
+    """Measured starting shade from HomeScan (appearance only, 0..1 scales)."""
+    lightness: float = Field(..., ge=0.0, le=1.0)
+    lightness_std: float = Field(0.0, ge=0.0)
+    warmth: float = Field(0.0, ge=-1.0, le=1.0)
+    tooth_lightness: Dict[int, float] = Field(default_factory=dict)
+    pixels: int = Field(0, ge=0)
+    scans: int = Field(1, ge=0)
+
+
 class UserInfo(BaseModel):
     """Minimal cosmetic user info for the API."""
     age_years: int = Field(..., ge=1, description="User age in years")
@@ -28,6 +39,10 @@ class UserInfo(BaseModel):
         None,
         description="Optional cosmetic-only notes (e.g. 'coffee drinker')"
     )
+    baseline: Optional[ShadeBaselineInfo] = Field(
+        None,
+        description="Optional measured starting shade (see CosDenOS.homescan)"
+    )
 
 
 # ---------- /plan request & response ----------
@@ -72,6 +87,9 @@ class SimulationData(BaseModel):
     aggregated_effect: SimulationEffect
     notes: List[str]
     cosmetic_only: bool
+    twin_id: Optional[str] = None
+    baseline_lightness: Optional[float] = None
+    projected_lightness: Optional[float] = None
 
 
 class PlanResponse(BaseModel):
@@ -87,6 +105,7 @@ class PlanResponse(BaseModel):
     interpreted_goal: InterpretedGoal
     recommended_stack: Dict[str, Any]
     simulation: SimulationData
+    event_schedule: Optional[Dict[str, Any]] = None  # set when the goal has an event time
     legal_disclaimer: str
 
 
@@ -98,14 +117,95 @@ class SimulateRequest(BaseModel):
 
     - user: age, tone, etc. (tone not heavily used here yet, but kept for symmetry).
     - codes: product codes like ["A1", "C1", "E1"].
+    - twin_id: optional Digital Twin from the server's twin store.
     """
     user: UserInfo
     codes: List[str] = Field(
         ...,
         description="List of CosDen product codes (e.g. ['A1', 'C1', 'E1'])"
     )
+    twin_id: Optional[str] = Field(
+        None,
+        description="Digital Twin to target, from the server's twin store"
+    )
 
 
 class SimulateResponse(BaseModel):
     cosmetic_only: bool
     simulation: SimulationData
+
+
+# ---------- /admin/catalog/reload request & response ----------
+
+class CatalogReloadRequest(BaseModel):
+    """
+    Optional body for /admin/catalog/reload.
+
+    - products: full replacement catalog (Product.to_dict() shape). If
+      omitted, the server reloads from its configured catalog source.
+      Every item must parse with Product.from_dict().
+    """
+    products: Optional[List[Dict[str, Any]]] = None
+
+    @field_validator("products")
+    @classmethod
+    def _products_parse(cls, items: Optional[List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+        for i, item in enumerate(items or []):
+            try:
+                Product.from_dict(item)
+            except (KeyError, TypeError, ValueError) as exc:
+                detail = f"missing field {exc}" if isinstance(exc, KeyError) else str(exc)
+                raise ValueError(f"products[{i}]: {detail}") from exc
+        return items
+
+    def catalog(self) -> Dict[str, Product]:
+        return {p.code: p for p in map(Product.from_dict, self.products or [])}
+
+
+class CatalogReloadResponse(BaseModel):
+    catalog_version: int
+    product_count: int
+    source: str
+
+
+# ---------- Device registration & telemetry ----------
+
+class DeviceRegistration(BaseModel):
+    model: str = Field(..., description="Device model: 'SonicPolish', 'ShineBar' or 'TrayFormer'")
+
+
+class TelemetryIngestResponse(BaseModel):
+    device_id: str
+    accepted: int
+    rejected: int
+    dropped: int
+
+
+# ---------- /simulate/batch and /plan/batch ----------
+
+class SimulateBatchRequest(BaseModel):
+    """
+    Several /simulate requests in one HTTP call (used by client batching).
+    """
+    items: List[SimulateRequest]
+
+
+class PlanBatchRequest(BaseModel):
+    """
+    Several /plan requests in one HTTP call (used by client batching).
+    """
+    items: List[PlanRequest]
+
+
+class BatchItemResult(BaseModel):
+    """
+    Outcome of one batch item: the per-item status code plus either the
+    normal response body or an error detail.
+    """
+    status: int
+    body: Optional[Dict[str, Any]] = None
+    detail: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
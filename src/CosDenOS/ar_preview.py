@@ -0,0 +1,253 @@
+"""
+Image-space smile preview for AR / mirror displays.
+
+SmilePreviewer applies a stack's aggregated ProductEffect to the tooth
+region of an RGB photo or video frame:
+
+    image  (H, W, 3) uint8 (or float in [0, 1])
+    mask   (H, W)    bool (or integer, nonzero = tooth), or float alpha
+                     in [0, 1] for soft edges
+
+The transform is the twin renderer's (see twin_render): one per-channel
+affine map for brightness, tone and opalescence, tone neutralizing, plus
+a luma-weighted highlight for gloss. Only the mask's bounding box is
+transformed, as whole-array NumPy passes over horizontal tiles; NumPy
+releases the GIL inside those passes, so tiles are processed in parallel
+on a thread pool.
+
+Scratch buffers are kept per frame size and reused, so a video stream
+at a fixed resolution allocates nothing after its first frame:
+
+    with SmilePreviewer() as previewer:
+        for frame in previewer.stream(frames_and_masks, result):
+            display(frame)   # overwritten by the next frame
+
+This is a cosmetic appearance preview only.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+from .models import ProductEffect, SimulationResult
+from .twin_render import LUMA, NEUTRAL_DESATURATION, effect_affine, np
+
+# Perceived-depth tint for opalescence: per-channel scale per unit delta.
+OPALESCENCE_TINT = np.array([-0.04, -0.01, 0.05], dtype=np.float32)
+OPALESCENCE_GAIN = 1.0
+
+# Gloss brightens highlights: color += gloss_delta * GAIN * luma ** 2.
+GLOSS_HIGHLIGHT_GAIN = 0.25
+
+Effect = Union[ProductEffect, SimulationResult]
+
+
+class _Scratch:
+    def __init__(self, height: int, width: int) -> None:
+        self.shape = (height, width)
+        self.color = np.empty((height, width, 3), dtype=np.float32)
+        self.luma = np.empty((height, width), dtype=np.float32)
+
+
+class SmilePreviewer:
+    """
+    Applies effects to images, tile by tile.
+
+    - tile_rows: rows per tile; frames with more rows are split
+    - workers: thread pool size (default: CPU count, at most 8); 1 keeps
+      everything on the calling thread
+
+    One previewer serves one stream at a time (its scratch buffers are
+    shared); preview() calls are serialized by a lock.
+    """
+
+    def __init__(self, tile_rows: int = 128, workers: Optional[int] = None) -> None:
+        if tile_rows <= 0:
+            raise ValueError("tile_rows must be positive")
+        self.tile_rows = tile_rows
+        self.workers = workers if workers is not None else min(8, os.cpu_count() or 1)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._scratch: Optional[_Scratch] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------
+    # Lifecycle
+    # ------------------------------
+
+    def close(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def __enter__(self) -> "SmilePreviewer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="cosden-ar"
+            )
+        return self._pool
+
+    # ------------------------------
+    # Preview
+    # ------------------------------
+
+    def preview(
+        self,
+        image: np.ndarray,
+        mask: np.ndarray,
+        effect: Effect,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        The image with effect applied inside mask, written into out (same
+        shape and dtype as image; allocated if None) and returned. out may
+        be image itself for in-place previews.
+        """
+        if isinstance(effect, SimulationResult):
+            effect = effect.aggregated_effect
+        if image.ndim != 3 or image.shape[2] != 3:
+            raise ValueError("image must have shape (H, W, 3)")
+        height, width = image.shape[:2]
+        if mask.shape != (height, width):
+            raise ValueError(f"mask must have shape {(height, width)}")
+        if np.issubdtype(mask.dtype, np.integer):
+            mask = mask != 0  # 0/1 or 0/255 label masks
+        if out is None:
+            out = np.empty_like(image)
+        elif out.shape != image.shape or out.dtype != image.dtype:
+            raise ValueError("out must match the image's shape and dtype")
+
+        peak = 255.0 if np.issubdtype(image.dtype, np.integer) else 1.0
+        params = _params(effect, peak)
+
+        if out is not image:
+            np.copyto(out, image)
+        box = _bounding_box(mask)
+        if box is None:
+            return out  # no teeth in view
+        top, bottom, left, right = box
+        crop = (slice(top, bottom), slice(left, right))
+        image_box, mask_box, out_box = image[crop], mask[crop], out[crop]
+
+        with self._lock:
+            scratch = self._scratch
+            if scratch is None or scratch.shape != (height, width):
+                scratch = self._scratch = _Scratch(height, width)
+
+            tiles = [
+                slice(start, min(start + self.tile_rows, bottom - top))
+                for start in range(0, bottom - top, self.tile_rows)
+            ]
+            jobs = [
+                (
+                    image_box[rows], mask_box[rows], out_box[rows],
+                    scratch.color[rows, : right - left], scratch.luma[rows, : right - left],
+                    params, peak,
+                )
+                for rows in tiles
+            ]
+            if len(jobs) == 1 or self.workers <= 1:
+                for job in jobs:
+                    _apply(*job)
+            else:
+                pool = self._executor()
+                for future in [pool.submit(_apply, *job) for job in jobs]:
+                    future.result()
+        return out
+
+    def stream(
+        self,
+        frames: Iterable[Tuple[np.ndarray, np.ndarray]],
+        effect: Effect,
+    ) -> Iterator[np.ndarray]:
+        """
+        Preview (frame, mask) pairs. Yields one reused output array,
+        overwritten by the next frame; copy frames that must outlive it.
+        """
+        out: Optional[np.ndarray] = None
+        for image, mask in frames:
+            if out is None or out.shape != image.shape or out.dtype != image.dtype:
+                out = np.empty_like(image)
+            yield self.preview(image, mask, effect, out=out)
+
+
+# -------------------------
+# Kernel
+# -------------------------
+
+_Params = Tuple[np.ndarray, np.ndarray, bool, float]
+
+
+def _bounding_box(mask: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (top, bottom, left, right) of the mask's nonzero area, or None. Teeth
+    cover a small part of a face frame, so only this box is transformed.
+    """
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask[rows[0] : rows[-1] + 1].any(axis=0))
+    return int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1
+
+
+def _params(effect: ProductEffect, peak: float) -> _Params:
+    """
+    (scale, offset, neutralize, gloss) for pixel values in [0, peak];
+    scale maps them to [0, 1] at the same time.
+    """
+    scale, offset = effect_affine(effect)
+    scale *= 1.0 + effect.opalescence_delta * OPALESCENCE_GAIN * OPALESCENCE_TINT
+    scale /= np.float32(peak)
+    gloss = float(effect.gloss_delta) * GLOSS_HIGHLIGHT_GAIN
+    return scale, offset, effect.tone_shift == "neutral", gloss
+
+
+def _apply(
+    image: np.ndarray,
+    mask: np.ndarray,
+    out: np.ndarray,
+    color: np.ndarray,
+    luma: np.ndarray,
+    params: _Params,
+    peak: float,
+) -> None:
+    # out already holds image; color / luma are float32 scratch views.
+    scale, offset, neutralize, gloss = params
+
+    np.multiply(image, scale, out=color)
+    color += offset
+    if neutralize:
+        np.matmul(color, LUMA, out=luma)
+        luma *= NEUTRAL_DESATURATION
+        color *= 1.0 - NEUTRAL_DESATURATION
+        color += luma[..., None]
+    if gloss:
+        np.matmul(color, LUMA, out=luma)
+        np.clip(luma, 0.0, 1.0, out=luma)
+        np.square(luma, out=luma)
+        luma *= np.float32(gloss)
+        color += luma[..., None]
+    np.clip(color, 0.0, 1.0, out=color)
+    color *= np.float32(peak)
+
+    if mask.dtype == np.bool_:
+        if peak != 1.0:
+            color += 0.5  # round on the truncating cast below
+        np.copyto(out, color, casting="unsafe", where=mask[..., None])
+        return
+
+    # Soft mask: out = image + alpha * (effect - image)
+    color -= image
+    color *= mask[..., None]
+    color += image
+    if peak != 1.0:
+        color += 0.5
+    np.copyto(out, color, casting="unsafe")
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .catalog_snapshot import CatalogSnapshot
+from .engine import CosDenOS
+from .metrics import record_cache_lookup
+from .models import Product
+
+try:
+    # Brotli comes with the `api` extra (pip install "cosden[api]");
+    # without it only gzip/identity variants are served.
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None  # type: ignore[assignment]
+
+
+# Filter key: (series value or None, age bucket index or None)
+FilterKey = Tuple[Optional[str], Optional[int]]
+
+
+def etag_matches(if_none_match: Optional[str], etags: Iterable[str]) -> bool:
+    """
+    True if an If-None-Match header names any of the given ETags.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return not tags.isdisjoint(etags)
+
+
+@dataclass(frozen=True)
+class CatalogPayload:
+    """
+    One pre-serialized catalog body plus its compressed variants.
+
+    Every variant has its own strong ETag, since the bytes differ.
+    """
+    digest: str
+    identity: bytes
+    gzip: bytes
+    br: Optional[bytes] = None
+
+    def etag(self, encoding: Optional[str]) -> str:
+        if encoding is None:
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """
+        True if an If-None-Match header names any variant of this body.
+        """
+        return etag_matches(
+            if_none_match, (self.etag(None), self.etag("gzip"), self.etag("br"))
+        )
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Pick the best precomputed variant for an Accept-Encoding header.
+
+        Returns (body, content_encoding); content_encoding is None for identity.
+        """
+        accepted = _parse_accept_encoding(accept_encoding)
+        if self.br is not None and accepted.get("br", 0.0) > 0.0:
+            return self.br, "br"
+        if accepted.get("gzip", 0.0) > 0.0:
+            return self.gzip, "gzip"
+        return self.identity, None
+
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    if not header:
+        return accepted
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if "*" in accepted:
+        accepted.setdefault("br", accepted["*"])
+        accepted.setdefault("gzip", accepted["*"])
+    return accepted
+
+
+def _build_payload(catalog_digest: str, products: List[Product]) -> CatalogPayload:
+    body = json.dumps(
+        {
+            "catalog_version": catalog_digest,
+            "cosmetic_only": True,
+            "products": [p.to_dict() for p in products],
+        },
+        separators=(",", ":"),
+    ).encode()
+    return CatalogPayload(
+        digest=hashlib.sha256(body).hexdigest()[:32],
+        identity=body,
+        gzip=gzip.compress(body, compresslevel=9, mtime=0),
+        br=brotli.compress(body) if brotli is not None else None,
+    )
+
+
+@dataclass
+class _CatalogIndex:
+    """
+    Indexes over one catalog version, used to answer filtered requests.
+
+    Ages are bucketed by the sorted age_min / age_max+1 boundaries of all
+    products: every age inside a bucket sees exactly the same products.
+    Filtered bodies are built from the snapshot mapping on first request.
+    """
+    version: int
+    digest: str
+    catalog: Mapping[str, Product]
+    age_boundaries: List[int]
+    payloads: Dict[FilterKey, CatalogPayload] = field(default_factory=dict)
+
+    @staticmethod
+    def build(version: int, catalog: Mapping[str, Product]) -> "_CatalogIndex":
+        boundaries = set()
+        hasher = hashlib.sha256(b"[")
+        for i, p in enumerate(catalog.values()):
+            boundaries.add(p.age_min)
+            if p.age_max is not None:
+                boundaries.add(p.age_max + 1)
+            if i:
+                hasher.update(b",")
+            hasher.update(
+                json.dumps(p.to_dict(), sort_keys=True, separators=(",", ":")).encode()
+            )
+        hasher.update(b"]")
+
+        return _CatalogIndex(
+            version=version,
+            digest=hasher.hexdigest()[:16],
+            catalog=catalog,
+            age_boundaries=sorted(boundaries),
+        )
+
+    def age_bucket(self, age_years: int) -> int:
+        return bisect_right(self.age_boundaries, age_years)
+
+    def key(self, series: Optional[str], age_years: Optional[int]) -> FilterKey:
+        return (series, self.age_bucket(age_years) if age_years is not None else None)
+
+    def payload(self, series: Optional[str], age_years: Optional[int]) -> CatalogPayload:
+        key = self.key(series, age_years)
+        cached = self.payloads.get(key)
+        if cached is not None:
+            return cached
+
+        products = [
+            p
+            for p in self.catalog.values()
+            if (series is None or p.series.value == series)
+            and (age_years is None or p.is_allowed_for_age(age_years))
+        ]
+
+        # Racing builders produce identical bytes, so last write wins safely.
+        built = _build_payload(self.digest, products)
+        self.payloads[key] = built
+        return built
+
+
+class CatalogPayloadCache:
+    """
+    Serves catalog bodies serialized once per catalog version.
+
+    Registered as an engine catalog hook, so the indexes and the unfiltered
+    body for a new snapshot are built by the thread installing it, before
+    the swap. Filtered variants (series and/or age) are built on first
+    request and memoized per version, so steady-state requests are a dict
+    lookup.
+    """
+
+    def __init__(self, engine: CosDenOS) -> None:
+        self._engine = engine
+        self._index: Optional[_CatalogIndex] = None
+        self._lock = threading.Lock()
+        engine.add_catalog_hook(self.prepare)
+
+    def prepare(self, snapshot: CatalogSnapshot) -> None:
+        """
+        Build indexes and the unfiltered payload for a snapshot.
+        """
+        index = _CatalogIndex.build(snapshot.version, snapshot.products)
+        index.payload(None, None)
+        self._index = index
+
+    def _current(self) -> _CatalogIndex:
+        snapshot = self._engine.catalog_snapshot
+        index = self._index
+        if index is not None and index.version >= snapshot.version:
+            return index
+
+        # Cache created after the catalog was loaded: build once, lazily.
+        with self._lock:
+            index = self._index
+            if index is None or index.version < snapshot.version:
+                self.prepare(snapshot)
+                index = self._index
+        return index
+
+    @property
+    def catalog_digest(self) -> str:
+        """
+        Content hash of the current catalog (stable across processes).
+        """
+        return self._current().digest
+
+    def get(
+        self,
+        series: Optional[str] = None,
+        age_years: Optional[int] = None,
+    ) -> CatalogPayload:
+        index = self._current()
+        record_cache_lookup("catalog_payloads", index.key(series, age_years) in index.payloads)
+        return index.payload(series, age_years)
+
+    def size(self) -> int:
+        """
+        Number of serialized payloads held for the current version.
+        """
+        index = self._index
+        return len(index.payloads) if index is not None else 0
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Union
+
+from .logging_utils import log_event
+from .models import Product
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from .engine import CosDenOS
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Immutable, versioned view of the catalog.
+
+    The engine swaps whole snapshots by reference (copy-on-write), so a
+    request that grabbed a snapshot keeps seeing that version even if a
+    reload lands mid-request, and readers never take a lock.
+    """
+    version: int
+    products: Mapping[str, Product] = field(default_factory=lambda: MappingProxyType({}))
+    source: str = "empty"
+
+    @staticmethod
+    def build(
+        version: int,
+        catalog: Mapping[str, Product],
+        source: str,
+    ) -> "CatalogSnapshot":
+        # Private dicts are copied and frozen; read-only mappings (e.g. a
+        # SharedCatalogView) are used as-is.
+        if isinstance(catalog, dict):
+            catalog = MappingProxyType(dict(catalog))
+        return CatalogSnapshot(version=version, products=catalog, source=source)
+
+    def product_list(self) -> List[Product]:
+        return list(self.products.values())
+
+
+def load_catalog_file(path: Union[str, Path]) -> Dict[str, Product]:
+    """
+    Load a catalog from a JSON file.
+
+    Accepts either a list of product dicts or {"products": [...]}, in the
+    same shape as Product.to_dict() / the /catalog endpoint.
+    """
+    data = json.loads(Path(path).read_text())
+    if isinstance(data, dict):
+        data = data["products"]
+    products = [Product.from_dict(item) for item in data]
+    return {p.code: p for p in products}
+
+
+class CatalogFileWatcher:
+    """
+    Background thread that hot-reloads the engine's catalog.
+
+    Watches either a JSON catalog file (reloaded when its mtime changes) or,
+    if the engine is attached to a shared catalog directory, the published
+    CURRENT version. Reload work (parsing, index/cache warm-up via catalog
+    hooks) happens on this thread, never on a request thread.
+    """
+
+    def __init__(
+        self,
+        engine: "CosDenOS",
+        path: Optional[Union[str, Path]] = None,
+        interval_seconds: float = 2.0,
+    ) -> None:
+        self.engine = engine
+        self.path = Path(path) if path is not None else None
+        self.interval_seconds = interval_seconds
+        self._mtime: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if self.path is not None and self.path.exists():
+            self._mtime = self.path.stat().st_mtime_ns
+
+    def check_once(self) -> bool:
+        """
+        Reload if the source changed; True if a new snapshot was installed.
+        """
+        if self.path is None:
+            return self.engine.refresh_shared_catalog()
+
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        self.engine.set_catalog(load_catalog_file(self.path), source=str(self.path))
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                if self.check_once():
+                    log_event(
+                        "catalog_reloaded",
+                        extra={
+                            "catalog_version": self.engine.catalog_version,
+                            "source": self.engine.catalog_snapshot.source,
+                        },
+                    )
+            except Exception as exc:
+                # Keep serving the previous snapshot on a bad update.
+                log_event(
+                    "catalog_reload_error",
+                    level="ERROR",
+                    extra={"error": str(exc), "path": str(self.path)},
+                )
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="cosden-catalog-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds + 1.0)
+            self._thread = None
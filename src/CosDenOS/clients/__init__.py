@@ -1,19 +1,20 @@
-from __future__ import annotations
-
 """
 Client SDKs for CosDenOS.
 
 - Python HTTP client (for other StegVerse services and AI entities)
+- asyncio client (AsyncCosDenClient, needs httpx; imported on first use)
 """
 
+from typing import Any
+
 from .python_client import CosDenClient, CosDenClientConfig, CosDenHTTPError
 
-__all__ = ["CosDenClient", "CosDenClientConfig", "CosDenHTTPError"]"""
-Client SDKs for CosDenOS.
+__all__ = ["AsyncCosDenClient", "CosDenClient", "CosDenClientConfig", "CosDenHTTPError"]
 
-- Python HTTP client (for other StegVerse services)
-"""
 
-from .python_client import CosDenClient, CosDenClientConfig, CosDenHTTPError
+def __getattr__(name: str) -> Any:
+    if name == "AsyncCosDenClient":
+        from .async_client import AsyncCosDenClient
 
-__all__ = ["CosDenClient", "CosDenClientConfig", "CosDenHTTPError"]
+        return AsyncCosDenClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import httpx
+
+from .balancer import Endpoint, EndpointBalancer
+from .python_client import (
+    CosDenClientConfig,
+    CosDenHTTPError,
+    _backoff_delay,
+    _user_payload,
+)
+
+T = TypeVar("T")
+
+
+class AsyncCosDenClient:
+    """
+    asyncio-native client for the CosDenOS API.
+
+    Same surface as CosDenClient (health / plan / simulate, same config and
+    retry rules), on one shared httpx connection pool. Use it as an async
+    context manager, or call aclose() when done.
+
+    Several config.endpoints are balanced and ejected exactly as in
+    CosDenClient; hedging and active /health probes are sync-client only.
+    """
+
+    def __init__(
+        self,
+        config: CosDenClientConfig,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.config = config
+        self._semaphore = asyncio.Semaphore(max(1, config.max_concurrency))
+        self._balancer = EndpointBalancer(
+            config.endpoint_urls(),
+            ewma_decay=config.ewma_decay,
+            eject_after_failures=config.eject_after_failures,
+            eject_seconds=config.eject_seconds,
+        )
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=config.pool_maxsize,
+                max_keepalive_connections=config.pool_maxsize if config.keep_alive else 0,
+            ),
+            timeout=httpx.Timeout(
+                config.timeout_seconds,
+                connect=config.connect_timeout_seconds or config.timeout_seconds,
+            ),
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncCosDenClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    # ------------------------------
+    # Internal helpers
+    # ------------------------------
+
+    def _handle_response(self, resp: httpx.Response) -> Dict[str, Any]:
+        try:
+            data = resp.json()
+        except ValueError:
+            raise CosDenHTTPError(
+                f"CosDen API returned non-JSON response: {resp.status_code}",
+                status_code=resp.status_code,
+            )
+        if resp.status_code >= 400:
+            detail = data.get("detail", data)
+            raise CosDenHTTPError(
+                f"CosDen API error {resp.status_code}: {detail}",
+                status_code=resp.status_code,
+            )
+        return data
+
+    async def _send_to(
+        self,
+        endpoint: Endpoint,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]],
+        timeout: Any,
+    ) -> httpx.Response:
+        ok = False
+        start = time.monotonic()
+        self._balancer.begin(endpoint)
+        try:
+            resp = await self._client.request(
+                method, endpoint.url + path, json=payload, timeout=timeout
+            )
+            ok = resp.status_code < 500
+            return resp
+        finally:
+            self._balancer.end(endpoint, time.monotonic() - start, ok)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        idempotent: bool = True,
+    ) -> Dict[str, Any]:
+        request_timeout: Any = httpx.USE_CLIENT_DEFAULT
+        if timeout is not None:
+            request_timeout = httpx.Timeout(
+                timeout, connect=self.config.connect_timeout_seconds or timeout
+            )
+
+        attempt = 0
+        # Retries go to a different replica than the attempt that failed.
+        avoid: Tuple[Endpoint, ...] = ()
+        while True:
+            endpoint = self._balancer.pick(exclude=avoid)
+            avoid = (endpoint,)
+            try:
+                resp = await self._send_to(endpoint, method, path, payload, request_timeout)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                # Nothing reached the server: safe to retry anything.
+                if attempt >= self.config.max_retries:
+                    raise
+            except httpx.TransportError:
+                if not idempotent or attempt >= self.config.max_retries:
+                    raise
+            else:
+                if (
+                    resp.status_code in self.config.retry_statuses
+                    and idempotent
+                    and attempt < self.config.max_retries
+                ):
+                    await asyncio.sleep(
+                        _backoff_delay(self.config, attempt, resp.headers.get("Retry-After"))
+                    )
+                    attempt += 1
+                    continue
+                return self._handle_response(resp)
+
+            await asyncio.sleep(_backoff_delay(self.config, attempt))
+            attempt += 1
+
+    # ------------------------------
+    # Endpoints
+    # ------------------------------
+
+    async def health(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._request("GET", "/health", timeout=timeout)
+
+    async def plan(
+        self,
+        age_years: int,
+        request_text: str,
+        tone_preference: Optional[str] = None,
+        sensitivity_flag: bool = False,
+        event_time_hours: Optional[int] = None,
+        notes: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call POST /plan to get a cosmetic plan.
+        """
+        payload = {
+            "user": _user_payload(
+                age_years, tone_preference, sensitivity_flag, event_time_hours, notes
+            ),
+            "request_text": request_text,
+        }
+        return await self._request("POST", "/plan", payload, timeout=timeout)
+
+    async def simulate(
+        self,
+        age_years: int,
+        codes: List[str],
+        tone_preference: Optional[str] = None,
+        sensitivity_flag: bool = False,
+        event_time_hours: Optional[int] = None,
+        notes: Optional[str] = None,
+        timeout: Optional[float] = None,
+        twin_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call POST /simulate to compute cosmetic effect for given product codes,
+        optionally targeting a Digital Twin held by the server (twin_id).
+        """
+        payload = {
+            "user": _user_payload(
+                age_years, tone_preference, sensitivity_flag, event_time_hours, notes
+            ),
+            "codes": codes,
+        }
+        if twin_id is not None:
+            payload["twin_id"] = twin_id
+        return await self._request("POST", "/simulate", payload, timeout=timeout)
+
+    # ------------------------------
+    # Fan-out
+    # ------------------------------
+
+    async def gather_bounded(
+        self,
+        calls: Iterable[Callable[[], Awaitable[T]]],
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        Run zero-argument coroutine factories concurrently, at most
+        config.max_concurrency at a time, and return results in order.
+
+        Factories (not coroutines) are taken so that nothing starts
+        before a slot is free.
+        """
+
+        async def run(call: Callable[[], Awaitable[T]]) -> T:
+            async with self._semaphore:
+                return await call()
+
+        return await asyncio.gather(
+            *(run(call) for call in calls), return_exceptions=return_exceptions
+        )
+
+    async def simulate_many(
+        self,
+        requests: Iterable[Dict[str, Any]],
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        simulate() for many keyword-argument dicts, e.g.
+        [{"age_years": 30, "codes": ["A1", "C1"]}, ...].
+        """
+        return await self.gather_bounded(
+            [lambda kwargs=kwargs: self.simulate(**kwargs) for kwargs in requests],
+            return_exceptions=return_exceptions,
+        )
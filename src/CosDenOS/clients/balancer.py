@@ -0,0 +1,161 @@
+"""
+Client-side load balancing across CosDenOS replicas.
+
+- Power-of-two-choices: two random healthy endpoints are compared and the
+  one with the lower (in-flight + 1) * EWMA latency score wins.
+- Passive outlier ejection: an endpoint failing eject_after_failures times
+  in a row (transport errors or 5xx) is skipped for eject_seconds.
+- Active health probes (optional): HealthProber calls /health on every
+  endpoint periodically, ejecting failures and reinstating recoveries.
+
+If every endpoint is ejected the balancer fails open and picks among all
+of them, so a correlated outage never leaves the client with no target.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Collection, Dict, List, Optional, Sequence
+
+
+@dataclass
+class Endpoint:
+    url: str
+    in_flight: int = 0
+    ewma_seconds: float = 0.0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+
+    def score(self) -> float:
+        return (self.in_flight + 1) * self.ewma_seconds
+
+
+class EndpointBalancer:
+    def __init__(
+        self,
+        urls: Sequence[str],
+        ewma_decay: float = 0.3,
+        eject_after_failures: int = 3,
+        eject_seconds: float = 30.0,
+    ) -> None:
+        if not urls:
+            raise ValueError("At least one CosDenOS endpoint is required")
+        self.endpoints: List[Endpoint] = [Endpoint(url.rstrip("/")) for url in urls]
+        self.ewma_decay = ewma_decay
+        self.eject_after_failures = eject_after_failures
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+
+    # ------------------------------
+    # Selection
+    # ------------------------------
+
+    def pick(self, exclude: Collection[Endpoint] = ()) -> Endpoint:
+        endpoints = self.endpoints
+        if len(endpoints) == 1:
+            return endpoints[0]
+
+        now = time.monotonic()
+        candidates = [e for e in endpoints if e.ejected_until <= now and e not in exclude]
+        if not candidates:
+            candidates = [e for e in endpoints if e not in exclude] or endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+
+        a, b = random.sample(candidates, 2)
+        return a if a.score() <= b.score() else b
+
+    # ------------------------------
+    # Accounting
+    # ------------------------------
+
+    def begin(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.in_flight += 1
+
+    def end(self, endpoint: Endpoint, elapsed_seconds: float, ok: bool) -> None:
+        with self._lock:
+            endpoint.in_flight -= 1
+            if endpoint.ewma_seconds == 0.0:
+                endpoint.ewma_seconds = elapsed_seconds
+            else:
+                endpoint.ewma_seconds += self.ewma_decay * (elapsed_seconds - endpoint.ewma_seconds)
+            if ok:
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.eject_after_failures:
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+
+    def mark_health(self, endpoint: Endpoint, healthy: bool) -> None:
+        """
+        Apply an active /health probe result.
+        """
+        with self._lock:
+            if healthy:
+                endpoint.consecutive_failures = 0
+                endpoint.ejected_until = 0.0
+            else:
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        return {
+            e.url: {
+                "in_flight": e.in_flight,
+                "ewma_seconds": e.ewma_seconds,
+                "consecutive_failures": e.consecutive_failures,
+                "ejected": float(e.ejected_until > now),
+            }
+            for e in self.endpoints
+        }
+
+
+class HealthProber:
+    """
+    Daemon thread probing every endpoint each interval_seconds.
+
+    probe(url) returns True when the endpoint is healthy; exceptions count
+    as unhealthy.
+    """
+
+    def __init__(
+        self,
+        balancer: EndpointBalancer,
+        probe: Callable[[str], bool],
+        interval_seconds: float,
+    ) -> None:
+        self.balancer = balancer
+        self.probe = probe
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check_once(self) -> None:
+        for endpoint in self.balancer.endpoints:
+            try:
+                healthy = bool(self.probe(endpoint.url))
+            except Exception:
+                healthy = False
+            self.balancer.mark_health(endpoint, healthy)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.check_once()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="cosden-health-prober", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
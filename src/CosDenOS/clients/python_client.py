@@ -1,24 +1,336 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
 
+import hashlib
 import json
+import random
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from .balancer import Endpoint, EndpointBalancer, HealthProber
 
 
 @dataclass
 class CosDenClientConfig:
     """
     Configuration for talking to a CosDenOS API instance.
+
+    Connections are pooled on a persistent session. Retries use exponential
+    backoff with full jitter and only repeat requests that are safe to
+    repeat: all CosDenOS endpoints are side-effect free, so /health, /plan
+    and /simulate count as idempotent; other requests are only retried if
+    the connection could not be established at all.
+
+    To spread load over several replicas, list them in `endpoints` (it
+    takes precedence over base_url); see EndpointBalancer.
     """
-    base_url: str  # e.g. "http://localhost:8000" or "https://cosden.stegverse.internal"
-    timeout_seconds: float = 10.0
+    base_url: str = ""  # e.g. "http://localhost:8000" or "https://cosden.stegverse.internal"
+    timeout_seconds: float = 10.0            # read timeout (default per call)
+    connect_timeout_seconds: Optional[float] = None  # None = timeout_seconds
+
+    # Connection pool
+    pool_connections: int = 10   # number of host pools to cache
+    pool_maxsize: int = 50       # connections kept alive per host
+    keep_alive: bool = True      # False sends "Connection: close"
+
+    # Retries
+    max_retries: int = 3
+    backoff_base_seconds: float = 0.1
+    backoff_max_seconds: float = 2.0
+    retry_statuses: Tuple[int, ...] = (429, 502, 503, 504)
+
+    # Fan-out helpers (AsyncCosDenClient.gather_bounded / simulate_many)
+    max_concurrency: int = 32
+
+    # Automatic batching of concurrent plan()/simulate() calls into one
+    # POST /plan/batch or /simulate/batch. 1 disables batching.
+    batch_max_size: int = 1
+    batch_flush_interval_seconds: float = 0.005
+
+    # Opt-in LRU + TTL cache of simulate() results. 0 disables it.
+    simulate_cache_size: int = 0
+    simulate_cache_ttl_seconds: float = 60.0
+
+    # Replicas and client-side load balancing
+    endpoints: Tuple[str, ...] = ()
+    ewma_decay: float = 0.3
+    eject_after_failures: int = 3
+    eject_seconds: float = 30.0
+    health_check_interval_seconds: float = 0.0  # 0 disables /health probes
+    # Idempotent requests still running after this long are re-sent to a
+    # second replica; the first response wins. None disables hedging.
+    hedge_after_seconds: Optional[float] = None
+
+    def endpoint_urls(self) -> Tuple[str, ...]:
+        return tuple(self.endpoints) or ((self.base_url,) if self.base_url else ())
 
 
 class CosDenHTTPError(Exception):
     """Raised when the CosDen HTTP API returns an error."""
 
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _user_payload(
+    age_years: int,
+    tone_preference: Optional[str],
+    sensitivity_flag: bool,
+    event_time_hours: Optional[int],
+    notes: Optional[str],
+) -> Dict[str, Any]:
+    return {
+        "age_years": age_years,
+        "tone_preference": tone_preference,
+        "sensitivity_flag": sensitivity_flag,
+        "event_time_hours": event_time_hours,
+        "notes": notes,
+    }
+
+
+def _backoff_delay(
+    config: CosDenClientConfig,
+    attempt: int,
+    retry_after: Optional[str] = None,
+) -> float:
+    """
+    Exponential backoff with full jitter; honours a numeric Retry-After.
+    """
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), config.backoff_max_seconds)
+    cap = min(config.backoff_max_seconds, config.backoff_base_seconds * (2 ** attempt))
+    return random.uniform(0.0, cap)
+
+
+@dataclass(frozen=True)
+class _CacheEntry:
+    body: bytes
+    etag: Optional[str]
+    stored_at: float
+
+
+class _ResponseCache:
+    """
+    LRU + TTL cache of raw response bodies, keyed by canonical payload hash.
+
+    Entries younger than the TTL are served without a request; older ones
+    are revalidated with If-None-Match. Seeing a new catalog version
+    (X-CosDen-Catalog-Version) drops every entry.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.catalog_version: Optional[str] = None
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(payload: Dict[str, Any]) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[_CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: _CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def observe_catalog_version(self, version: Optional[str]) -> None:
+        if not version or version == self.catalog_version:
+            return
+        with self._lock:
+            if version != self.catalog_version:
+                self._entries.clear()
+                self.catalog_version = version
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _RequestBatcher:
+    """
+    Combines concurrent calls to one endpoint into POST <path>/batch.
+
+    Callers enqueue their payload and block on a future. A dispatcher
+    thread flushes the queue once batch_max_size items are waiting or the
+    oldest item has waited batch_flush_interval_seconds, and sends the
+    batch from a small thread pool; per-item results are split back to
+    each caller. A batch reply without one result per item fails every
+    caller in it, and callers give up after _result_timeout() seconds.
+
+    If the server has no batch endpoint (404 / 405), batching is switched
+    off for this endpoint and calls go out individually.
+    """
+
+    def __init__(self, client: "CosDenClient", path: str) -> None:
+        self._client = client
+        self._path = path
+        self._max_size = client.config.batch_max_size
+        self._interval = client.config.batch_flush_interval_seconds
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[Dict[str, Any], "Future[Dict[str, Any]]"]] = []
+        self._oldest = 0.0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.supported = True
+
+    # ------------------------------
+    # Caller side
+    # ------------------------------
+
+    def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.supported:
+            return self._client._request("POST", self._path, payload)
+
+        future: "Future[Dict[str, Any]]" = Future()
+        with self._cond:
+            if self._stopping:
+                return self._client._request("POST", self._path, payload)
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, self._client.config.max_concurrency),
+                    thread_name_prefix="cosden-batch-send",
+                )
+                self._thread = threading.Thread(
+                    target=self._run, name=f"cosden-batch{self._path}", daemon=True
+                )
+                self._thread.start()
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((payload, future))
+            if len(self._pending) >= self._max_size:
+                self._cond.notify()
+        try:
+            return future.result(timeout=self._result_timeout())
+        except TimeoutError:
+            raise TimeoutError(f"Timed out waiting for batched POST {self._path}") from None
+
+    # ------------------------------
+    # Dispatcher
+    # ------------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending and (
+                        self._stopping
+                        or len(self._pending) >= self._max_size
+                        or time.monotonic() - self._oldest >= self._interval
+                    ):
+                        break
+                    if self._stopping:
+                        return
+                    if self._pending:
+                        self._cond.wait(self._interval - (time.monotonic() - self._oldest))
+                    else:
+                        self._cond.wait()
+                batch = self._pending[: self._max_size]
+                del self._pending[: self._max_size]
+                if self._pending:
+                    self._oldest = time.monotonic()
+            assert self._executor is not None
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch: List[Tuple[Dict[str, Any], "Future[Dict[str, Any]]"]]) -> None:
+        try:
+            self._send_batch(batch)
+        except Exception as exc:
+            # Never leave a caller waiting on a future nobody will resolve.
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+
+    def _send_batch(self, batch: List[Tuple[Dict[str, Any], "Future[Dict[str, Any]]"]]) -> None:
+        if self.supported and len(batch) > 1:
+            try:
+                data = self._client._request(
+                    "POST", self._path + "/batch", {"items": [p for p, _ in batch]}
+                )
+            except CosDenHTTPError as exc:
+                if exc.status_code in (404, 405):
+                    self.supported = False
+                elif exc.status_code != 422:
+                    raise
+                # 422: one item failed validation; resend individually so
+                # every caller gets its own result or error.
+            else:
+                results = data.get("results") if isinstance(data, dict) else None
+                if not isinstance(results, list) or len(results) != len(batch):
+                    got = len(results) if isinstance(results, list) else "no"
+                    raise CosDenHTTPError(
+                        f"CosDen API returned {got} results for a batch of {len(batch)}"
+                    )
+                for (_, future), result in zip(batch, results):
+                    status = result["status"]
+                    if status < 400:
+                        future.set_result(result["body"])
+                    else:
+                        future.set_exception(CosDenHTTPError(
+                            f"CosDen API error {status}: {result.get('detail')}",
+                            status_code=status,
+                        ))
+                return
+
+        # Sent in parallel, so each caller waits for about one request.
+        for payload, future in batch:
+            try:
+                assert self._executor is not None
+                self._executor.submit(self._send_one, payload, future)
+            except RuntimeError:  # executor shutting down (stop())
+                self._send_one(payload, future)
+
+    def _send_one(self, payload: Dict[str, Any], future: "Future[Dict[str, Any]]") -> None:
+        try:
+            future.set_result(self._client._request("POST", self._path, payload))
+        except Exception as exc:
+            future.set_exception(exc)
+
+    def _result_timeout(self) -> float:
+        """
+        How long a caller waits for its batched result: the flush interval
+        plus two requests with all their retries (the batch, then possibly
+        the individual resend).
+        """
+        config = self._client.config
+        connect = config.connect_timeout_seconds or config.timeout_seconds
+        attempts = config.max_retries + 1
+        per_request = attempts * (connect + config.timeout_seconds) + (
+            config.max_retries * config.backoff_max_seconds
+        )
+        return self._interval + 2 * per_request
+
+    def stop(self) -> None:
+        """
+        Flush queued calls and stop the dispatcher.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread, executor = self._thread, self._executor
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
 
 class CosDenClient:
     """
@@ -28,40 +340,276 @@ class CosDenClient:
       - GET /health
       - POST /plan
       - POST /simulate
+
+    With config.batch_max_size > 1, concurrent plan()/simulate() calls
+    from many threads are sent as batches (see _RequestBatcher). Calls
+    passing an explicit timeout are always sent on their own.
+
+    With config.simulate_cache_size > 0, simulate() results are cached
+    (see _ResponseCache). Cache misses and revalidations are sent
+    individually, since they need the per-response ETag.
+
+    With several config.endpoints, every attempt is routed by an
+    EndpointBalancer (P2C on in-flight x EWMA latency, outlier ejection,
+    optional /health probes); retries avoid the replica that just failed
+    and config.hedge_after_seconds enables hedged requests.
     """
 
-    def __init__(self, config: CosDenClientConfig) -> None:
+    def __init__(
+        self,
+        config: CosDenClientConfig,
+        session: Optional[requests.Session] = None,
+    ) -> None:
         self.config = config
+        self._balancer = EndpointBalancer(
+            config.endpoint_urls(),
+            ewma_decay=config.ewma_decay,
+            eject_after_failures=config.eject_after_failures,
+            eject_seconds=config.eject_seconds,
+        )
+        self._session = session or self._build_session()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._prober: Optional[HealthProber] = None
+        if config.health_check_interval_seconds > 0:
+            self._prober = HealthProber(
+                self._balancer, self._probe, config.health_check_interval_seconds
+            )
+            self._prober.start()
+        self._batchers: Dict[str, _RequestBatcher] = {}
+        if config.batch_max_size > 1:
+            for path in ("/plan", "/simulate"):
+                self._batchers[path] = _RequestBatcher(self, path)
+        self._simulate_cache: Optional[_ResponseCache] = None
+        if config.simulate_cache_size > 0:
+            self._simulate_cache = _ResponseCache(
+                config.simulate_cache_size, config.simulate_cache_ttl_seconds
+            )
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        # Retries are handled in _request() so they can respect idempotency.
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            max_retries=0,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not self.config.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def close(self) -> None:
+        for batcher in self._batchers.values():
+            batcher.stop()
+        if self._prober is not None:
+            self._prober.stop()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self._session.close()
+
+    def __enter__(self) -> "CosDenClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
 
     # ------------------------------
     # Internal helpers
     # ------------------------------
 
-    def _url(self, path: str) -> str:
-        return self.config.base_url.rstrip("/") + path
+    def _probe(self, url: str) -> bool:
+        resp = self._session.request(
+            "GET", url + "/health", timeout=self.config.connect_timeout_seconds or 2.0
+        )
+        return resp.status_code == 200
+
+    def _send_to(
+        self,
+        endpoint: Endpoint,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeouts: Tuple[float, float],
+    ) -> requests.Response:
+        ok = False
+        start = time.monotonic()
+        self._balancer.begin(endpoint)
+        try:
+            resp = self._session.request(
+                method, endpoint.url + path, json=payload, headers=headers, timeout=timeouts
+            )
+            ok = resp.status_code < 500
+            return resp
+        finally:
+            self._balancer.end(endpoint, time.monotonic() - start, ok)
+
+    def _dispatch(
+        self,
+        primary: Endpoint,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeouts: Tuple[float, float],
+        idempotent: bool,
+    ) -> requests.Response:
+        """
+        One attempt against `primary`, plus a hedge to a second replica for
+        idempotent requests that outlive hedge_after_seconds.
+        """
+        hedge_after = self.config.hedge_after_seconds
+        if hedge_after is None or not idempotent or len(self._balancer.endpoints) < 2:
+            return self._send_to(primary, method, path, payload, headers, timeouts)
+
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=max(2, self.config.max_concurrency),
+                thread_name_prefix="cosden-hedge",
+            )
+        args = (method, path, payload, headers, timeouts)
+        first = self._hedge_executor.submit(self._send_to, primary, *args)
+        if wait([first], timeout=hedge_after).done:
+            return first.result()
+
+        secondary = self._balancer.pick(exclude=(primary,))
+        second = self._hedge_executor.submit(self._send_to, secondary, *args)
+
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    resp = future.result()
+                except Exception as exc:
+                    error = error or exc
+                    continue
+                # Prefer a good answer; settle for a 5xx only once both are in.
+                if resp.status_code < 500 or not pending:
+                    return resp
+        assert error is not None
+        raise error
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        idempotent: bool = True,
+    ) -> Dict[str, Any]:
+        return self._handle_response(
+            self._send(method, path, payload, timeout=timeout, idempotent=idempotent)
+        )
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        idempotent: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> requests.Response:
+        """
+        Send one request with retries; returns the final raw response.
+        """
+        read_timeout = timeout if timeout is not None else self.config.timeout_seconds
+        connect_timeout = self.config.connect_timeout_seconds or read_timeout
+        timeouts = (connect_timeout, read_timeout)
+
+        attempt = 0
+        # Retries go to a different replica than the attempt that failed.
+        avoid: Tuple[Endpoint, ...] = ()
+        while True:
+            endpoint = self._balancer.pick(exclude=avoid)
+            avoid = (endpoint,)
+            try:
+                resp = self._dispatch(
+                    endpoint, method, path, payload, headers, timeouts, idempotent
+                )
+            except requests.exceptions.ConnectTimeout:
+                # Nothing reached the server: safe to retry anything.
+                if attempt >= self.config.max_retries:
+                    raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not idempotent or attempt >= self.config.max_retries:
+                    raise
+            else:
+                if (
+                    resp.status_code in self.config.retry_statuses
+                    and idempotent
+                    and attempt < self.config.max_retries
+                ):
+                    time.sleep(_backoff_delay(self.config, attempt, resp.headers.get("Retry-After")))
+                    attempt += 1
+                    continue
+                if self._simulate_cache is not None:
+                    self._simulate_cache.observe_catalog_version(
+                        resp.headers.get("X-CosDen-Catalog-Version")
+                    )
+                return resp
+
+            time.sleep(_backoff_delay(self.config, attempt))
+            attempt += 1
 
     def _handle_response(self, resp: requests.Response) -> Dict[str, Any]:
         try:
             data = resp.json()
         except json.JSONDecodeError:
             raise CosDenHTTPError(
-                f"CosDen API returned non-JSON response: {resp.status_code}"
+                f"CosDen API returned non-JSON response: {resp.status_code}",
+                status_code=resp.status_code,
             )
         if resp.status_code >= 400:
             detail = data.get("detail", data)
-            raise CosDenHTTPError(f"CosDen API error {resp.status_code}: {detail}")
+            raise CosDenHTTPError(
+                f"CosDen API error {resp.status_code}: {detail}",
+                status_code=resp.status_code,
+            )
+        return data
+
+    def _post(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        timeout: Optional[float],
+    ) -> Dict[str, Any]:
+        batcher = self._batchers.get(path)
+        if batcher is not None and timeout is None:
+            return batcher.submit(payload)
+        return self._request("POST", path, payload, timeout=timeout)
+
+    def _cached_simulate(
+        self,
+        cache: _ResponseCache,
+        payload: Dict[str, Any],
+        timeout: Optional[float],
+    ) -> Dict[str, Any]:
+        key = cache.key(payload)
+        entry = cache.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.stored_at < cache.ttl_seconds:
+            return json.loads(entry.body)
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        resp = self._send("POST", "/simulate", payload, timeout=timeout, headers=headers)
+        if resp.status_code == 304 and entry is not None:
+            cache.put(key, replace(entry, stored_at=now))
+            return json.loads(entry.body)
+
+        data = self._handle_response(resp)
+        cache.put(key, _CacheEntry(resp.content, resp.headers.get("ETag"), now))
         return data
 
     # ------------------------------
     # Health
     # ------------------------------
 
-    def health(self) -> Dict[str, Any]:
-        resp = requests.get(
-            self._url("/health"),
-            timeout=self.config.timeout_seconds,
-        )
-        return self._handle_response(resp)
+    def health(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self._request("GET", "/health", timeout=timeout)
 
     # ------------------------------
     # /plan endpoint
@@ -75,6 +623,7 @@ class CosDenClient:
         sensitivity_flag: bool = False,
         event_time_hours: Optional[int] = None,
         notes: Optional[str] = None,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Call POST /plan to get a cosmetic plan.
@@ -82,21 +631,12 @@ class CosDenClient:
         Returns the PlanResponse JSON as a Python dict.
         """
         payload = {
-            "user": {
-                "age_years": age_years,
-                "tone_preference": tone_preference,
-                "sensitivity_flag": sensitivity_flag,
-                "event_time_hours": event_time_hours,
-                "notes": notes,
-            },
+            "user": _user_payload(
+                age_years, tone_preference, sensitivity_flag, event_time_hours, notes
+            ),
             "request_text": request_text,
         }
-        resp = requests.post(
-            self._url("/plan"),
-            json=payload,
-            timeout=self.config.timeout_seconds,
-        )
-        return self._handle_response(resp)
+        return self._post("/plan", payload, timeout)
 
     # ------------------------------
     # /simulate endpoint
@@ -110,25 +650,23 @@ class CosDenClient:
         sensitivity_flag: bool = False,
         event_time_hours: Optional[int] = None,
         notes: Optional[str] = None,
+        timeout: Optional[float] = None,
+        twin_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        Call POST /simulate to compute cosmetic effect for given product codes.
+        Call POST /simulate to compute cosmetic effect for given product codes,
+        optionally targeting a Digital Twin held by the server (twin_id).
 
         Returns the SimulateResponse JSON as a Python dict.
         """
         payload = {
-            "user": {
-                "age_years": age_years,
-                "tone_preference": tone_preference,
-                "sensitivity_flag": sensitivity_flag,
-                "event_time_hours": event_time_hours,
-                "notes": notes,
-            },
+            "user": _user_payload(
+                age_years, tone_preference, sensitivity_flag, event_time_hours, notes
+            ),
             "codes": codes,
         }
-        resp = requests.post(
-            self._url("/simulate"),
-            json=payload,
-            timeout=self.config.timeout_seconds,
-        )
-        return self._handle_response(resp)
+        if twin_id is not None:
+            payload["twin_id"] = twin_id
+        if self._simulate_cache is not None:
+            return self._cached_simulate(self._simulate_cache, payload, timeout)
+        return self._post("/simulate", payload, timeout)
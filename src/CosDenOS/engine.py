@@ -1,13 +1,31 @@
 from __future__ import annotations
 
-from typing import Dict, Iterable, List, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Union
 
 from .age import AgeProfile
 from .catalog import build_default_catalog
-from .errors import AgeGateError, UnknownProductError
+from .catalog_snapshot import CatalogSnapshot
+from .errors import AgeGateError, CosDenError, UnknownProductError
+from .event_schedule import EventSchedule, ScheduleLimits, build_schedule
 from .goals import CosmeticGoal
 from .models import Product, ProductEffect, ProductStack, SimulationResult
 from .recommend import recommend_stack_codes_for_goal
+from .shared_catalog import SharedCatalog
+from .tracing import traced
+from .user_profile import ShadeBaseline
+
+from .render_cache import ProgressivePreview, RenderCache, RenderKey
+from .twin_store import TwinStore, UnknownTwinError
+
+if TYPE_CHECKING:  # NumPy is optional; twin_render is imported on first render.
+    from .regimen import Regimen, RegimenTrajectory
+    from .twin_render import RenderBuffers, TwinRenderer
+
+# Background threads refining progressive previews (render_progressive).
+_REFINE_WORKERS = 2
 
 
 class CosDenOS:
@@ -23,28 +41,101 @@ class CosDenOS:
     """
 
     def __init__(self) -> None:
-        self._catalog: Dict[str, Product] = {}
+        # Swapped atomically as a whole; readers never lock.
+        self._snapshot: CatalogSnapshot = CatalogSnapshot(version=0)
+        self._snapshot_lock = threading.Lock()  # serializes writers only
+        self._catalog_hooks: List[Callable[[CatalogSnapshot], None]] = []
+        self._shared_catalog: Optional[SharedCatalog] = None
         self._devices: Dict[str, object] = {}
         self._twin: Optional[object] = None  # type: ignore[assignment]
+        self._twin_renderer: Optional["TwinRenderer"] = None
+        self._twin_store: Optional[TwinStore] = None
+        self._render_cache: Optional[RenderCache] = None
+        self._refine_executor: Optional[ThreadPoolExecutor] = None
+        self._refine_lock = threading.Lock()
 
     # -------------------------
     # Catalog management
     # -------------------------
 
+    def add_catalog_hook(self, hook: Callable[[CatalogSnapshot], None]) -> None:
+        """
+        Register a callback that warms derived data (indexes, serialized
+        payloads) for a new snapshot. Hooks run on the thread installing
+        the catalog, before the snapshot becomes visible to readers.
+        """
+        self._catalog_hooks.append(hook)
+
+    def _install_catalog(self, catalog: Mapping[str, Product], source: str) -> CatalogSnapshot:
+        with self._snapshot_lock:
+            snapshot = CatalogSnapshot.build(
+                version=self._snapshot.version + 1,
+                catalog=catalog,
+                source=source,
+            )
+            for hook in self._catalog_hooks:
+                hook(snapshot)
+            self._snapshot = snapshot
+        return snapshot
+
     def load_default_catalog(self) -> None:
-        self._catalog = build_default_catalog()
+        self._install_catalog(build_default_catalog(), source="default")
+
+    def set_catalog(self, catalog: Dict[str, Product], source: str = "set_catalog") -> None:
+        """
+        Replace the catalog with a new immutable snapshot.
+
+        Safe to call while requests are being served: in-flight requests
+        keep the snapshot they started with.
+        """
+        self._install_catalog(catalog, source=source)
+
+    def attach_shared_catalog(self, directory: Union[str, Path]) -> int:
+        """
+        Use a memory-mapped catalog snapshot published with
+        shared_catalog.publish_catalog() instead of a private copy.
+
+        Returns the attached snapshot version.
+        """
+        self._shared_catalog = SharedCatalog(directory)
+        self._install_catalog(self._shared_catalog.view, source=str(directory))
+        return self._shared_catalog.version
+
+    def refresh_shared_catalog(self) -> bool:
+        """
+        Re-attach if a newer shared snapshot has been published.
+        """
+        if self._shared_catalog is None or not self._shared_catalog.refresh():
+            return False
+        self._install_catalog(
+            self._shared_catalog.view, source=str(self._shared_catalog.directory)
+        )
+        return True
+
+    @property
+    def catalog_snapshot(self) -> CatalogSnapshot:
+        """
+        Current catalog snapshot; hold on to it to pin one version.
+        """
+        return self._snapshot
 
-    def set_catalog(self, catalog: Dict[str, Product]) -> None:
-        self._catalog = dict(catalog)
+    @property
+    def catalog_version(self) -> int:
+        """
+        Version of the current snapshot; lets derived caches (serialized
+        payloads, indexes) know when to rebuild.
+        """
+        return self._snapshot.version
 
-    def get_product(self, code: str) -> Product:
+    def get_product(self, code: str, snapshot: Optional[CatalogSnapshot] = None) -> Product:
+        products = (snapshot or self._snapshot).products
         try:
-            return self._catalog[code]
+            return products[code]
         except KeyError as exc:
             raise UnknownProductError(f"Unknown product code: {code}") from exc
 
     def list_products(self) -> List[Product]:
-        return list(self._catalog.values())
+        return self._snapshot.product_list()
 
     # -------------------------
     # Devices
@@ -60,14 +151,184 @@ class CosDenOS:
     # Digital Twin
     # -------------------------
 
-    def load_twin(self, twin: object) -> None:
+    def load_twin(self, twin: Union[object, str, Path]) -> None:
         """
         Attach an external Digital Twin object.
 
         CosDenOS does not interpret it medically; it is
-        treated as a rendering/simulation target.
+        treated as a rendering/simulation target. A
+        twin_render.DigitalTwin can be rendered with render_twin().
+        A path is opened as a memory-mapped twin_file (no copy, no parse).
         """
+        if isinstance(twin, (str, Path)):
+            from .twin_file import open_twin
+
+            twin = open_twin(twin)
         self._twin = twin
+        self._twin_renderer = None
+
+    def attach_twin_store(self, store: TwinStore) -> None:
+        """
+        Serve many users' twins by ID (see twin_store.TwinStore).
+        """
+        self._twin_store = store
+        store.add_listener(self._twin_changed)
+
+    def attach_render_cache(self, cache: RenderCache) -> None:
+        """
+        Cache render_preview() output; cleared whenever the catalog changes.
+        """
+        self._render_cache = cache
+        self.add_catalog_hook(lambda snapshot: cache.clear())
+
+    @property
+    def render_cache(self) -> Optional[RenderCache]:
+        return self._render_cache
+
+    def _twin_changed(self, twin_id: str) -> None:
+        cache = self._render_cache
+        if cache is not None:
+            cache.invalidate_twin(twin_id)
+
+    @property
+    def twin_store(self) -> Optional[TwinStore]:
+        return self._twin_store
+
+    def _require_twin_store(self, twin_id: str) -> TwinStore:
+        store = self._twin_store
+        if store is None:
+            raise UnknownTwinError(f"No twin store attached; cannot load twin {twin_id}")
+        return store
+
+    @traced("engine.render_twin")
+    def render_twin(
+        self,
+        effect: ProductEffect,
+        out: Optional["RenderBuffers"] = None,
+        twin_id: Optional[str] = None,
+    ) -> "RenderBuffers":
+        """
+        Apply an aggregated effect to a DigitalTwin (needs NumPy): the
+        store's twin `twin_id`, or else the twin attached with load_twin().
+
+        See TwinRenderer.render() for buffer reuse rules.
+        """
+        if twin_id is not None:
+            return self._require_twin_store(twin_id).renderer(twin_id).render(effect, out=out)
+
+        from .twin_render import DigitalTwin, TwinRenderer
+
+        twin = self._twin
+        if not isinstance(twin, DigitalTwin):
+            raise CosDenError("No renderable Digital Twin loaded.")
+        renderer = self._twin_renderer
+        if renderer is None or renderer.twin is not twin:
+            renderer = TwinRenderer(twin)
+            self._twin_renderer = renderer
+        return renderer.render(effect, out=out)
+
+    @traced("engine.render_preview")
+    def render_preview(
+        self,
+        codes: Iterable[str],
+        twin_id: str,
+        resolution: Optional[int] = None,
+        age_years: Optional[int] = None,
+    ) -> "RenderBuffers":
+        """
+        Render a product stack on a store twin, through the render cache
+        when one is attached.
+
+        - resolution: max rendered rows (None = full twin)
+        - age_years: if given, age gating is enforced as in simulate_stack
+
+        The returned buffers may be shared with other callers and are
+        read-only; copy them before modifying.
+        """
+        store = self._require_twin_store(twin_id)
+        snapshot = self._snapshot
+        stack = self.build_stack(codes, snapshot)
+        if age_years is not None:
+            for product in stack.products:
+                if not product.is_allowed_for_age(age_years):
+                    raise AgeGateError(
+                        f"Product {product.code} is not allowed for age {age_years}."
+                    )
+
+        def render() -> "RenderBuffers":
+            effect = ProductEffect()
+            for product in stack.products:
+                effect = effect.merge(product.effect)
+            renderer = store.renderer(twin_id, resolution)
+            return renderer.render(effect, out=renderer.allocate_buffers())
+
+        cache = self._render_cache
+        if cache is None:
+            return render()
+        key = RenderKey(
+            twin_id=twin_id,
+            twin_version=store.version(twin_id),
+            catalog_version=snapshot.version,
+            stack=tuple(stack.codes()),
+            resolution=resolution,
+        )
+        return cache.get_or_render(key, render)
+
+    def _refiner(self) -> ThreadPoolExecutor:
+        with self._refine_lock:
+            if self._refine_executor is None:
+                self._refine_executor = ThreadPoolExecutor(
+                    max_workers=_REFINE_WORKERS, thread_name_prefix="cosden-refine"
+                )
+            return self._refine_executor
+
+    def render_progressive(
+        self,
+        codes: Iterable[str],
+        twin_id: str,
+        on_update: Optional[Callable[[Optional[int], "RenderBuffers"], None]] = None,
+        age_years: Optional[int] = None,
+    ) -> ProgressivePreview:
+        """
+        Render a product stack at the twin's coarsest LOD (see TwinStore
+        lod_levels) and return it right away; the finer levels and then
+        the full twin are rendered on a background thread.
+
+        on_update(resolution, buffers) is called from that thread for each
+        refined level, in order, ending with resolution None (full twin).
+        Every level goes through render_preview(), so it is cached and its
+        buffers are read-only.
+        """
+        codes = list(codes)
+        store = self._require_twin_store(twin_id)
+        levels: List[Optional[int]] = [*store.lods(twin_id), None]
+        first = levels.pop(0)
+        preview = self.render_preview(codes, twin_id, resolution=first, age_years=age_years)
+
+        if not levels:
+            done: "Future[RenderBuffers]" = Future()
+            done.set_result(preview)
+            return ProgressivePreview(preview=preview, resolution=first, refined=done)
+
+        cancelled = threading.Event()
+
+        def refine() -> "RenderBuffers":
+            # Age gating already passed for the first level; the stack is fixed.
+            buffers = preview
+            for resolution in levels:
+                if cancelled.is_set():
+                    break
+                buffers = self.render_preview(codes, twin_id, resolution=resolution)
+                if on_update is not None and not cancelled.is_set():
+                    on_update(resolution, buffers)
+            return buffers
+
+        return ProgressivePreview(
+            preview=preview,
+            resolution=first,
+            refined=self._refiner().submit(refine),
+            _cancelled=cancelled,
+        )
 
     @property
     def twin_loaded(self) -> bool:
@@ -77,27 +338,42 @@ class CosDenOS:
     # Stack helpers
     # -------------------------
 
-    def build_stack(self, codes: Iterable[str]) -> ProductStack:
-        products: List[Product] = [self.get_product(code) for code in codes]
+    def build_stack(
+        self,
+        codes: Iterable[str],
+        snapshot: Optional[CatalogSnapshot] = None,
+    ) -> ProductStack:
+        snapshot = snapshot or self._snapshot
+        products: List[Product] = [self.get_product(code, snapshot) for code in codes]
         return ProductStack(products=products)
 
     # -------------------------
     # Simulation
     # -------------------------
 
+    @traced("engine.simulate_stack")
     def simulate_stack(
         self,
         stack: ProductStack,
         age_profile: AgeProfile,
         age_years: int,
+        twin_id: Optional[str] = None,
+        baseline: Optional[ShadeBaseline] = None,
     ) -> SimulationResult:
         """
         Simulate a purely cosmetic effect of a product stack.
 
         - Checks age gating for each product.
         - Aggregates ProductEffect for all products in order.
+        - With a twin_id, targets that twin from the attached TwinStore
+          (only checked to exist; UnknownTwinError if it does not).
+        - With a baseline (HomeScan), projects the user's lightness from
+          their measured starting shade.
         - Returns a SimulationResult with human-readable notes.
         """
+        if twin_id is not None:
+            self._require_twin_store(twin_id).peek_version(twin_id)
+
         aggregated = ProductEffect()
         notes: List[str] = []
 
@@ -116,11 +392,23 @@ class CosDenOS:
                 f"tone={product.effect.tone_shift or 'unchanged'}"
             )
 
-        if self._twin is None:
+        if twin_id is not None:
+            notes.append(
+                f"Digital Twin {twin_id} loaded: effects can be mapped to a 3D model."
+            )
+        elif self._twin is None:
             notes.append("No Digital Twin loaded: visualization-only preview.")
         else:
             notes.append("Digital Twin loaded: effects can be mapped to a 3D model.")
 
+        projected: Optional[float] = None
+        if baseline is not None:
+            projected = baseline.projected_lightness(aggregated)
+            notes.append(
+                f"Measured baseline: lightness {baseline.lightness:.2f} "
+                f"({baseline.tone} cast) → projected {projected:.2f}."
+            )
+
         notes.append(
             f"Age profile: {age_profile.group.value} "
             f"(cosmetic guidance only, no diagnosis)."
@@ -131,12 +419,75 @@ class CosDenOS:
             aggregated_effect=aggregated,
             notes=notes,
             cosmetic_only=True,
+            twin_id=twin_id,
+            baseline_lightness=baseline.lightness if baseline is not None else None,
+            projected_lightness=projected,
+        )
+
+    @traced("engine.simulate_regimen")
+    def simulate_regimen(
+        self,
+        regimens: Sequence["Regimen"],
+        days: int,
+        age_years: Optional[Sequence[int]] = None,
+    ) -> "RegimenTrajectory":
+        """
+        Day-by-day cumulative effects of product schedules for many users
+        at once (see regimen); regimens[i] is user i's schedule.
+
+        - age_years: per-user ages; if given, age gating is enforced for
+          every product in each user's regimen
+        """
+        from .regimen import simulate_regimens
+
+        snapshot = self._snapshot
+        catalog = {
+            code: self.get_product(code, snapshot)
+            for regimen in regimens
+            for code in regimen.codes
+        }
+        if age_years is not None:
+            if len(age_years) != len(regimens):
+                raise ValueError("age_years must have one age per regimen")
+            for regimen, age in zip(regimens, age_years):
+                for code in regimen.codes:
+                    if not catalog[code].is_allowed_for_age(age):
+                        raise AgeGateError(f"Product {code} is not allowed for age {age}.")
+
+        trajectory, _ = simulate_regimens(regimens, days, catalog)
+        return trajectory
+
+    @traced("engine.schedule_for_event")
+    def schedule_for_event(
+        self,
+        goal: CosmeticGoal,
+        age_years: int,
+        sensitivity_flag: bool = False,
+        limits: Optional[ScheduleLimits] = None,
+    ) -> EventSchedule:
+        """
+        Timed applications of age-eligible products that maximize the
+        effect at goal.target_event_hours from now (see event_schedule).
+
+        - limits: defaults to ScheduleLimits.for_user(goal.max_steps, ...)
+        """
+        if goal.target_event_hours is None:
+            raise ValueError("goal has no target_event_hours")
+        products = [
+            p for p in self._snapshot.product_list() if p.is_allowed_for_age(age_years)
+        ]
+        return build_schedule(
+            products,
+            event_hours=goal.target_event_hours,
+            limits=limits or ScheduleLimits.for_user(goal.max_steps, sensitivity_flag),
+            tone_preference=goal.tone_preference,
         )
 
     # -------------------------
     # Recommendation
     # -------------------------
 
+    @traced("engine.recommend_stack_for_goal")
     def recommend_stack_for_goal(
         self,
         age_profile: AgeProfile,
@@ -148,10 +499,11 @@ class CosDenOS:
 
         Uses a simple rule-based planner under the hood (for now).
         """
+        snapshot = self._snapshot
         codes = recommend_stack_codes_for_goal(
-            catalog=self._catalog,
+            catalog=snapshot.products,
             age_profile=age_profile,
             age_years=age_years,
             goal=goal,
         )
-        return self.build_stack(codes)
+        return self.build_stack(codes, snapshot)
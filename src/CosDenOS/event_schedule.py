@@ -0,0 +1,437 @@
+"""
+Event-countdown application schedules.
+
+Given the hours left until an event (CosmeticGoal.target_event_hours),
+build_schedule() picks which age-eligible products to apply and when, so
+that the cosmetic effect *at event time* is as large as possible.
+
+Effects follow the regimen model (see regimen): an application made h
+hours before the event still contributes
+
+    delta[d] * DECAY_PER_DAY[d] ** (h / 24)
+
+per dimension d (brightness, gloss, opalescence), and the accumulated raw
+effect flattens out as CEILING[d] * tanh(raw[d] / CEILING[d]). The score
+is that event-time effect weighted by EVENT_WEIGHTS.
+
+Limits, all from the goal and the user:
+
+- at most max_steps applications, and at most one per time slot
+- total intensity (sum of intensity_level) within intensity_budget, and
+  no product above max_intensity
+- intensive products (intensity_level >= 2) at least
+  INTENSIVE_GAP_HOURS apart
+- with a tone preference, products shifting tone the other way are left out
+
+Search is dynamic programming over the discretized time slots, walking
+back from the event with one decision per slot. Plans that reach the same
+(steps left, intensity left, first slot open to the next intensive
+product) share a table entry, holding one plan per accumulated raw effect
+quantized to RAW_QUANTUM; only the Pareto front of those effects is
+expanded (the score grows with every dimension), products matched by a
+gentler one are dropped, and states whose concave upper bound cannot beat
+the best plan so far are pruned. Every delta is non-negative, so moving
+an application closer to the event never lowers any dimension: an optimal
+plan leaves no slot empty except to wait out the intensive gap, which is
+the only "skip" transition. Slots are fine close to the event (where
+timing matters most) and coarser further out; see slot_hours_before().
+
+Solve time roughly doubles with every extra step, so schedules are
+capped at MAX_SCHEDULE_STEPS applications: five steps over the full week
+with 20 eligible products solve cold in about 15 ms, inside the 50 ms
+per-plan budget (eight steps took over 100 ms). Goals asking for more
+steps get a five-step schedule.
+
+Solved schedules are memoized per constraint set (eligible products,
+slot grid and limits), so users with the same age band, tone and limits,
+and events in the same slot band, share one solve.
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .models import Product, ProductEffect
+
+DIMENSIONS = ("brightness", "gloss", "opalescence")
+
+# Fraction of the accumulated effect left after a day, and the ceilings of
+# the diminishing-returns curve (regimen uses the same model, as arrays).
+DECAY_PER_DAY = (0.97, 0.60, 0.85)
+CEILING = (0.8, 0.6, 0.5)
+
+# How much each dimension counts towards the event-time score.
+EVENT_WEIGHTS = (1.0, 0.6, 0.4)
+
+INTENSIVE_LEVEL = 2
+INTENSIVE_GAP_HOURS = 24
+
+# Applications earlier than this add little at event time; cap the search.
+MAX_HORIZON_HOURS = 7 * 24
+
+# Slot width by distance from the event: (up to hours before, width).
+SLOT_WIDTHS = ((12, 2), (48, 6), (MAX_HORIZON_HOURS, 24))
+
+# Resolution of the accumulated raw effect in the search state.
+RAW_QUANTUM = 0.01
+
+# Most applications a schedule may hold; keeps a cold solve within the
+# per-plan latency budget (see the module docstring).
+MAX_SCHEDULE_STEPS = 5
+
+
+@dataclass(frozen=True)
+class ScheduleLimits:
+    max_steps: int = 4
+    intensity_budget: int = 8
+    max_intensity: int = 3
+
+    @classmethod
+    def for_user(cls, max_steps: int, sensitivity_flag: bool = False) -> "ScheduleLimits":
+        """
+        Default limits for a goal's max_steps: sensitive users get gentle
+        products only and half the intensity budget.
+        """
+        if sensitivity_flag:
+            return cls(max_steps=max_steps, intensity_budget=max_steps, max_intensity=1)
+        return cls(max_steps=max_steps, intensity_budget=2 * max_steps, max_intensity=3)
+
+
+@dataclass
+class ScheduledApplication:
+    code: str
+    hours_before_event: int
+    hours_from_now: int
+
+
+@dataclass
+class EventSchedule:
+    """
+    Timed applications (earliest first) and the projected effect at event
+    time.
+    """
+    event_hours: int
+    applications: List[ScheduledApplication] = field(default_factory=list)
+    effect_at_event: ProductEffect = field(default_factory=ProductEffect)
+    score: float = 0.0
+
+    def codes(self) -> List[str]:
+        return [a.code for a in self.applications]
+
+    def to_dict(self) -> Dict[str, Any]:
+        effect = self.effect_at_event
+        return {
+            "event_hours": self.event_hours,
+            "applications": [
+                {
+                    "code": a.code,
+                    "hours_before_event": a.hours_before_event,
+                    "hours_from_now": a.hours_from_now,
+                }
+                for a in self.applications
+            ],
+            "effect_at_event": {
+                "brightness_delta": effect.brightness_delta,
+                "gloss_delta": effect.gloss_delta,
+                "tone_shift": effect.tone_shift,
+                "opalescence_delta": effect.opalescence_delta,
+            },
+            "score": self.score,
+        }
+
+
+# (code, intensity_level, (brightness, gloss, opalescence) deltas, tone_shift)
+_Candidate = Tuple[str, int, Tuple[float, float, float], Optional[str]]
+
+
+# -------------------------
+# Slots and candidates
+# -------------------------
+
+def slot_hours_before(event_hours: int) -> Tuple[int, ...]:
+    """
+    Hours before the event at which an application can be scheduled,
+    nearest first: every 2 h in the last 12 h, every 6 h up to 48 h, then
+    daily. The grid is fixed, so nearby event times (30 h and 31 h) get
+    the same slots and share a solve.
+    """
+    horizon = min(event_hours, MAX_HORIZON_HOURS)
+    hours: List[int] = []
+    previous = None
+    for limit, width in SLOT_WIDTHS:
+        start = 0 if previous is None else previous + width
+        hours.extend(h for h in range(start, limit + 1, width) if h <= horizon)
+        previous = limit
+    return tuple(hours)
+
+
+def candidates(
+    products: Iterable[Product],
+    limits: ScheduleLimits,
+    tone_preference: Optional[str] = None,
+) -> Tuple[_Candidate, ...]:
+    """
+    Products the schedule may use (callers pass age-eligible ones), as
+    hashable tuples in code order.
+    """
+    chosen: List[_Candidate] = []
+    for p in products:
+        e = p.effect
+        if p.intensity_level > limits.max_intensity:
+            continue
+        if tone_preference and e.tone_shift and e.tone_shift != tone_preference:
+            continue
+        deltas = (e.brightness_delta, e.gloss_delta, e.opalescence_delta)
+        if not any(d > 0.0 for d in deltas):
+            continue  # tone-only products add nothing at event time
+        chosen.append((p.code, p.intensity_level, deltas, e.tone_shift))
+    return tuple(sorted(chosen))
+
+
+# -------------------------
+# Search
+# -------------------------
+
+def _saturated(raw: Tuple[float, ...]) -> Tuple[float, ...]:
+    return tuple(c * math.tanh(r / c) for r, c in zip(raw, CEILING))
+
+
+def _score(raw: Tuple[float, ...]) -> float:
+    return sum(w * v for w, v in zip(EVENT_WEIGHTS, _saturated(raw)))
+
+
+_Plan = Tuple[Tuple[str, int], ...]
+_Raw = Tuple[int, int, int]
+
+
+def _dominated(option: _Candidate, by: _Candidate) -> bool:
+    # `by` does at least as much in every dimension, no more intensely.
+    if option is by or by[1] > option[1]:
+        return False
+    if (by[1] >= INTENSIVE_LEVEL) > (option[1] >= INTENSIVE_LEVEL):
+        return False
+    if by[2] == option[2] and by[1] == option[1]:
+        return by[0] < option[0]  # identical products: keep one
+    return all(b >= o for b, o in zip(by[2], option[2]))
+
+
+def _pareto(states: Dict[_Raw, _Plan]) -> List[Tuple[_Raw, _Plan]]:
+    """
+    States whose raw effect is not matched or beaten in every dimension
+    by another state: sweep in decreasing first dimension, keeping a 2-D
+    staircase of the (second, third) dimensions seen so far.
+    """
+    front: List[Tuple[_Raw, _Plan]] = []
+    seconds: List[int] = []  # staircase, ascending
+    thirds: List[int] = []   # matching thirds, descending
+    for raw, plan in sorted(states.items(), key=lambda item: (-item[0][0], -item[0][1], -item[0][2])):
+        i = bisect_left(seconds, raw[1])
+        if i < len(seconds) and thirds[i] >= raw[2]:
+            continue
+        front.append((raw, plan))
+        j = i
+        while j > 0 and thirds[j - 1] <= raw[2]:
+            j -= 1
+        seconds[j:i] = [raw[1]]
+        thirds[j:i] = [raw[2]]
+    return front
+
+
+@lru_cache(maxsize=4096)
+def _solve(
+    options: Tuple[_Candidate, ...],
+    slots: Tuple[int, ...],
+    limits: ScheduleLimits,
+) -> Tuple[float, _Plan]:
+    """
+    Best (score, ((code, hours_before_event), ...)) for one constraint set.
+    The score is on the quantized raw effect; build_schedule() reports the
+    exact effect of the returned plan.
+
+    Plans whose raw effects round to the same RAW_QUANTUM cell share one
+    table entry, so the returned plan can score slightly below the exact
+    optimum (by a few thousandths in randomized checks against brute
+    force).
+    """
+    # A product matched in every dimension by a gentler (or equally
+    # intense) one is never needed.
+    options = tuple(o for o in options if not any(_dominated(o, by) for by in options))
+    n = len(slots)
+    # Event-time gain of each option in each slot, in RAW_QUANTUM units.
+    gains = [
+        [
+            tuple(
+                round(d * rate ** (h / 24.0) / RAW_QUANTUM)
+                for d, rate in zip(deltas, DECAY_PER_DAY)
+            )
+            for (_, _, deltas, _) in options
+        ]
+        for h in slots
+    ]
+    # After an intensive product in slot s, the next one may go in slot
+    # reopen[s] or later.
+    reopen = [
+        next((j for j in range(s, n) if slots[j] >= slots[s] + INTENSIVE_GAP_HOURS), n)
+        for s in range(n)
+    ]
+    # Past 4 * CEILING the curve is flat (tanh(4) > 0.999): merge those states.
+    cap = tuple(round(4.0 * c / RAW_QUANTUM) for c in CEILING)
+
+    def score(raw: _Raw) -> float:
+        return _score(tuple(q * RAW_QUANTUM for q in raw))
+
+    # reach[slot][k][d]: most of dimension d that k more applications from
+    # `slot` on can add (gains shrink with distance from the event, so at
+    # most the best option in each of the next k slots).
+    best_gain = [tuple(max(g[d] for g in gains[j]) for d in range(3)) for j in range(n)]
+    reach: List[List[_Raw]] = []
+    for slot in range(n + 1):
+        row: List[_Raw] = [(0, 0, 0)]
+        for k in range(limits.max_steps):
+            extra = best_gain[slot + k] if slot + k < n else (0, 0, 0)
+            row.append((row[-1][0] + extra[0], row[-1][1] + extra[1], row[-1][2] + extra[2]))
+        reach.append(row)
+
+    def bound(slot: int, steps: int, raw: _Raw) -> float:
+        # The curve is concave: from raw, a dimension gains at most its
+        # current slope times the raw effect added, and stays below its
+        # ceiling.
+        total = 0.0
+        for d in range(3):
+            t = math.tanh(raw[d] * RAW_QUANTUM / CEILING[d])
+            added = (1.0 - t * t) * reach[slot][steps][d] * RAW_QUANTUM
+            total += EVENT_WEIGHTS[d] * (CEILING[d] * t + min(added, CEILING[d] * (1.0 - t)))
+        return total
+
+    def greedy() -> Tuple[float, _Plan]:
+        # Best single addition per slot, nearest first; a good incumbent
+        # from the start lets bound() discard most states.
+        raw: _Raw = (0, 0, 0)
+        plan: _Plan = ()
+        steps, intensity, blocked = limits.max_steps, limits.intensity_budget, 0
+        for slot in range(n):
+            choice = None
+            for (code, level, _, _), gain in zip(options, gains[slot]):
+                intensive = level >= INTENSIVE_LEVEL
+                if steps == 0 or level > intensity or (intensive and slot < blocked):
+                    continue
+                after = (
+                    min(raw[0] + gain[0], cap[0]),
+                    min(raw[1] + gain[1], cap[1]),
+                    min(raw[2] + gain[2], cap[2]),
+                )
+                if choice is None or score(after) > choice[0]:
+                    choice = (score(after), code, level, intensive, after)
+            if choice is not None:
+                _, code, level, intensive, raw = choice
+                plan += ((code, slots[slot]),)
+                steps, intensity = steps - 1, intensity - level
+                if intensive:
+                    blocked = reopen[slot]
+        return score(raw), plan
+
+    # table[slot][(steps, intensity, blocked, intensive_only)][raw]: a plan
+    # deciding every slot before `slot` that reaches that state. Equal
+    # (quantized) raw effects share an entry, and each slot only expands
+    # the Pareto front of its states: the score only grows with each raw
+    # dimension, so a dominated plan can never finish ahead.
+    table: List[Dict[Tuple[int, int, int, bool], Dict[_Raw, _Plan]]] = [{} for _ in range(n + 1)]
+    table[0][(limits.max_steps, limits.intensity_budget, 0, False)] = {(0, 0, 0): ()}
+    best_score, best_plan = greedy()
+
+    def offer(slot: int, key: Tuple[int, int, int, bool], raw: _Raw, plan: _Plan) -> None:
+        table[slot].setdefault(key, {}).setdefault(raw, plan)
+
+    for slot in range(n + 1):
+        for (steps, intensity, blocked, intensive_only), states in table[slot].items():
+            for raw, plan in _pareto(states):
+                value = score(raw)
+                if value > best_score + 1e-12:
+                    best_score, best_plan = value, plan
+                if slot == n or steps == 0 or bound(slot, steps, raw) <= best_score + 1e-12:
+                    continue
+                hours = slots[slot]
+                for (code, level, _, _), gain in zip(options, gains[slot]):
+                    intensive = level >= INTENSIVE_LEVEL
+                    if level > intensity or (intensive and slot < blocked):
+                        continue
+                    if intensive_only and not intensive:
+                        continue
+                    offer(
+                        slot + 1,
+                        (steps - 1, intensity - level, reopen[slot] if intensive else blocked, intensive_only),
+                        (
+                            min(raw[0] + gain[0], cap[0]),
+                            min(raw[1] + gain[1], cap[1]),
+                            min(raw[2] + gain[2], cap[2]),
+                        ),
+                        plan + ((code, hours),),
+                    )
+                # Leaving slots empty only pays off to wait for the
+                # intensive gap: skip straight to the first slot where one
+                # is allowed again, and place only intensive products from
+                # there (a gentle product would do better in the empty slot).
+                if blocked > slot:
+                    offer(blocked, (steps, intensity, blocked, True), raw, plan)
+        table[slot] = {}  # no longer needed
+
+    return best_score, best_plan
+
+
+def build_schedule(
+    products: Iterable[Product],
+    event_hours: int,
+    limits: ScheduleLimits,
+    tone_preference: Optional[str] = None,
+) -> EventSchedule:
+    """
+    The best schedule of the given (age-eligible) products for an event
+    event_hours from now, with at most MAX_SCHEDULE_STEPS applications.
+    """
+    if event_hours < 0:
+        raise ValueError("event_hours must be non-negative")
+    if limits.max_steps > MAX_SCHEDULE_STEPS:
+        limits = replace(limits, max_steps=MAX_SCHEDULE_STEPS)
+    options = candidates(products, limits, tone_preference)
+    if not options or limits.max_steps <= 0:
+        return EventSchedule(event_hours=event_hours)
+
+    _, plan = _solve(options, slot_hours_before(event_hours), limits)
+
+    # Event-time effect of the chosen plan; the latest toning application
+    # sets the tone, as in ProductEffect.merge.
+    by_code = {option[0]: option for option in options}
+    raw = [0.0, 0.0, 0.0]
+    tone: Optional[str] = None
+    tone_hours = math.inf
+    for code, hours in plan:
+        _, _, deltas, tone_shift = by_code[code]
+        for d in range(3):
+            raw[d] += deltas[d] * DECAY_PER_DAY[d] ** (hours / 24.0)
+        if tone_shift and hours < tone_hours:
+            tone, tone_hours = tone_shift, hours
+    brightness, gloss, opalescence = _saturated(tuple(raw))
+
+    return EventSchedule(
+        event_hours=event_hours,
+        applications=[
+            ScheduledApplication(code=code, hours_before_event=hours, hours_from_now=event_hours - hours)
+            for code, hours in sorted(plan, key=lambda item: -item[1])
+        ],
+        effect_at_event=ProductEffect(
+            brightness_delta=round(brightness, 4),
+            gloss_delta=round(gloss, 4),
+            tone_shift=tone,
+            opalescence_delta=round(opalescence, 4),
+        ),
+        score=round(_score(tuple(raw)), 4),
+    )
+
+
+def cache_info() -> Dict[str, int]:
+    info = _solve.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
@@ -0,0 +1,240 @@
+"""
+HomeScan: baseline shade estimation from user photos.
+
+A scan is an RGB photo plus a tooth label map of the same height and width:
+
+    image   (H, W, 3) uint8 (or float in [0, 1])
+    labels  (H, W)    integer tooth labels (e.g. FDI numbers), 0 = not tooth;
+                      a bool mask counts as one region, label 1
+
+region_stats() reduces every labelled region in one pass of np.bincount
+over the flattened scan, with no per-region or per-pixel Python loop.
+estimate_baseline() pools one or more scans into a ShadeBaseline for
+CosmeticUserProfile.baseline, so plans and simulations start from the
+user's measured shade.
+
+Scans on disk are .npz files holding "image" and "labels" (or "mask").
+Score a folder of uploads on a process pool, one baseline per file:
+
+    python -m CosDenOS.homescan <scan-dir> [workers]
+
+Appearance measures only; nothing here is diagnostic.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .twin_render import LUMA, np
+from .user_profile import ShadeBaseline
+
+PathLike = Union[str, Path]
+
+Scan = Tuple[np.ndarray, np.ndarray]
+
+
+@dataclass
+class RegionStats:
+    """
+    Appearance statistics of one labelled region, on [0, 1] scales.
+    """
+    label: int
+    pixels: int
+    mean_rgb: Tuple[float, float, float]
+    lightness: float
+    lightness_std: float
+    warmth: float
+
+
+# -------------------------
+# Reductions
+# -------------------------
+
+def _sums(image: np.ndarray, labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-label pixel counts and sums of (R, G, B), lightness and
+    lightness², indexed by label (row 0 is the background).
+    """
+    if image.ndim != 3 or image.shape[2] != 3:
+        raise ValueError("image must have shape (H, W, 3)")
+    if labels.shape != image.shape[:2]:
+        raise ValueError(f"labels must have shape {image.shape[:2]}")
+    if labels.dtype == np.bool_:
+        labels = labels.view(np.uint8)
+    elif not np.issubdtype(labels.dtype, np.integer):
+        raise ValueError("labels must be an integer label map or a bool mask")
+
+    peak = 255.0 if np.issubdtype(image.dtype, np.integer) else 1.0
+    flat = labels.reshape(-1)
+    if flat.size and flat.min() < 0:
+        raise ValueError("labels must be non-negative")
+    rgb = image.reshape(-1, 3).astype(np.float32)
+    rgb *= np.float32(1.0 / peak)
+    luma = rgb @ LUMA
+
+    size = int(flat.max()) + 1 if flat.size else 1
+    counts = np.bincount(flat, minlength=size)
+    channel_sums = np.stack(
+        [np.bincount(flat, weights=rgb[:, c], minlength=size) for c in range(3)], axis=1
+    )
+    luma_sums = np.bincount(flat, weights=luma, minlength=size)
+    luma_sq = np.bincount(flat, weights=luma * luma, minlength=size)
+    return counts, channel_sums, luma_sums, luma_sq
+
+
+def region_stats(image: np.ndarray, labels: np.ndarray) -> Dict[int, RegionStats]:
+    """
+    Statistics for every non-zero label present in the scan.
+    """
+    counts, channel_sums, luma_sums, luma_sq = _sums(image, labels)
+    stats: Dict[int, RegionStats] = {}
+    for label in np.flatnonzero(counts[1:]) + 1:
+        n = int(counts[label])
+        mean = channel_sums[label] / n
+        lightness = float(luma_sums[label] / n)
+        variance = max(0.0, float(luma_sq[label] / n) - lightness * lightness)
+        stats[int(label)] = RegionStats(
+            label=int(label),
+            pixels=n,
+            mean_rgb=(float(mean[0]), float(mean[1]), float(mean[2])),
+            lightness=lightness,
+            lightness_std=variance ** 0.5,
+            warmth=float(mean[0] - mean[2]),
+        )
+    return stats
+
+
+def estimate_baseline(scans: Iterable[Scan]) -> ShadeBaseline:
+    """
+    Pool the tooth pixels of one or more scans of the same user into a
+    ShadeBaseline (pixel-weighted, so larger, closer shots count more).
+    """
+    counts = channel_sums = luma_sums = luma_sq = None
+    scan_count = 0
+    for image, labels in scans:
+        parts = _sums(image, labels)
+        if counts is None:
+            counts, channel_sums, luma_sums, luma_sq = parts
+        else:
+            counts, channel_sums, luma_sums, luma_sq = (
+                _add_padded(total, part)
+                for total, part in zip((counts, channel_sums, luma_sums, luma_sq), parts)
+            )
+        scan_count += 1
+
+    if counts is None or counts[1:].sum() == 0:
+        raise ValueError("No tooth pixels found in the scans")
+
+    n = int(counts[1:].sum())
+    mean = channel_sums[1:].sum(axis=0) / n
+    lightness = float(luma_sums[1:].sum() / n)
+    variance = max(0.0, float(luma_sq[1:].sum() / n) - lightness * lightness)
+    present = np.flatnonzero(counts[1:]) + 1
+    return ShadeBaseline(
+        lightness=lightness,
+        lightness_std=variance ** 0.5,
+        warmth=float(mean[0] - mean[2]),
+        tooth_lightness={
+            int(label): float(luma_sums[label] / counts[label]) for label in present
+        },
+        pixels=n,
+        scans=scan_count,
+    )
+
+
+def _add_padded(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Per-label arrays from scans whose highest label differs.
+    if len(a) < len(b):
+        a, b = b, a
+    total = a.copy()
+    total[: len(b)] += b
+    return total
+
+
+# -------------------------
+# Files and batch mode
+# -------------------------
+
+def load_scan(path: PathLike) -> Scan:
+    with np.load(path) as data:
+        image = data["image"]
+        labels = data["labels"] if "labels" in data else data["mask"]
+    return image, labels
+
+
+def _baseline_for_file(path: str) -> Tuple[str, Optional[ShadeBaseline], Optional[str]]:
+    # Runs in a worker process; errors are returned, not raised, so one bad
+    # upload does not fail the batch. A damaged .npz can fail in many ways
+    # (BadZipFile, EOFError, UnpicklingError, ...), so catch them all here.
+    try:
+        return path, estimate_baseline([load_scan(path)]), None
+    except Exception as exc:
+        return path, None, f"{type(exc).__name__}: {exc}"
+
+
+def scan_folder(
+    directory: PathLike,
+    workers: Optional[int] = None,
+    pattern: str = "*.npz",
+) -> Tuple[Dict[str, ShadeBaseline], Dict[str, str]]:
+    """
+    Estimate a baseline for every scan file in a directory on a process
+    pool. Returns (baselines, errors), both keyed by file stem.
+    """
+    paths = sorted(str(p) for p in Path(directory).glob(pattern))
+    baselines: Dict[str, ShadeBaseline] = {}
+    errors: Dict[str, str] = {}
+    if not paths:
+        return baselines, errors
+
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    if workers <= 1:
+        results: Iterable[Tuple[str, Optional[ShadeBaseline], Optional[str]]] = map(
+            _baseline_for_file, paths
+        )
+        return _collect(results, baselines, errors)
+
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return _collect(
+            pool.map(_baseline_for_file, paths, chunksize=chunksize), baselines, errors
+        )
+
+
+def _collect(
+    results: Iterable[Tuple[str, Optional[ShadeBaseline], Optional[str]]],
+    baselines: Dict[str, ShadeBaseline],
+    errors: Dict[str, str],
+) -> Tuple[Dict[str, ShadeBaseline], Dict[str, str]]:
+    for path, baseline, error in results:
+        stem = Path(path).stem
+        if baseline is not None:
+            baselines[stem] = baseline
+        else:
+            errors[stem] = error or "unknown error"
+    return baselines, errors
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) not in (1, 2):
+        print("usage: python -m CosDenOS.homescan <scan-dir> [workers]")
+        raise SystemExit(2)
+
+    baselines, errors = scan_folder(args[0], workers=int(args[1]) if len(args) == 2 else None)
+    for stem, baseline in baselines.items():
+        print(json.dumps({"scan": stem, "baseline": baseline.to_dict()}))
+    for stem, error in errors.items():
+        print(json.dumps({"scan": stem, "error": error}))
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,369 @@
 from __future__ import annotations
 
+import atexit
+import itertools
 import json
+import os
+import queue
+import random
 import sys
-from datetime import datetime
-from typing import Any, Dict, Optional
+import threading
+import time
+import warnings
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+
+# -------------------------
+# Level gating + sampling config
+# -------------------------
+
+_LEVELS: Dict[str, int] = {
+    "DEBUG": 10,
+    "INFO": 20,
+    "WARN": 30,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
+
+
+@dataclass(frozen=True)
+class LogConfig:
+    """
+    Which events log_event() keeps.
+
+    - min_level: records below this level are skipped
+    - sample_rates: per-event-name keep probability in [0, 1]; events not
+      listed are always kept (subject to min_level)
+    """
+    min_level: int = _LEVELS["INFO"]
+    sample_rates: Dict[str, float] = field(default_factory=dict)
+
+
+def _config_warning(message: str) -> None:
+    # log_event() is not usable while its own config is being built.
+    warnings.warn(f"CosDen logging config: {message}", RuntimeWarning, stacklevel=3)
+
+
+def _sample_rate(name: str, value: Any) -> Optional[float]:
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        _config_warning(f"ignoring sample rate {name}={value!r}: not a number")
+        return None
+    if rate != rate:  # NaN
+        _config_warning(f"ignoring sample rate {name}={value!r}: not a number")
+        return None
+    return min(1.0, max(0.0, rate))
+
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse "health_check=0.01,stegcore_heartbeat=0.1"; bad entries are
+    skipped with a warning.
+    """
+    rates: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, sep, value = part.strip().partition("=")
+        if not sep:
+            continue
+        rate = _sample_rate(name.strip(), value)
+        if rate is not None:
+            rates[name.strip()] = rate
+    return rates
+
+
+def _read_config_file(path: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(Path(path).read_text())
+    except (OSError, ValueError) as exc:
+        _config_warning(f"ignoring COSDEN_LOG_CONFIG={path!r}: {exc}")
+        return {}
+    if not isinstance(data, dict):
+        _config_warning(f"ignoring COSDEN_LOG_CONFIG={path!r}: expected a JSON object")
+        return {}
+    return data
+
+
+def load_log_config() -> LogConfig:
+    """
+    Build a LogConfig from COSDEN_LOG_CONFIG (JSON file with "level" and
+    "sample_rates"), then COSDEN_LOG_LEVEL / COSDEN_LOG_SAMPLE overrides.
+
+    Never raises: an unreadable file or bad entry is skipped with a
+    RuntimeWarning and the defaults apply, so a logging knob cannot make
+    the package unimportable.
+    """
+    level: Any = "INFO"
+    rates: Dict[str, float] = {}
+
+    config_file = os.getenv("COSDEN_LOG_CONFIG")
+    if config_file:
+        data = _read_config_file(config_file)
+        level = data.get("level", level)
+        file_rates = data.get("sample_rates", {})
+        if not isinstance(file_rates, dict):
+            _config_warning("ignoring sample_rates in COSDEN_LOG_CONFIG: expected an object")
+            file_rates = {}
+        for name, value in file_rates.items():
+            rate = _sample_rate(name, value)
+            if rate is not None:
+                rates[name] = rate
+
+    level = os.getenv("COSDEN_LOG_LEVEL", level)
+    rates.update(_parse_sample_rates(os.getenv("COSDEN_LOG_SAMPLE", "")))
+
+    if not isinstance(level, str) or level.upper() not in _LEVELS:
+        _config_warning(f"unknown log level {level!r}; using INFO")
+        level = "INFO"
+    return LogConfig(min_level=_LEVELS[level.upper()], sample_rates=rates)
+
+
+_config: LogConfig = load_log_config()
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+) -> LogConfig:
+    """
+    Replace the active level / sampling config (None keeps env defaults).
+    """
+    global _config
+    base = load_log_config()
+    _config = LogConfig(
+        min_level=_LEVELS.get(level.upper(), base.min_level) if level else base.min_level,
+        sample_rates=dict(sample_rates) if sample_rates is not None else base.sample_rates,
+    )
+    return _config
+
+
+# -------------------------
+# Cached coarse timestamps
+# -------------------------
+
+class _CoarseClock:
+    """
+    ISO-8601 UTC timestamps with millisecond precision.
+
+    The "YYYY-MM-DDTHH:MM:SS" prefix is formatted once per second and
+    reused; per event only the milliseconds are appended.
+    """
+
+    def __init__(self) -> None:
+        # (whole second, formatted prefix), replaced as one tuple.
+        self._cached: Tuple[int, str] = (-1, "")
+
+    def now_iso(self) -> str:
+        now = time.time()
+        sec = int(now)
+        cached_sec, prefix = self._cached
+        if sec != cached_sec:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+            self._cached = (sec, prefix)
+        return f"{prefix}.{int((now - sec) * 1000):03d}Z"
+
+
+_clock = _CoarseClock()
+
+
+class BackgroundLogWriter:
+    """
+    Queue-backed log writer that batches records into large writes.
+
+    log_event() only formats the line and enqueues it; a daemon thread
+    drains the queue and issues one write + flush per batch, so request
+    threads never block on stdout.
+
+    - max_queue: bound on buffered records
+    - full_policy: "drop" (count and discard) or "block" (wait up to
+      block_timeout seconds for room, then drop)
+    - stop() drains everything still queued before returning
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        max_queue: int = 10000,
+        full_policy: str = "drop",
+        batch_size: int = 512,
+        flush_interval: float = 0.05,
+        block_timeout: float = 1.0,
+    ) -> None:
+        if full_policy not in ("drop", "block"):
+            raise ValueError(f"Unknown log queue full_policy: {full_policy}")
+        self._stream = stream
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max_queue)
+        self.full_policy = full_policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+
+        # itertools.count.__next__ is atomic under the GIL: no lock needed.
+        self._enqueued = itertools.count()
+        self._dropped = itertools.count()
+        self._written = itertools.count()
+        self._enqueued_total = 0
+        self._dropped_total = 0
+        self._written_total = 0
+
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------
+    # Producer side
+    # ------------------------------
+
+    def submit(self, line: str) -> bool:
+        """
+        Enqueue one formatted line; False if it was dropped.
+        """
+        try:
+            if self.full_policy == "block":
+                self._queue.put(line, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(line)
+        except queue.Full:
+            self._dropped_total = next(self._dropped) + 1
+            return False
+        self._enqueued_total = next(self._enqueued) + 1
+        return True
+
+    # ------------------------------
+    # Consumer side
+    # ------------------------------
+
+    def _write(self, lines: List[str]) -> None:
+        stream = self._stream or sys.stdout
+        stream.write("".join(lines))
+        stream.flush()
+        for _ in lines:
+            self._written_total = next(self._written) + 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch: List[str] = []
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                else:
+                    batch.append(item)  # type: ignore[arg-type]
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:  # pragma: no cover - never kill the writer
+                    pass
+
+        # Drain anything enqueued after the stop marker.
+        leftover: List[str] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                leftover.append(item)  # type: ignore[arg-type]
+        if leftover:
+            self._write(leftover)
+
+    # ------------------------------
+    # Lifecycle
+    # ------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="cosden-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Flush all queued records and stop the writer thread.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(self._STOP)
+        thread.join(timeout=timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued_total": self._enqueued_total,
+            "dropped_total": self._dropped_total,
+            "written_total": self._written_total,
+        }
+
+
+_writer: Optional[BackgroundLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def start_background_logging(
+    max_queue: Optional[int] = None,
+    full_policy: Optional[str] = None,
+    stream: Optional[TextIO] = None,
+) -> BackgroundLogWriter:
+    """
+    Route log_event() through a BackgroundLogWriter.
+
+    Defaults come from COSDEN_LOG_QUEUE_SIZE and COSDEN_LOG_FULL_POLICY.
+    Queued records are flushed on stop_background_logging() and at exit.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            writer = BackgroundLogWriter(
+                stream=stream,
+                max_queue=max_queue or int(os.getenv("COSDEN_LOG_QUEUE_SIZE", "10000")),
+                full_policy=full_policy or os.getenv("COSDEN_LOG_FULL_POLICY", "drop"),
+            )
+            writer.start()
+            _writer = writer
+        return _writer
+
+
+def stop_background_logging() -> None:
+    """
+    Flush queued records and go back to synchronous writes.
+    """
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+atexit.register(stop_background_logging)
+
+
+def log_stats() -> Dict[str, int]:
+    """
+    Counters of the background writer (all zero in synchronous mode).
+    """
+    writer = _writer
+    if writer is None:
+        return {"queued": 0, "enqueued_total": 0, "dropped_total": 0, "written_total": 0}
+    return writer.stats()
 
 
 def log_event(
@@ -15,24 +375,50 @@ def log_event(
     Minimal structured logger for CosDenOS.
 
     Writes a single JSON line to stdout so that containers / gateways / log
-    collectors can parse events consistently.
+    collectors can parse events consistently. If background logging is
+    started, the line is handed to the writer thread instead.
+
+    Events below the configured level, or not picked by their event's
+    sample rate, return before any record or JSON work is done. Sampled
+    records carry "sample_rate" so collectors can re-scale counts.
 
     Example output:
     {
-      "ts": "2025-11-25T12:34:56.789012Z",
+      "ts": "2025-11-25T12:34:56.789Z",
       "level": "INFO",
       "event": "plan_request",
       "endpoint": "/plan",
       "age_years": 35
     }
     """
+    config = _config
+    level_no = _LEVELS.get(level)
+    if level_no is None:
+        level = level.upper()
+        level_no = _LEVELS.get(level, _LEVELS["INFO"])
+    if level_no < config.min_level:
+        return
+
+    rate = config.sample_rates.get(event)
+    if rate is not None and (rate <= 0.0 or random.random() >= rate):
+        return
+
     record: Dict[str, Any] = {
-        "ts": datetime.utcnow().isoformat() + "Z",
-        "level": level.upper(),
+        "ts": _clock.now_iso(),
+        "level": level,
         "event": event,
     }
+    if rate is not None and rate < 1.0:
+        record["sample_rate"] = rate
     if extra:
         record.update(extra)
 
-    sys.stdout.write(json.dumps(record) + "\n")
+    line = json.dumps(record) + "\n"
+
+    writer = _writer
+    if writer is not None:
+        writer.submit(line)
+        return
+
+    sys.stdout.write(line)
     sys.stdout.flush()
@@ -0,0 +1,379 @@
+"""
+Prometheus-style metrics for the CosDenOS API.
+
+Counters and histograms are aggregated per thread: every thread writes to
+its own shard (no locks, no shared dict mutation), and /metrics merges
+the shards at scrape time. Gauges are callbacks evaluated at scrape time.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+Labels = Tuple[Tuple[str, str], ...]
+GaugeValue = Union[float, Dict[Labels, float]]
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+def label_set(**labels: Any) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+@dataclass
+class _Shard:
+    counters: Dict[Tuple[str, Labels], float] = field(default_factory=dict)
+    # (name, labels) -> [bucket_0 .. bucket_n, +Inf count, sum]
+    histograms: Dict[Tuple[str, Labels], List[float]] = field(default_factory=dict)
+    owner: Optional[threading.Thread] = None  # the only thread writing to it
+
+    def fold_into(
+        self,
+        counters: Dict[Tuple[str, Labels], float],
+        histograms: Dict[Tuple[str, Labels], List[float]],
+    ) -> None:
+        # dict.copy() is atomic under the GIL, so no lock on the writer.
+        for key, value in self.counters.copy().items():
+            counters[key] = counters.get(key, 0.0) + value
+        for key, entry in self.histograms.copy().items():
+            merged = histograms.setdefault(key, [0.0] * len(entry))
+            for i, v in enumerate(list(entry)):
+                merged[i] += v
+
+
+@dataclass(frozen=True)
+class _Family:
+    kind: str
+    help: str
+    buckets: Tuple[float, ...] = ()
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        # Totals of shards whose thread has exited (threadpool workers are
+        # retired when idle), so scrapes do not merge dead shards forever.
+        self._retired = _Shard()
+        self._shards_lock = threading.Lock()  # once per new thread, and per scrape
+        self._families: Dict[str, _Family] = {}
+        self._gauges: Dict[str, Callable[[], GaugeValue]] = {}
+
+    # ------------------------------
+    # Declaration
+    # ------------------------------
+
+    def counter(self, name: str, help: str) -> None:
+        self._families[name] = _Family("counter", help)
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self._families[name] = _Family("histogram", help, tuple(buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], GaugeValue]) -> None:
+        """
+        Register (or replace) a gauge evaluated at scrape time.
+
+        fn returns a float, or a {labels: value} dict for labelled gauges.
+        """
+        self._families[name] = _Family("gauge", help)
+        self._gauges[name] = fn
+
+    # ------------------------------
+    # Hot path
+    # ------------------------------
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(owner=threading.current_thread())
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1.0) -> None:
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = self._families[name].buckets
+        histograms = self._shard().histograms
+        key = (name, labels)
+        entry = histograms.get(key)
+        if entry is None:
+            entry = [0.0] * (len(buckets) + 2)
+            histograms[key] = entry
+        entry[bisect_left(buckets, value)] += 1
+        entry[-1] += value
+
+    # ------------------------------
+    # Scrape side
+    # ------------------------------
+
+    def _merged(self) -> Tuple[Dict[Tuple[str, Labels], float], Dict[Tuple[str, Labels], List[float]]]:
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        with self._shards_lock:
+            live: List[_Shard] = []
+            for shard in self._shards:
+                if shard.owner is None or shard.owner.is_alive():
+                    live.append(shard)
+                else:
+                    # Its thread is gone, so nothing writes to it any more.
+                    shard.fold_into(self._retired.counters, self._retired.histograms)
+            self._shards = live
+            self._retired.fold_into(counters, histograms)
+        for shard in live:
+            shard.fold_into(counters, histograms)
+        return counters, histograms
+
+    def counter_value(self, name: str, labels: Labels = ()) -> float:
+        counters, _ = self._merged()
+        return counters.get((name, labels), 0.0)
+
+    def histogram_merged(self, name: str) -> List[float]:
+        """
+        Bucket counts (plus +Inf count and sum) summed over all label sets.
+        """
+        _, histograms = self._merged()
+        merged = [0.0] * (len(self._families[name].buckets) + 2)
+        for (hname, _), entry in histograms.items():
+            if hname == name:
+                for i, v in enumerate(entry):
+                    merged[i] += v
+        return merged
+
+    def histogram_totals(self, name: str) -> Tuple[float, float]:
+        """
+        (observation count, sum) across all label sets of a histogram.
+        """
+        _, histograms = self._merged()
+        count = total = 0.0
+        for (hname, _), entry in histograms.items():
+            if hname == name:
+                count += sum(entry[:-1])
+                total += entry[-1]
+        return count, total
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        counters, histograms = self._merged()
+        lines: List[str] = []
+
+        for name, family in sorted(self._families.items()):
+            lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.kind}")
+
+            if family.kind == "counter":
+                for (cname, labels), value in sorted(counters.items()):
+                    if cname == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+            elif family.kind == "histogram":
+                for (hname, labels), entry in sorted(histograms.items()):
+                    if hname != name:
+                        continue
+                    cumulative = 0.0
+                    for bound, count in zip(family.buckets, entry):
+                        cumulative += count
+                        lines.append(
+                            f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative:g}"
+                        )
+                    cumulative += entry[len(family.buckets)]
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {cumulative:g}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {entry[-1]:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {cumulative:g}")
+
+            else:
+                try:
+                    value = self._gauges[name]()
+                except Exception:  # pragma: no cover - a broken gauge must not fail the scrape
+                    continue
+                items: Iterable[Tuple[Labels, float]] = (
+                    value.items() if isinstance(value, dict) else [((), value)]
+                )
+                for labels, v in items:
+                    lines.append(f"{name}{_format_labels(labels)} {float(v):g}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REGISTRY.counter("cosden_requests_total", "HTTP requests by endpoint, method and status.")
+REGISTRY.counter("cosden_request_errors_total", "Request errors by endpoint and CosDenError type.")
+REGISTRY.histogram("cosden_request_latency_seconds", "HTTP request latency by endpoint.")
+REGISTRY.histogram("cosden_stage_latency_seconds", "Latency of internal request stages.")
+REGISTRY.counter("cosden_cache_requests_total", "In-process cache lookups by cache and result.")
+REGISTRY.counter("cosden_telemetry_events_total", "Device telemetry events by result.")
+
+# Span name -> stage label for cosden_stage_latency_seconds.
+STAGE_SPANS: Dict[str, str] = {
+    "planner.interpret_goal": "interpret",
+    "engine.recommend_stack_for_goal": "recommend",
+    "engine.simulate_stack": "simulate",
+    "engine.simulate_regimen": "regimen",
+    "engine.schedule_for_event": "schedule",
+    "engine.render_twin": "render",
+    "engine.render_preview": "preview",
+    "planner.build_plan_response": "build",
+    "api.build_response": "build",
+    "api.serialize": "serialize",
+}
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    REGISTRY.inc(
+        "cosden_cache_requests_total",
+        label_set(cache=cache, result="hit" if hit else "miss"),
+    )
+
+
+def record_telemetry(accepted: int, rejected: int, dropped: int) -> None:
+    for result, count in (("accepted", accepted), ("rejected", rejected), ("dropped", dropped)):
+        if count:
+            REGISTRY.inc("cosden_telemetry_events_total", label_set(result=result), count)
+
+
+def record_error(endpoint: str, exc: BaseException) -> None:
+    REGISTRY.inc(
+        "cosden_request_errors_total",
+        label_set(endpoint=endpoint, error=type(exc).__name__),
+    )
+
+
+def histogram_quantile(buckets: Tuple[float, ...], counts: List[float], q: float) -> float:
+    """
+    Estimate a quantile from per-bucket counts (non-cumulative, +Inf last),
+    interpolating linearly inside the bucket like Prometheus does.
+    """
+    total = sum(counts)
+    if total <= 0:
+        return 0.0
+    rank = q * total
+    seen = 0.0
+    for i, count in enumerate(counts):
+        if seen + count >= rank and count > 0:
+            if i >= len(buckets):
+                return buckets[-1]
+            lower = buckets[i - 1] if i > 0 else 0.0
+            return lower + (buckets[i] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+
+class LoadSampler:
+    """
+    Live load figures over the window since the previous sample():
+    QPS, p50/p99 request latency and the in-process cache hit ratio.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY) -> None:
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._last_time = time.monotonic()
+        self._last_latency = registry.histogram_merged("cosden_request_latency_seconds")
+        self._last_cache = self._cache_totals()
+
+    def _cache_totals(self) -> Tuple[float, float]:
+        counters, _ = self.registry._merged()
+        hits = misses = 0.0
+        for (name, labels), value in counters.items():
+            if name == "cosden_cache_requests_total":
+                if ("result", "hit") in labels:
+                    hits += value
+                else:
+                    misses += value
+        return hits, misses
+
+    def sample(self) -> Dict[str, float]:
+        with self._lock:
+            now = time.monotonic()
+            latency = self.registry.histogram_merged("cosden_request_latency_seconds")
+            hits, misses = self._cache_totals()
+
+            window = [a - b for a, b in zip(latency[:-1], self._last_latency[:-1])]
+            elapsed = max(now - self._last_time, 1e-9)
+            d_hits = hits - self._last_cache[0]
+            d_lookups = d_hits + misses - self._last_cache[1]
+
+            self._last_time, self._last_latency = now, latency
+            self._last_cache = (hits, misses)
+
+        buckets = self.registry._families["cosden_request_latency_seconds"].buckets
+        return {
+            "qps": round(sum(window) / elapsed, 3),
+            "latency_p50_ms": round(histogram_quantile(buckets, window, 0.50) * 1000, 3),
+            "latency_p99_ms": round(histogram_quantile(buckets, window, 0.99) * 1000, 3),
+            "cache_hit_ratio": round(d_hits / d_lookups, 4) if d_lookups > 0 else 0.0,
+        }
+
+
+def record_stage(span_name: str, seconds: float) -> None:
+    """
+    Stage timer (see tracing.add_stage_timer) feeding per-stage latency
+    histograms.
+    """
+    stage = STAGE_SPANS.get(span_name)
+    if stage is not None:
+        REGISTRY.observe("cosden_stage_latency_seconds", label_set(stage=stage), seconds)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware counting requests and timing them per route.
+    """
+
+    def __init__(self, app: Any, registry: MetricsRegistry = REGISTRY) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded.
+            endpoint = getattr(route, "path", None) or "unmatched"
+            self.registry.inc(
+                "cosden_requests_total",
+                label_set(endpoint=endpoint, method=scope.get("method", ""), status=status),
+            )
+            self.registry.observe(
+                "cosden_request_latency_seconds",
+                label_set(endpoint=endpoint),
+                time.perf_counter() - start,
+            )
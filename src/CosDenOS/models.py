@@ -62,6 +62,48 @@ class Product:
             return False
         return True
 
+    def to_dict(self) -> Dict:
+        """
+        Convert to a plain dict (JSON-safe), e.g. for catalog listings.
+        """
+        base = asdict(self)
+        base["series"] = self.series.value
+        return base
+
+    @staticmethod
+    def from_dict(data: Dict) -> "Product":
+        """
+        Inverse of to_dict(), e.g. for catalog files pushed at runtime.
+
+        Numeric fields are coerced; a negative age_min or an age_max below
+        age_min raises ValueError.
+        """
+        effect = data.get("effect") or {}
+        age_min = int(data.get("age_min", 13))
+        age_max = data.get("age_max")
+        age_max = int(age_max) if age_max is not None else None
+        if age_min < 0:
+            raise ValueError(f"Product {data['code']}: age_min must be >= 0, got {age_min}")
+        if age_max is not None and age_max < age_min:
+            raise ValueError(
+                f"Product {data['code']}: age_max {age_max} is below age_min {age_min}"
+            )
+        return Product(
+            code=data["code"],
+            name=data["name"],
+            series=ProductSeries(data["series"]),
+            description=data.get("description", ""),
+            effect=ProductEffect(
+                brightness_delta=float(effect.get("brightness_delta", 0.0)),
+                gloss_delta=float(effect.get("gloss_delta", 0.0)),
+                tone_shift=effect.get("tone_shift"),
+                opalescence_delta=float(effect.get("opalescence_delta", 0.0)),
+            ),
+            age_min=age_min,
+            age_max=age_max,
+            intensity_level=int(data.get("intensity_level", 1)),
+        )
+
 
 @dataclass
 class ProductStack:
@@ -83,15 +125,25 @@ class SimulationResult:
     aggregated_effect: ProductEffect
     notes: List[str] = field(default_factory=list)
     cosmetic_only: bool = True
+    twin_id: Optional[str] = None
+    # Set when the user has a measured shade baseline (HomeScan).
+    baseline_lightness: Optional[float] = None
+    projected_lightness: Optional[float] = None
 
     def describe(self) -> str:
         tone = self.aggregated_effect.tone_shift or "no tone shift"
+        lightness = ""
+        if self.baseline_lightness is not None and self.projected_lightness is not None:
+            lightness = (
+                f"- Lightness: {self.baseline_lightness:.2f} → {self.projected_lightness:.2f}\n"
+            )
         return (
             f"Stack: {', '.join(self.stack_codes)}\n"
             f"- Brightness delta: {self.aggregated_effect.brightness_delta:+.2f}\n"
             f"- Gloss delta: {self.aggregated_effect.gloss_delta:+.2f}\n"
             f"- Opalescence delta: {self.aggregated_effect.opalescence_delta:+.2f}\n"
             f"- Tone shift: {tone}\n"
+            f"{lightness}"
             f"Notes:\n  - " + "\n  - ".join(self.notes or ["No additional notes."]) +
             "\n(This is a cosmetic-only simulation, not a diagnosis or treatment.)"
         )
@@ -0,0 +1,259 @@
+"""
+Day-stepped regimen simulation, vectorized over days and users.
+
+simulate_stack() gives the instant effect of one application of a stack.
+A regimen applies products on a schedule over many days; its effect
+builds up with each application, fades between them, and flattens out as
+it approaches a ceiling. Per effect dimension d (brightness, gloss,
+opalescence), per user and day t:
+
+    raw[t]    = DECAY[d] * raw[t-1] + sum over products applied on day t
+                of that product's effect delta
+    effect[t] = CEILING[d] * tanh(raw[t] / CEILING[d])
+
+A single application on a fresh start stays close to the product's own
+delta (within about 5% for catalog products), so day 1 is in line with
+simulate_stack().
+
+Schedules become a dose array (users, days, products). Increments for all
+users and days are one matmul with the (products, dims) effect matrix;
+the decay recurrence is a scaled cumulative sum over blocks of days, so
+no Python code runs per user or per day.
+
+NumPy is an optional dependency: pip install "cosden[twin]".
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .event_schedule import CEILING as _CEILING, DECAY_PER_DAY, DIMENSIONS
+from .models import Product
+from .twin_render import np
+
+# Fraction of the accumulated effect left the next day.
+DECAY = np.array(DECAY_PER_DAY)
+
+# Ceilings for the diminishing-returns curve (same units as the deltas).
+CEILING = np.array(_CEILING)
+
+TONES = (None, "cool", "warm", "neutral")
+
+# Days per block of the decay scan, and the largest decay ** -k a block may
+# scale by: float32 sums stay accurate (and finite) below it. Fast decays
+# get shorter blocks; see _scan_block().
+_SCAN_BLOCK = 16
+_MAX_SCAN_SCALE = 1e4
+
+
+@dataclass
+class RegimenStep:
+    """
+    Apply one product every `every_days` days from start_day (0-based)
+    until end_day (exclusive; None = until the end).
+    """
+    code: str
+    every_days: int = 1
+    start_day: int = 0
+    end_day: Optional[int] = None
+
+
+@dataclass
+class Regimen:
+    steps: List[RegimenStep] = field(default_factory=list)
+
+    @property
+    def codes(self) -> List[str]:
+        return list(dict.fromkeys(step.code for step in self.steps))
+
+    def key(self) -> Tuple[Tuple[str, int, int, Optional[int]], ...]:
+        return tuple((s.code, s.every_days, s.start_day, s.end_day) for s in self.steps)
+
+
+@dataclass
+class RegimenTrajectory:
+    """
+    Per-user, per-day effect after that day's applications.
+
+    - brightness / gloss / opalescence: (users, days) float32 arrays
+    - tone: (users, days) index into TONES (0 = no tone shift yet)
+    """
+    days: int
+    brightness: np.ndarray
+    gloss: np.ndarray
+    opalescence: np.ndarray
+    tone: np.ndarray
+
+    @property
+    def users(self) -> int:
+        return int(self.brightness.shape[0])
+
+    def lightness(self, baseline_lightness: np.ndarray) -> np.ndarray:
+        """
+        (users, days) lightness path from each user's measured baseline
+        lightness (see homescan), using the renderer's brightness map.
+        """
+        base = np.asarray(baseline_lightness, dtype=np.float64).reshape(-1, 1)
+        b = np.clip(self.brightness, -1.0, 1.0)
+        return np.where(b >= 0.0, base + b * (1.0 - base), base * (1.0 + b))
+
+    def user(self, index: int) -> List[Dict[str, object]]:
+        """
+        One user's trajectory as JSON-friendly rows, one per day.
+        """
+        return [
+            {
+                "day": day,
+                "brightness_delta": float(self.brightness[index, day]),
+                "gloss_delta": float(self.gloss[index, day]),
+                "opalescence_delta": float(self.opalescence[index, day]),
+                "tone_shift": TONES[int(self.tone[index, day])],
+            }
+            for day in range(self.days)
+        ]
+
+
+# -------------------------
+# Schedules → doses
+# -------------------------
+
+def dose_array(regimens: Sequence[Regimen], codes: Sequence[str], days: int) -> np.ndarray:
+    """
+    (users, days, products) application counts, products in `codes` order.
+    """
+    index = {code: i for i, code in enumerate(codes)}
+    doses = np.zeros((len(regimens), days, len(codes)), dtype=np.float32)
+    for user, regimen in enumerate(regimens):
+        for step in regimen.steps:
+            if step.every_days <= 0:
+                raise ValueError("every_days must be positive")
+            end = days if step.end_day is None else min(step.end_day, days)
+            doses[user, step.start_day:end:step.every_days, index[step.code]] += 1.0
+    return doses
+
+
+# -------------------------
+# Simulation
+# -------------------------
+
+def _scan_block(decay: np.ndarray) -> int:
+    # Longest block (at most _SCAN_BLOCK) whose scale decay ** -(k - 1)
+    # stays within _MAX_SCAN_SCALE for the fastest-decaying dimension.
+    fastest = float(decay.min())
+    if fastest >= 1.0:
+        return _SCAN_BLOCK
+    k = 1 + int(np.log(_MAX_SCAN_SCALE) / -np.log(fastest))
+    return max(1, min(_SCAN_BLOCK, k))
+
+
+def _decayed_cumsum(increments: np.ndarray, decay: np.ndarray) -> np.ndarray:
+    """
+    raw[t] = decay * raw[t-1] + increments[t] along axis 0 of a day-major
+    (days, users, dims) array, as a scaled cumulative sum per block of days.
+    """
+    raw = np.empty_like(increments)
+    carry = np.zeros(increments.shape[1:], dtype=increments.dtype)
+    size = _scan_block(decay)
+    for start in range(0, increments.shape[0], size):
+        block = increments[start:start + size]
+        rising = (decay ** np.arange(len(block))[:, None]).astype(increments.dtype)[:, None, :]
+        out = raw[start:start + len(block)]
+        np.divide(block, rising, out=out)
+        np.cumsum(out, axis=0, out=out)
+        out += decay.astype(increments.dtype) * carry
+        out *= rising
+        carry = out[-1]
+    return raw
+
+
+def simulate_doses(
+    doses: np.ndarray,
+    products: Sequence[Product],
+    decay: np.ndarray = DECAY,
+    ceiling: np.ndarray = CEILING,
+) -> RegimenTrajectory:
+    """
+    Trajectories for a (users, days, products) dose array; products[i]
+    is the product in dose column i. Trajectories are float32.
+    """
+    decay = np.asarray(decay, dtype=np.float64)
+    if np.any(decay <= 0.0) or np.any(decay > 1.0):
+        raise ValueError("decay rates must be in (0, 1]")
+    users, days, count = doses.shape
+    if count != len(products):
+        raise ValueError("doses must have one column per product")
+
+    effects = np.array(
+        [
+            (p.effect.brightness_delta, p.effect.gloss_delta, p.effect.opalescence_delta)
+            for p in products
+        ],
+        dtype=np.float32,
+    ).reshape(count, len(DIMENSIONS))
+    increments = (doses.reshape(-1, count).astype(np.float32, copy=False) @ effects)
+    # Day-major, so the scan works on contiguous (users, dims) rows.
+    increments = np.ascontiguousarray(
+        increments.reshape(users, days, len(DIMENSIONS)).transpose(1, 0, 2)
+    )
+    trajectory = _decayed_cumsum(increments, decay)
+    ceiling = np.asarray(ceiling, dtype=np.float32)
+    trajectory /= ceiling
+    np.tanh(trajectory, out=trajectory)
+    trajectory *= ceiling
+
+    # Tone follows the most recent application of a toning product (as in
+    # ProductEffect.merge, where a later tone overrides an earlier one).
+    tone_of = [TONES.index(p.effect.tone_shift) for p in products]
+    today = np.zeros((users, days), dtype=np.int8)
+    for column, tone_index in enumerate(tone_of):
+        if tone_index:
+            today[doses[:, :, column] > 0] = tone_index
+    last_day = np.maximum.accumulate(np.where(today > 0, np.arange(days), 0), axis=1)
+    tone = np.take_along_axis(today, last_day, axis=1)
+
+    return RegimenTrajectory(
+        days=days,
+        brightness=trajectory[:, :, 0].T,
+        gloss=trajectory[:, :, 1].T,
+        opalescence=trajectory[:, :, 2].T,
+        tone=tone,
+    )
+
+
+def simulate_regimens(
+    regimens: Sequence[Regimen],
+    days: int,
+    catalog: Mapping[str, Product],
+) -> Tuple[RegimenTrajectory, List[str]]:
+    """
+    Trajectories for many users' regimens over `days` days, and the
+    product codes used (dose column order). Cohorts mostly share a few
+    regimens, so each distinct regimen is simulated once and its rows are
+    repeated for the users on it.
+    """
+    codes = list(dict.fromkeys(code for regimen in regimens for code in regimen.codes))
+    unique: List[Regimen] = []
+    index: Dict[Tuple, int] = {}
+    rows = np.empty(len(regimens), dtype=np.intp)
+    for user, regimen in enumerate(regimens):
+        key = regimen.key()
+        if key not in index:
+            index[key] = len(unique)
+            unique.append(regimen)
+        rows[user] = index[key]
+
+    doses = dose_array(unique, codes, days)
+    trajectory = simulate_doses(doses, [catalog[code] for code in codes])
+    if len(unique) == len(regimens):
+        return trajectory, codes
+    return (
+        RegimenTrajectory(
+            days=days,
+            brightness=trajectory.brightness[rows],
+            gloss=trajectory.gloss[rows],
+            opalescence=trajectory.opalescence[rows],
+            tone=trajectory.tone[rows],
+        ),
+        codes,
+    )
@@ -0,0 +1,277 @@
+"""
+Cache of rendered twin previews.
+
+Entries are keyed by RenderKey (twin ID + twin version, catalog version,
+canonical stack and render resolution) and held in a byte-budgeted LRU.
+With a spill directory, entries evicted from memory are written there
+(also byte-budgeted) and promoted back on the next hit, which is still
+much cheaper than re-rendering.
+
+Cached arrays are read-only: every caller sees the same buffers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
+
+from .metrics import record_cache_lookup
+
+if TYPE_CHECKING:  # NumPy is optional; twin_render is imported on first spill.
+    from .twin_render import RenderBuffers
+
+PathLike = Union[str, Path]
+
+_FIELDS = ("color", "gloss", "translucency", "shade_map")
+
+
+@dataclass(frozen=True)
+class RenderKey:
+    twin_id: str
+    twin_version: int
+    catalog_version: int
+    stack: Tuple[str, ...]          # product codes, in application order
+    resolution: Optional[int] = None  # max rendered rows; None = full twin
+
+    def digest(self) -> str:
+        raw = repr((self.twin_id, self.twin_version, self.catalog_version, self.stack, self.resolution))
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+@dataclass
+class ProgressivePreview:
+    """
+    A coarse preview available now, refined to full resolution in the
+    background (see CosDenOS.render_progressive).
+
+    - preview / resolution: the first render and its max rows (None when
+      the twin has no coarser LOD and the preview is already full size)
+    - refined: resolves to the full-resolution buffers
+    """
+    preview: "RenderBuffers"
+    resolution: Optional[int]
+    refined: "Future[RenderBuffers]"
+    _cancelled: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def cancel(self) -> None:
+        """
+        Stop refining, e.g. when the user has already picked another stack.
+        A level being rendered finishes, but is not delivered.
+        """
+        self._cancelled.set()
+        self.refined.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+def _unlink_all(paths: List[Path]) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+class RenderCache:
+    def __init__(
+        self,
+        memory_budget_bytes: int = 256 << 20,
+        spill_dir: Optional[PathLike] = None,
+        spill_budget_bytes: int = 1 << 30,
+    ) -> None:
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.spill_budget_bytes = spill_budget_bytes
+        self._entries: "OrderedDict[RenderKey, RenderBuffers]" = OrderedDict()
+        self._bytes = 0
+        self._spilled: "OrderedDict[RenderKey, int]" = OrderedDict()  # key -> file size
+        self._spilled_bytes = 0
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by invalidation; drops in-flight spills
+        self._counts = {
+            "hits": 0, "spill_hits": 0, "misses": 0, "evictions": 0, "spill_errors": 0,
+        }
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    # ------------------------------
+    # Disk spill
+    # ------------------------------
+    # File I/O runs outside the lock: the lock only guards the bookkeeping,
+    # so memory hits never wait on a disk write or read.
+
+    def _spill_path(self, key: RenderKey) -> Path:
+        assert self.spill_dir is not None
+        return self.spill_dir / f"render-{key.digest()}.npz"
+
+    def _spill(self, victims: List[Tuple[RenderKey, "RenderBuffers"]]) -> None:
+        if self.spill_dir is None or not victims:
+            return
+
+        import numpy as np
+
+        with self._lock:
+            generation = self._generation
+        written: List[Tuple[RenderKey, int]] = []
+        for key, buffers in victims:
+            path = self._spill_path(key)
+            tmp = path.with_name(path.name + f".tmp{os.getpid()}-{threading.get_ident()}")
+            try:
+                with tmp.open("wb") as f:
+                    np.savez(f, **{name: getattr(buffers, name) for name in _FIELDS})
+                os.replace(tmp, path)
+                written.append((key, path.stat().st_size))
+            except OSError:
+                # e.g. disk full: the entry is just dropped, as without a spill dir.
+                tmp.unlink(missing_ok=True)
+                with self._lock:
+                    self._counts["spill_errors"] += 1
+
+        stale: List[Path] = []
+        with self._lock:
+            for key, size in written:
+                if generation != self._generation:
+                    # Invalidated or cleared while we were writing.
+                    stale.append(self._spill_path(key))
+                    continue
+                self._spilled_bytes -= self._spilled.pop(key, 0)
+                self._spilled[key] = size
+                self._spilled_bytes += size
+            while self._spilled_bytes > self.spill_budget_bytes and self._spilled:
+                old_key, old_size = self._spilled.popitem(last=False)
+                self._spilled_bytes -= old_size
+                stale.append(self._spill_path(old_key))
+        _unlink_all(stale)
+
+    def _take_spilled(self, key: RenderKey) -> Optional[Path]:
+        # Caller holds the lock.
+        size = self._spilled.pop(key, None)
+        if size is None:
+            return None
+        self._spilled_bytes -= size
+        return self._spill_path(key)
+
+    def _load_spilled(self, path: Path) -> Optional["RenderBuffers"]:
+        import numpy as np
+
+        from .twin_render import RenderBuffers
+
+        try:
+            with np.load(path) as data:
+                buffers = RenderBuffers(**{name: data[name] for name in _FIELDS})
+        except (OSError, KeyError, ValueError):
+            with self._lock:
+                self._counts["spill_errors"] += 1
+            return None
+        finally:
+            path.unlink(missing_ok=True)
+        return buffers
+
+    # ------------------------------
+    # Memory tier
+    # ------------------------------
+
+    def _insert(
+        self, key: RenderKey, buffers: "RenderBuffers"
+    ) -> List[Tuple[RenderKey, "RenderBuffers"]]:
+        # Caller holds the lock; returns the evicted entries to spill.
+        for name in _FIELDS:
+            getattr(buffers, name).flags.writeable = False
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[key] = buffers
+        self._bytes += buffers.nbytes
+
+        victims = []
+        while self._bytes > self.memory_budget_bytes and len(self._entries) > 1:
+            old_key, old_buffers = self._entries.popitem(last=False)
+            self._bytes -= old_buffers.nbytes
+            self._counts["evictions"] += 1
+            victims.append((old_key, old_buffers))
+        return victims
+
+    def get(self, key: RenderKey) -> Optional["RenderBuffers"]:
+        with self._lock:
+            buffers = self._entries.get(key)
+            if buffers is not None:
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+            spill_path = self._take_spilled(key) if buffers is None else None
+
+        victims: List[Tuple[RenderKey, "RenderBuffers"]] = []
+        if buffers is None:
+            if spill_path is not None:
+                buffers = self._load_spilled(spill_path)
+            with self._lock:
+                if buffers is not None:
+                    self._counts["spill_hits"] += 1
+                    victims = self._insert(key, buffers)
+                else:
+                    self._counts["misses"] += 1
+            self._spill(victims)
+        record_cache_lookup("render", buffers is not None)
+        return buffers
+
+    def put(self, key: RenderKey, buffers: "RenderBuffers") -> "RenderBuffers":
+        """
+        Cache buffers the caller no longer writes to (they become read-only).
+        """
+        with self._lock:
+            victims = self._insert(key, buffers)
+        self._spill(victims)
+        return buffers
+
+    def get_or_render(
+        self,
+        key: RenderKey,
+        render: Callable[[], "RenderBuffers"],
+    ) -> "RenderBuffers":
+        """
+        Cached buffers for key, rendering (outside the lock) on a miss.
+        render() must return buffers it does not reuse.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        return self.put(key, render())
+
+    # ------------------------------
+    # Invalidation
+    # ------------------------------
+
+    def invalidate_twin(self, twin_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if k.twin_id == twin_id]:
+                self._bytes -= self._entries.pop(key).nbytes
+            stale = []
+            for key in [k for k in self._spilled if k.twin_id == twin_id]:
+                self._spilled_bytes -= self._spilled.pop(key)
+                stale.append(self._spill_path(key))
+        _unlink_all(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+            stale = [self._spill_path(key) for key in self._spilled]
+            self._spilled.clear()
+            self._spilled_bytes = 0
+        _unlink_all(stale)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "spilled_entries": len(self._spilled),
+                "spilled_bytes": self._spilled_bytes,
+                **self._counts,
+            }
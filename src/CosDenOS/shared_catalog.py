@@ -0,0 +1,359 @@
+"""
+Shared, memory-mapped catalog snapshots.
+
+One process publishes an immutable, compiled catalog snapshot to a
+directory; every uvicorn worker on the node attaches to it with mmap, so
+all workers read the same page-cache pages instead of each parsing and
+building its own catalog. Each worker still decodes one Product per
+record, once per mapped version, the first time it lists the catalog
+(see SharedCatalogView).
+
+Directory layout:
+
+    <dir>/catalog-v<N>.snap   compiled snapshot for catalog version N
+    <dir>/CURRENT             text file holding the current version N
+
+Publishing writes the new snapshot first and then atomically replaces
+CURRENT, so readers polling CURRENT always see a complete file. Run
+
+    python -m CosDenOS.shared_catalog publish <dir>
+
+to publish the default catalog.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, ItemsView, Iterator, List, Mapping, Optional, Tuple, Union, ValuesView
+
+from .models import Product, ProductEffect, ProductSeries
+
+PathLike = Union[str, Path]
+
+MAGIC = b"CDCATLG1"
+FORMAT_VERSION = 1
+
+# magic, format version, product count, catalog version, index offset, heap offset
+_HEADER = struct.Struct("<8sIIQQQ")
+
+# code/name/description/tone as (offset, length) into the string heap,
+# series, intensity, age_min, age_max, brightness, gloss, opalescence
+_RECORD = struct.Struct("<8IcBHH3d")
+
+_NO_TONE = 0xFFFFFFFF
+_NO_AGE_MAX = 0xFFFF
+
+# Decoded products each view keeps for repeat lookups.
+DECODE_CACHE_SIZE = 256
+
+# How many superseded snapshot files to keep for slow attachers.
+_KEEP_OLD_SNAPSHOTS = 2
+
+
+def _snapshot_path(directory: Path, version: int) -> Path:
+    return directory / f"catalog-v{version}.snap"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+    with tmp.open("wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_current_version(directory: PathLike) -> Optional[int]:
+    """
+    Return the currently published catalog version, or None if nothing
+    has been published yet.
+    """
+    try:
+        return int((Path(directory) / "CURRENT").read_text().strip())
+    except FileNotFoundError:
+        return None
+
+
+def compile_catalog(catalog: Mapping[str, Product], version: int) -> bytes:
+    """
+    Compile a catalog into the binary snapshot format.
+    """
+    heap = bytearray()
+
+    def intern(value: Optional[str]) -> Tuple[int, int]:
+        if value is None:
+            return _NO_TONE, 0
+        raw = value.encode()
+        offset = len(heap)
+        heap.extend(raw)
+        return offset, len(raw)
+
+    products = list(catalog.values())
+    records = bytearray()
+    for p in products:
+        if p.age_max is not None and not 0 <= p.age_max < _NO_AGE_MAX:
+            raise ValueError(f"age_max out of range for {p.code}: {p.age_max}")
+        records += _RECORD.pack(
+            *intern(p.code),
+            *intern(p.name),
+            *intern(p.description),
+            *intern(p.effect.tone_shift),
+            p.series.value.encode(),
+            p.intensity_level,
+            p.age_min,
+            _NO_AGE_MAX if p.age_max is None else p.age_max,
+            p.effect.brightness_delta,
+            p.effect.gloss_delta,
+            p.effect.opalescence_delta,
+        )
+
+    # Record indices sorted by code, for zero-copy binary-search lookups.
+    order = sorted(range(len(products)), key=lambda i: products[i].code)
+    index = struct.pack(f"<{len(order)}I", *order)
+
+    index_offset = _HEADER.size + len(records)
+    heap_offset = index_offset + len(index)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(products), version, index_offset, heap_offset
+    )
+    return header + bytes(records) + index + bytes(heap)
+
+
+def publish_catalog(
+    directory: PathLike,
+    catalog: Mapping[str, Product],
+    version: Optional[int] = None,
+) -> int:
+    """
+    Publish a catalog snapshot and return its version.
+
+    The version defaults to the current published version + 1.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if version is None:
+        version = (read_current_version(directory) or 0) + 1
+
+    _write_atomic(_snapshot_path(directory, version), compile_catalog(catalog, version))
+    _write_atomic(directory / "CURRENT", f"{version}\n".encode())
+
+    # Unlinking is safe for workers that still have an old snapshot mapped.
+    for old in directory.glob("catalog-v*.snap"):
+        try:
+            old_version = int(old.stem.split("-v", 1)[1])
+        except ValueError:
+            continue
+        if old_version <= version - _KEEP_OLD_SNAPSHOTS:
+            old.unlink(missing_ok=True)
+
+    return version
+
+
+class SharedCatalogView(Mapping[str, Product]):
+    """
+    Read-only Mapping[str, Product] over a memory-mapped snapshot.
+
+    Listing (values(), items(), products()) decodes every product once
+    per mapped version, on first use, into a dict by code that all later
+    calls share: plans list the catalog on every request, and decoding
+    per call is far slower than holding one decoded copy per worker.
+    Until something lists the catalog, single lookups binary-search the
+    code index in the mapping instead, with a small LRU of recently
+    decoded products, so a worker that only stacks codes never decodes
+    the whole snapshot.
+    """
+
+    def __init__(self, path: PathLike, cache_size: int = DECODE_CACHE_SIZE) -> None:
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, count, version, index_offset, heap_offset = _HEADER.unpack_from(
+            self._mm, 0
+        )
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Not a CosDen catalog snapshot (format {fmt}): {path}")
+
+        self.version: int = version
+        self._count = count
+        self._index_offset = index_offset
+        self._heap_offset = heap_offset
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, Product]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._decoded: Optional[Dict[str, Product]] = None
+        self._decode_lock = threading.Lock()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._heap_offset + offset
+        return self._mm[start:start + length].decode()
+
+    def _code_at(self, i: int) -> str:
+        code_off, code_len = struct.unpack_from("<2I", self._mm, _HEADER.size + i * _RECORD.size)
+        return self._string(code_off, code_len)
+
+    def _find(self, code: str) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = struct.unpack_from("<I", self._mm, self._index_offset + 4 * mid)[0]
+            mid_code = self._code_at(i)
+            if mid_code == code:
+                return i
+            if mid_code < code:
+                lo = mid + 1
+            else:
+                hi = mid
+        raise KeyError(code)
+
+    def _decode(self, i: int) -> Product:
+        (
+            code_off, code_len, name_off, name_len,
+            desc_off, desc_len, tone_off, tone_len,
+            series, intensity, age_min, age_max,
+            brightness, gloss, opal,
+        ) = _RECORD.unpack_from(self._mm, _HEADER.size + i * _RECORD.size)
+        return Product(
+            code=self._string(code_off, code_len),
+            name=self._string(name_off, name_len),
+            series=ProductSeries(series.decode()),
+            description=self._string(desc_off, desc_len),
+            effect=ProductEffect(
+                brightness_delta=brightness,
+                gloss_delta=gloss,
+                tone_shift=None if tone_off == _NO_TONE else self._string(tone_off, tone_len),
+                opalescence_delta=opal,
+            ),
+            age_min=age_min,
+            age_max=None if age_max == _NO_AGE_MAX else age_max,
+            intensity_level=intensity,
+        )
+
+    def _by_code(self) -> Dict[str, Product]:
+        decoded = self._decoded
+        if decoded is None:
+            with self._decode_lock:
+                decoded = self._decoded
+                if decoded is None:
+                    products = (self._decode(i) for i in range(self._count))
+                    decoded = self._decoded = {p.code: p for p in products}
+                    with self._cache_lock:
+                        self._cache.clear()  # lookups use the dict from now on
+        return decoded
+
+    def __getitem__(self, code: str) -> Product:
+        decoded = self._decoded
+        if decoded is not None:
+            return decoded[code]
+        with self._cache_lock:
+            product = self._cache.get(code)
+            if product is not None:
+                self._cache.move_to_end(code)
+                return product
+
+        product = self._decode(self._find(code))
+        if self._cache_size > 0:
+            with self._cache_lock:
+                self._cache[code] = product
+                self._cache.move_to_end(code)
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return product
+
+    def __contains__(self, code: object) -> bool:
+        decoded = self._decoded
+        if decoded is not None:
+            return code in decoded
+        if not isinstance(code, str):
+            return False
+        if code in self._cache:
+            return True
+        try:
+            self._find(code)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        decoded = self._decoded
+        if decoded is not None:
+            return iter(decoded)
+        return (self._code_at(i) for i in range(self._count))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def values(self) -> ValuesView[Product]:
+        return self._by_code().values()
+
+    def items(self) -> ItemsView[str, Product]:
+        return self._by_code().items()
+
+    def products(self) -> List[Product]:
+        """
+        All products in published order.
+        """
+        return list(self._by_code().values())
+
+
+class SharedCatalog:
+    """
+    Worker-side handle on a shared catalog directory.
+
+    `refresh()` is cheap (a stat of CURRENT) and re-attaches when a newer
+    version has been published.
+    """
+
+    def __init__(self, directory: PathLike) -> None:
+        self.directory = Path(directory)
+        self._current_mtime: Optional[int] = None
+        self.view: Optional[SharedCatalogView] = None
+        if not self.refresh():
+            raise FileNotFoundError(f"No catalog published in {self.directory}")
+
+    @property
+    def version(self) -> int:
+        return self.view.version if self.view is not None else 0
+
+    def refresh(self) -> bool:
+        """
+        Attach to the latest published snapshot; True if the view changed.
+        """
+        try:
+            mtime = (self.directory / "CURRENT").stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._current_mtime:
+            return False
+        self._current_mtime = mtime
+
+        version = read_current_version(self.directory)
+        if version is None or version == self.version:
+            return False
+
+        # Old views stay valid for callers still holding them.
+        self.view = SharedCatalogView(_snapshot_path(self.directory, version))
+        return True
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 2 or args[0] != "publish":
+        print("usage: python -m CosDenOS.shared_catalog publish <dir>")
+        raise SystemExit(2)
+
+    from .catalog import build_default_catalog
+
+    version = publish_catalog(args[1], build_default_catalog())
+    print(f"published catalog v{version} to {args[1]}")
+
+
+if __name__ == "__main__":
+    main()
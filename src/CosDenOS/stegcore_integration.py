@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, Any
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
 
 from .logging_utils import log_event
 
@@ -13,38 +16,251 @@ except ImportError:  # pragma: no cover - optional dependency
     Registry = None  # type: ignore[assignment]
 
 
-_engine = None
-_registry = None
-_node_name: Optional[str] = None
+LoadFn = Callable[[], Dict[str, Any]]
+T = TypeVar("T")
 
 
-def _ensure_engine_and_registry() -> None:
+def _default_registry() -> Any:
     """
-    Lazily initialize the in-process StegCore StateEngine and Registry,
-    if the stegcore package is available.
+    In-process StegCore StateEngine + Registry.
     """
-    global _engine, _registry
-    if StateEngine is None or Registry is None:
-        return
-    if _engine is None:
-        _engine = StateEngine()
-        _registry = Registry(engine=_engine)
+    return Registry(engine=StateEngine())
+
+
+def _call_with_timeout(fn: Callable[[], T], timeout: float, done: threading.Event) -> T:
+    """
+    Run fn on a daemon thread and wait at most timeout seconds for it.
+
+    done is set when fn returns, so the caller can tell whether a call
+    that timed out is still running. Raises TimeoutError on timeout.
+    """
+    result: Dict[str, Any] = {}
+
+    def run() -> None:
+        try:
+            result["value"] = fn()
+        except BaseException as exc:  # re-raised on the waiting thread
+            result["error"] = exc
+        finally:
+            done.set()
+
+    threading.Thread(target=run, name="cosden-stegcore-call", daemon=True).start()
+    if not done.wait(timeout):
+        raise TimeoutError(f"StegCore registry call took longer than {timeout}s")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+class StegCoreWorker:
+    """
+    Owns the StegCore Registry and publishes to it from a daemon thread.
+
+    - register() / heartbeat() are fire-and-forget: they enqueue and return
+      immediately; a full queue drops the update instead of blocking
+    - heartbeats are coalesced: while one is queued, further requests are
+      folded into it
+    - every heartbeat carries live load metadata from load_fn (evaluated
+      at send time, so a coalesced heartbeat reports the latest figures)
+    - heartbeat_interval_seconds > 0 also publishes heartbeats on a timer
+    - registry errors are logged and counted; they never reach callers
+    - registry calls are bounded by call_timeout_seconds; while a timed-out
+      call is still hung, further publishes fail fast instead of piling up
+    """
+
+    _REGISTER = "register"
+    _HEARTBEAT = "heartbeat"
+    _STOP = "stop"
+
+    def __init__(
+        self,
+        node_name: str,
+        version: Optional[str],
+        endpoint: Optional[str],
+        registry_factory: Callable[[], Any] = _default_registry,
+        load_fn: Optional[LoadFn] = None,
+        max_queue: int = 64,
+        heartbeat_interval_seconds: float = 0.0,
+        call_timeout_seconds: float = 2.0,
+    ) -> None:
+        self.node_name = node_name
+        self.version = version
+        self.endpoint = endpoint
+        self.registry_factory = registry_factory
+        self.load_fn = load_fn
+        self.heartbeat_interval_seconds = heartbeat_interval_seconds
+        self.call_timeout_seconds = call_timeout_seconds
+
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max_queue)
+        self._heartbeat_pending = False
+        self._pending_lock = threading.Lock()
+        self._registry: Any = None
+        self._last_call_done: Optional[threading.Event] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counts = {"sent": 0, "coalesced": 0, "dropped": 0, "failed": 0}
+
+    # ------------------------------
+    # Caller side (never blocks)
+    # ------------------------------
+
+    def _enqueue(self, kind: str) -> bool:
+        try:
+            self._queue.put_nowait(kind)
+        except queue.Full:
+            self._counts["dropped"] += 1
+            return False
+        return True
+
+    def register(self) -> bool:
+        return self._enqueue(self._REGISTER)
+
+    def heartbeat(self) -> bool:
+        """
+        Request a heartbeat; False if it was coalesced or dropped.
+        """
+        with self._pending_lock:
+            if self._heartbeat_pending:
+                self._counts["coalesced"] += 1
+                return False
+            self._heartbeat_pending = True
+        if not self._enqueue(self._HEARTBEAT):
+            with self._pending_lock:
+                self._heartbeat_pending = False
+            return False
+        return True
+
+    # ------------------------------
+    # Worker thread
+    # ------------------------------
+
+    def _metadata(self, with_load: bool) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = {}
+        if self.endpoint:
+            metadata["endpoint"] = self.endpoint
+        if self.version:
+            metadata["version"] = self.version
+        if with_load and self.load_fn is not None:
+            metadata["load"] = self.load_fn()
+        return metadata
+
+    def _call_registry(self, kind: str, metadata: Dict[str, Any]) -> None:
+        if self._registry is None:
+            self._registry = self.registry_factory()
+        call = self._registry.register if kind == self._REGISTER else self._registry.heartbeat
+        call(node=self.node_name, version=self.version, metadata=metadata)
+
+    def _publish(self, kind: str) -> None:
+        try:
+            last = self._last_call_done
+            if last is not None and not last.is_set():
+                raise TimeoutError("previous StegCore registry call is still running")
+            metadata = self._metadata(with_load=kind == self._HEARTBEAT)
+            done = self._last_call_done = threading.Event()
+            _call_with_timeout(
+                lambda: self._call_registry(kind, metadata), self.call_timeout_seconds, done
+            )
+        except Exception as exc:
+            self._counts["failed"] += 1
+            log_event(
+                f"stegcore_{kind}_failed",
+                level="ERROR",
+                extra={"node": self.node_name, "error": str(exc)},
+            )
+            return
+
+        self._counts["sent"] += 1
+        log_event(
+            f"stegcore_{kind}",
+            extra={
+                "node": self.node_name,
+                "version": self.version,
+                "endpoint": self.endpoint,
+                **({"load": metadata["load"]} if "load" in metadata else {}),
+            },
+        )
+
+    def _run(self) -> None:
+        interval = self.heartbeat_interval_seconds
+        next_beat = time.monotonic() + interval if interval > 0 else None
+        while True:
+            if self._stopping.is_set():
+                # Drain what is already queued, then exit.
+                try:
+                    kind = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+            else:
+                timeout = max(0.0, next_beat - time.monotonic()) if next_beat is not None else None
+                try:
+                    kind = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    kind = self._HEARTBEAT
+
+            if kind == self._STOP:
+                continue
+            if kind == self._HEARTBEAT:
+                with self._pending_lock:
+                    self._heartbeat_pending = False
+                if next_beat is not None:
+                    next_beat = time.monotonic() + interval
+            self._publish(kind)
+
+    # ------------------------------
+    # Lifecycle
+    # ------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="cosden-stegcore", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Publish what is already queued, then stop the worker thread.
+
+        Never waits longer than timeout, even if StegCore is hung.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        try:
+            # Wakes a worker idling on an empty queue; a full queue means it
+            # is busy and will see the event after the current item.
+            self._queue.put_nowait(self._STOP)
+        except queue.Full:
+            pass
+        thread.join(timeout=timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), **self._counts}
+
+
+_worker: Optional[StegCoreWorker] = None
 
 
 def initialize_stegcore_integration(
     node_name: str,
     version: Optional[str],
     endpoint: Optional[str],
-) -> None:
+    load_fn: Optional[LoadFn] = None,
+    heartbeat_interval_seconds: float = 0.0,
+) -> Optional[StegCoreWorker]:
     """
     Initialize StegCore integration for this CosDenOS instance.
 
     - If stegcore is not installed, logs an 'unavailable' event and returns.
-    - Otherwise, creates an in-process StateEngine + Registry and registers
-      this node as 'healthy'.
+    - Otherwise, starts a StegCoreWorker (which creates the in-process
+      StateEngine + Registry on its own thread) and queues the
+      registration of this node.
     """
-    global _node_name
-    _node_name = node_name
+    global _worker
 
     if StateEngine is None or Registry is None:
         log_event(
@@ -52,68 +268,45 @@ def initialize_stegcore_integration(
             level="WARN",
             extra={"node": node_name},
         )
-        return
-
-    _ensure_engine_and_registry()
-
-    if _registry is None:
-        log_event(
-            "stegcore_registry_init_failed",
-            level="ERROR",
-            extra={"node": node_name},
-        )
-        return
-
-    metadata: Dict[str, Any] = {}
-    if endpoint:
-        metadata["endpoint"] = endpoint
-    if version:
-        metadata["version"] = version
-
-    _registry.register(
-        node=node_name,
-        version=version,
-        metadata=metadata,
-    )
+        return None
 
-    log_event(
-        "stegcore_register",
-        extra={
-            "node": node_name,
-            "version": version,
-            "endpoint": endpoint,
-        },
+    shutdown_stegcore_integration()
+    worker = StegCoreWorker(
+        node_name,
+        version,
+        endpoint,
+        load_fn=load_fn,
+        heartbeat_interval_seconds=heartbeat_interval_seconds,
     )
+    worker.start()
+    worker.register()
+    _worker = worker
+    return worker
 
 
 def send_stegcore_heartbeat(
-    version: Optional[str],
-    endpoint: Optional[str],
+    version: Optional[str] = None,
+    endpoint: Optional[str] = None,
 ) -> None:
     """
-    Send a heartbeat to StegCore for this CosDenOS node, if integration
-    is available and initialized.
+    Queue a heartbeat to StegCore for this CosDenOS node, if integration
+    is available and initialized. Never blocks on StegCore.
+
+    version / endpoint are accepted for compatibility; the worker reports
+    the values it was initialized with.
     """
-    if _registry is None or _node_name is None:
-        return
-
-    metadata: Dict[str, Any] = {}
-    if endpoint:
-        metadata["endpoint"] = endpoint
-    if version:
-        metadata["version"] = version
-
-    _registry.heartbeat(
-        node=_node_name,
-        version=version,
-        metadata=metadata,
-    )
+    worker = _worker
+    if worker is not None:
+        worker.heartbeat()
 
-    log_event(
-        "stegcore_heartbeat",
-        extra={
-            "node": _node_name,
-            "version": version,
-            "endpoint": endpoint,
-        },
-    )
+
+def stegcore_stats() -> Optional[Dict[str, int]]:
+    worker = _worker
+    return worker.stats() if worker is not None else None
+
+
+def shutdown_stegcore_integration() -> None:
+    global _worker
+    worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop()
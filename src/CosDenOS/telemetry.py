@@ -0,0 +1,451 @@
+"""
+Device telemetry ingestion for registered CosDen devices (SonicPolish,
+ShineBar, TrayFormer).
+
+Devices upload session events in bursts, either as compact binary frames
+or as NDJSON. An event is (timestamp, kind, value):
+
+    timestamp  epoch seconds (device clock)
+    kind       session_start (1) | session_end (2) | usage (3)
+    value      seconds of use covered by the event (0 for session_start)
+
+Binary frames (application/octet-stream; frames may be concatenated):
+
+    header  <4sBI   magic b"CDTE", format version 1, record count
+    record  <dBf    timestamp f64, kind u8, value f32   (13 bytes)
+
+NDJSON lines: {"ts": 1760000000.0, "kind": "session_end", "value": 184}
+
+Path of an upload:
+
+- ingest() parses the whole upload in one batch (struct.iter_unpack for
+  binary, one json.loads over the joined lines for NDJSON), rejects
+  events stamped outside [now - retention_seconds, now + max_skew_seconds]
+  (device clocks drift; NaN or far-future stamps would otherwise open
+  windows that never close) and appends the rest to the device's ring
+  buffer, a bounded collections.deque:
+  appends and pops are atomic under the GIL, so producers never take a
+  lock. A full ring drops its oldest events, and counts them.
+- The consumer (run(), an asyncio task) periodically drains every ring
+  into tumbling windows per device: events, sessions started/completed,
+  usage seconds. Windows older than window_seconds + grace_seconds are
+  closed and appended as NDJSON to <directory>/telemetry-YYYYMMDD.ndjson.
+  Draining, closing and writing run on a worker thread, so the event loop
+  is not held up; windows that fail to write are retried next round.
+
+Late events for a window that was already written produce another record
+for the same (device, window); readers should sum records per key.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from .errors import CosDenError
+from .logging_utils import log_event
+from .metrics import record_telemetry
+
+PathLike = Union[str, Path]
+
+DEVICE_MODELS = ("SonicPolish", "ShineBar", "TrayFormer")
+
+SESSION_START = 1
+SESSION_END = 2
+USAGE = 3
+
+KINDS = {"session_start": SESSION_START, "session_end": SESSION_END, "usage": USAGE}
+
+FRAME_MAGIC = b"CDTE"
+FRAME_VERSION = 1
+_FRAME_HEADER = struct.Struct("<4sBI")
+_RECORD = struct.Struct("<dBf")
+
+Event = Tuple[float, int, float]
+
+
+class UnknownDeviceError(CosDenError):
+    """Raised for telemetry from a device that is not registered."""
+
+
+class TelemetryFormatError(CosDenError):
+    """Raised when an upload cannot be parsed at all."""
+
+
+class TelemetryWriteError(CosDenError):
+    """Raised when some windows could not be written; carries those windows."""
+
+    def __init__(self, message: str, unwritten: List["WindowAggregate"]) -> None:
+        super().__init__(message)
+        self.unwritten = unwritten
+
+
+@dataclass
+class DeviceInfo:
+    """
+    What CosDenOS.register_device() holds for a telemetry-capable device.
+    """
+    device_id: str
+    model: str
+
+    def __post_init__(self) -> None:
+        if self.model not in DEVICE_MODELS:
+            raise ValueError(f"Unknown device model {self.model!r}; expected one of {DEVICE_MODELS}")
+
+
+@dataclass
+class WindowAggregate:
+    device_id: str
+    model: str
+    window_start: float
+    window_seconds: int
+    events: int = 0
+    sessions_started: int = 0
+    sessions_completed: int = 0
+    usage_seconds: float = 0.0
+
+    @property
+    def usage_minutes(self) -> float:
+        return self.usage_seconds / 60.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "usage_minutes": round(self.usage_minutes, 3)}
+
+
+@dataclass
+class IngestResult:
+    accepted: int = 0
+    rejected: int = 0  # unparseable records / lines
+    dropped: int = 0   # older events pushed out of a full ring
+
+
+# -------------------------
+# Parsing
+# -------------------------
+
+def encode_frame(events: Iterable[Event]) -> bytes:
+    """
+    One binary frame for a batch of events (what devices send).
+    """
+    records = [_RECORD.pack(ts, kind, value) for ts, kind, value in events]
+    return _FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, len(records)) + b"".join(records)
+
+
+def parse_frames(body: bytes) -> Tuple[List[Event], int]:
+    """
+    Events from concatenated binary frames, and the count of records with
+    an unknown kind. A malformed frame raises TelemetryFormatError.
+    """
+    events: List[Event] = []
+    offset = 0
+    view = memoryview(body)
+    while offset < len(body):
+        if len(body) - offset < _FRAME_HEADER.size:
+            raise TelemetryFormatError("Truncated telemetry frame header")
+        magic, version, count = _FRAME_HEADER.unpack_from(body, offset)
+        if magic != FRAME_MAGIC or version != FRAME_VERSION:
+            raise TelemetryFormatError(f"Not a telemetry frame (version {version})")
+        start = offset + _FRAME_HEADER.size
+        end = start + count * _RECORD.size
+        if end > len(body):
+            raise TelemetryFormatError("Truncated telemetry frame")
+        events.extend(_RECORD.iter_unpack(view[start:end]))
+        offset = end
+
+    valid = [e for e in events if SESSION_START <= e[1] <= USAGE]
+    return valid, len(events) - len(valid)
+
+
+def _event_from_json(item: Any) -> Event:
+    kind = item["kind"]
+    if isinstance(kind, str):
+        kind = KINDS[kind]
+    elif isinstance(kind, float) and kind.is_integer():
+        kind = int(kind)
+    # bool is an int subclass, and 1.5 / 1e999 / NaN are not kinds at all.
+    if type(kind) is not int or not SESSION_START <= kind <= USAGE:
+        raise ValueError(f"Unknown telemetry kind: {item['kind']!r}")
+    return float(item["ts"]), kind, float(item.get("value", 0.0))
+
+
+def parse_ndjson(body: bytes) -> Tuple[List[Event], int]:
+    """
+    Events from NDJSON, and the count of lines that were rejected. The
+    happy path is one json.loads over all lines; a bad line makes that
+    batch fall back to line-by-line parsing.
+    """
+    lines = [line for line in body.split(b"\n") if line.strip()]
+    try:
+        items = json.loads(b"[" + b",".join(lines) + b"]")
+        events = [_event_from_json(item) for item in items]
+    except (ValueError, KeyError, TypeError, OverflowError):
+        events = []
+        for line in lines:
+            try:
+                events.append(_event_from_json(json.loads(line)))
+            except (ValueError, KeyError, TypeError, OverflowError):
+                continue
+
+    return events, len(lines) - len(events)
+
+
+# -------------------------
+# Hub
+# -------------------------
+
+@dataclass
+class _Device:
+    model: str
+    ring: Deque[Event]
+    pushed: int = 0
+    dropped: int = 0
+    windows: Dict[float, WindowAggregate] = field(default_factory=dict)  # by window start
+    sessions_completed: int = 0
+    usage_seconds: float = 0.0
+
+
+class TelemetryHub:
+    """
+    Per-device ring buffers, windowed aggregates and their NDJSON sink.
+
+    - device_lookup: returns the registered device object for an ID, or
+      None (CosDenOS.get_device); DeviceInfo objects give the model
+    - directory: where closed windows are written (None = memory only)
+    - retention_seconds / max_skew_seconds: accepted event age, and how
+      far ahead of the server clock a device may be
+    """
+
+    def __init__(
+        self,
+        device_lookup: Callable[[str], Optional[object]],
+        directory: Optional[PathLike] = None,
+        ring_capacity: int = 65536,
+        window_seconds: int = 60,
+        grace_seconds: float = 120.0,
+        retention_seconds: float = 7 * 86400.0,
+        max_skew_seconds: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.device_lookup = device_lookup
+        self.directory = Path(directory) if directory is not None else None
+        self.ring_capacity = ring_capacity
+        self.window_seconds = window_seconds
+        self.grace_seconds = grace_seconds
+        self.retention_seconds = retention_seconds
+        self.max_skew_seconds = max_skew_seconds
+        self.clock = clock
+        self._devices: Dict[str, _Device] = {}
+        self._devices_lock = threading.Lock()  # only taken for a device's first upload
+        self._consume_lock = threading.Lock()
+        self._written = 0
+        self._unwritten: List[WindowAggregate] = []  # failed writes, retried
+
+    # ------------------------------
+    # Producer side
+    # ------------------------------
+
+    def _device(self, device_id: str) -> _Device:
+        device = self._devices.get(device_id)
+        if device is not None:
+            return device
+        info = self.device_lookup(device_id)
+        if info is None:
+            raise UnknownDeviceError(f"Unknown device: {device_id}")
+        with self._devices_lock:
+            device = self._devices.get(device_id)
+            if device is None:
+                device = _Device(
+                    model=getattr(info, "model", type(info).__name__),
+                    ring=deque(maxlen=self.ring_capacity),
+                )
+                self._devices[device_id] = device
+        return device
+
+    def _in_range(self, events: List[Event]) -> List[Event]:
+        now = self.clock()
+        low, high = now - self.retention_seconds, now + self.max_skew_seconds
+        # NaN fails both comparisons, so it is dropped too.
+        return [e for e in events if low <= e[0] <= high and 0.0 <= e[2] < math.inf]
+
+    def ingest_events(self, device_id: str, events: List[Event]) -> IngestResult:
+        """
+        Queue parsed events; those with out-of-range timestamps or values
+        are counted as rejected.
+        """
+        device = self._device(device_id)
+        valid = self._in_range(events)
+        rejected = len(events) - len(valid)
+        events = valid
+        # Approximate under concurrent uploads from one device; exact otherwise.
+        overflow = max(0, len(device.ring) + len(events) - self.ring_capacity)
+        device.ring.extend(events)
+        device.pushed += len(events)
+        device.dropped += overflow
+        return IngestResult(accepted=len(events), rejected=rejected, dropped=overflow)
+
+    def ingest(self, device_id: str, body: bytes, binary: bool) -> IngestResult:
+        """
+        Parse one upload (binary frames, or NDJSON) and queue its events.
+        """
+        self._device(device_id)  # reject unknown devices before parsing
+        events, rejected = parse_frames(body) if binary else parse_ndjson(body)
+        result = self.ingest_events(device_id, events)
+        result.rejected += rejected
+        record_telemetry(result.accepted, result.rejected, result.dropped)
+        return result
+
+    # ------------------------------
+    # Consumer side
+    # ------------------------------
+
+    def drain(self) -> int:
+        """
+        Move queued events into their windows; returns how many moved.
+        """
+        width = self.window_seconds
+        moved = 0
+        with self._consume_lock:
+            for device_id, device in list(self._devices.items()):
+                ring, windows = device.ring, device.windows
+                for _ in range(len(ring)):
+                    ts, kind, value = ring.popleft()
+                    start = ts - ts % width
+                    window = windows.get(start)
+                    if window is None:
+                        window = windows[start] = WindowAggregate(
+                            device_id=device_id,
+                            model=device.model,
+                            window_start=start,
+                            window_seconds=width,
+                        )
+                    window.events += 1
+                    if kind == SESSION_START:
+                        window.sessions_started += 1
+                    else:
+                        window.usage_seconds += value
+                        device.usage_seconds += value
+                        if kind == SESSION_END:
+                            window.sessions_completed += 1
+                            device.sessions_completed += 1
+                    moved += 1
+        return moved
+
+    def close_windows(self, now: Optional[float] = None, force: bool = False) -> List[WindowAggregate]:
+        """
+        Drain, then remove and return windows that ended more than
+        grace_seconds ago (every window with force=True).
+        """
+        self.drain()
+        cutoff = (self.clock() if now is None else now) - self.grace_seconds - self.window_seconds
+        closed: List[WindowAggregate] = []
+        with self._consume_lock:
+            for device in self._devices.values():
+                for start in [s for s in device.windows if force or s <= cutoff]:
+                    closed.append(device.windows.pop(start))
+        closed.sort(key=lambda w: (w.window_start, w.device_id))
+        return closed
+
+    def write(self, windows: List[WindowAggregate]) -> None:
+        """
+        Append windows to the day's NDJSON file (blocking; see run()).
+
+        Every day file is attempted; if any fail, TelemetryWriteError
+        carries just the windows of those days, so a retry does not write
+        the others twice.
+        """
+        if self.directory is None or not windows:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        by_day: Dict[str, List[WindowAggregate]] = {}
+        for window in windows:
+            day = time.strftime("%Y%m%d", time.gmtime(window.window_start))
+            by_day.setdefault(day, []).append(window)
+
+        unwritten: List[WindowAggregate] = []
+        errors: List[str] = []
+        for day, day_windows in by_day.items():
+            data = "".join(json.dumps(w.to_dict()) + "\n" for w in day_windows)
+            try:
+                with open(self.directory / f"telemetry-{day}.ndjson", "a", encoding="utf-8") as f:
+                    f.write(data)
+            except OSError as exc:
+                unwritten.extend(day_windows)
+                errors.append(f"{day}: {exc}")
+                continue
+            self._written += len(day_windows)
+        if unwritten:
+            raise TelemetryWriteError("; ".join(errors), unwritten)
+
+    def _collect_and_write(self, force: bool = False) -> None:
+        # Blocking; run() calls it on a worker thread.
+        windows = self._unwritten + self.close_windows(force=force)
+        self._unwritten = []
+        try:
+            self.write(windows)
+        except TelemetryWriteError as exc:
+            self._unwritten = exc.unwritten
+            raise
+        except Exception:
+            self._unwritten = windows
+            raise
+
+    async def _flush(self, force: bool = False) -> None:
+        try:
+            await asyncio.to_thread(self._collect_and_write, force)
+        except Exception as exc:
+            # One bad batch must not stop the consumer.
+            log_event("telemetry_write_failed", level="ERROR", extra={"error": str(exc)})
+
+    async def run(self, interval_seconds: float = 1.0) -> None:
+        """
+        Consumer loop; run it as a task and cancel it to stop. Windows
+        still open are written on the way out.
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval_seconds)
+                await self._flush()
+        finally:
+            await self._flush(force=True)
+
+    # ------------------------------
+    # Queries
+    # ------------------------------
+
+    def summary(self, device_id: str) -> Dict[str, Any]:
+        """
+        Totals since start, plus the windows not yet written.
+        """
+        device = self._device(device_id)
+        self.drain()
+        with self._consume_lock:
+            windows = [w.to_dict() for _, w in sorted(device.windows.items())]
+        return {
+            "device_id": device_id,
+            "model": device.model,
+            "events": device.pushed,
+            "dropped": device.dropped,
+            "queued": len(device.ring),
+            "sessions_completed": device.sessions_completed,
+            "usage_minutes": round(device.usage_seconds / 60.0, 3),
+            "open_windows": windows,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        devices = list(self._devices.values())
+        return {
+            "devices": len(devices),
+            "queued": sum(len(d.ring) for d in devices),
+            "events": sum(d.pushed for d in devices),
+            "dropped": sum(d.dropped for d in devices),
+            "open_windows": sum(len(d.windows) for d in devices),
+            "windows_written": self._written,
+        }
@@ -0,0 +1,364 @@
+"""
+Lightweight in-process tracing for CosDenOS.
+
+Spans are propagated with contextvars (so they follow a request from the
+ASGI middleware into threadpool endpoints, the planner and the engine) and
+handed to exporters when they end:
+
+    - "log":       one structured log_event("trace_span", ...) per span
+    - "otlp-file": OTLP/JSON lines appended to a local file, importable by
+                   OpenTelemetry collectors
+
+Enable with COSDEN_TRACING=log|otlp-file (COSDEN_TRACE_FILE for the file
+path) or configure_tracing(). With no exporter, span() returns a shared
+no-op object and traced() calls straight through.
+
+Stage timers (add_stage_timer) get (span name, seconds) for every span,
+traced or not: with tracing off they only cost two clock reads, so
+metrics can time request stages without creating spans.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from .logging_utils import log_event
+
+F = TypeVar("F", bound=Callable[..., Any])
+SpanExporter = Callable[["Span"], None]
+StageTimer = Callable[[str, float], None]
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    request_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("cosden_current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("cosden_request_id", default=None)
+
+_exporters: List[SpanExporter] = []
+_enabled = False
+_stage_timers: List[StageTimer] = []
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# -------------------------
+# Span context managers
+# -------------------------
+
+def _time_stage(name: str, seconds: float) -> None:
+    for timer in _stage_timers:
+        try:
+            timer(name, seconds)
+        except Exception:  # pragma: no cover - timers must not break requests
+            pass
+
+
+class _NoopSpan:
+    """Shared stand-in when tracing is disabled."""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _TimedSpan:
+    """Stand-in when tracing is off but stage timers are installed."""
+
+    __slots__ = ("_name", "_start")
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __enter__(self) -> "_TimedSpan":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        _time_stage(self._name, time.perf_counter() - self._start)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+class _ActiveSpan:
+    __slots__ = ("_span", "_token", "_name", "_attributes")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        self._span = Span(
+            name=self._name,
+            trace_id=parent.trace_id if parent is not None else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent is not None else None,
+            start_ns=time.time_ns(),
+            request_id=_request_id.get(),
+            attributes=self._attributes,
+        )
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        span_ = self._span
+        span_.end_ns = time.time_ns()
+        if exc is not None:
+            span_.error = f"{type(exc).__name__}: {exc}"
+        _current_span.reset(self._token)
+        for exporter in _exporters:
+            try:
+                exporter(span_)
+            except Exception:  # pragma: no cover - exporters must not break requests
+                pass
+        if _stage_timers:
+            _time_stage(span_.name, span_.duration_seconds)
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """
+    Context manager timing a nested span under the current one.
+    """
+    if not _enabled:
+        return _TimedSpan(name) if _stage_timers else _NOOP_SPAN
+    return _ActiveSpan(name, attributes)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Decorator form of span(); a plain call-through when tracing and stage
+    timers are off.
+    """
+
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                if not _stage_timers:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    _time_stage(name, time.perf_counter() - start)
+            with _ActiveSpan(name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+# -------------------------
+# Exporters
+# -------------------------
+
+def log_span_exporter(span_: Span) -> None:
+    log_event(
+        "trace_span",
+        level="ERROR" if span_.error else "INFO",
+        extra={
+            "span": span_.name,
+            "trace_id": span_.trace_id,
+            "span_id": span_.span_id,
+            "parent_id": span_.parent_id,
+            "request_id": span_.request_id,
+            "duration_ms": round(span_.duration_seconds * 1000, 3),
+            "attributes": span_.attributes,
+            "error": span_.error,
+        },
+    )
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPFileExporter:
+    """
+    Appends one OTLP/JSON `resourceSpans` document per span to a file.
+    """
+
+    def __init__(self, path: str, service_name: str = "CosDenOS") -> None:
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def __call__(self, span_: Span) -> None:
+        attributes = dict(span_.attributes)
+        if span_.request_id:
+            attributes["cosden.request_id"] = span_.request_id
+        doc = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "CosDenOS.tracing"},
+                    "spans": [{
+                        "traceId": span_.trace_id,
+                        "spanId": span_.span_id,
+                        "parentSpanId": span_.parent_id or "",
+                        "name": span_.name,
+                        "kind": 1,
+                        "startTimeUnixNano": str(span_.start_ns),
+                        "endTimeUnixNano": str(span_.end_ns),
+                        "attributes": [
+                            {"key": k, "value": _otlp_value(v)} for k, v in attributes.items()
+                        ],
+                        "status": (
+                            {"code": 2, "message": span_.error} if span_.error else {"code": 1}
+                        ),
+                    }],
+                }],
+            }],
+        }
+        line = json.dumps(doc, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def add_span_exporter(exporter: SpanExporter) -> None:
+    global _enabled
+    _exporters.append(exporter)
+    _enabled = True
+
+
+def remove_span_exporter(exporter: SpanExporter) -> None:
+    global _enabled
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+    _enabled = bool(_exporters)
+
+
+def add_stage_timer(timer: StageTimer) -> None:
+    """
+    Call timer(name, seconds) as each span ends, without enabling tracing.
+    """
+    _stage_timers.append(timer)
+
+
+def remove_stage_timer(timer: StageTimer) -> None:
+    if timer in _stage_timers:
+        _stage_timers.remove(timer)
+
+
+def configure_tracing(mode: Optional[str] = None, path: Optional[str] = None) -> Optional[SpanExporter]:
+    """
+    Install the exporter named by mode (default: COSDEN_TRACING env).
+
+    Returns the installed exporter, or None if tracing stays off.
+    """
+    mode = (mode if mode is not None else os.getenv("COSDEN_TRACING", "")).strip().lower()
+    if mode in ("", "0", "off", "none"):
+        return None
+
+    exporter: SpanExporter
+    if mode == "log":
+        exporter = log_span_exporter
+    elif mode in ("otlp-file", "otlp"):
+        exporter = OTLPFileExporter(path or os.getenv("COSDEN_TRACE_FILE", "cosden-traces.jsonl"))
+    else:
+        raise ValueError(f"Unknown COSDEN_TRACING mode: {mode}")
+
+    add_span_exporter(exporter)
+    return exporter
+
+
+# -------------------------
+# ASGI middleware
+# -------------------------
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware opening a root span per HTTP request.
+
+    Uses the incoming X-Request-ID (or generates one), exposes it through
+    current_request_id(), and echoes it on the response.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope.get("headers", ()):
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or secrets.token_hex(8)
+
+        rid_token = _request_id.set(request_id)
+        try:
+            with _ActiveSpan(
+                "http.request",
+                {"http.method": scope.get("method", ""), "http.route": scope.get("path", "")},
+            ) as root:
+
+                async def send_wrapper(message: Dict[str, Any]) -> None:
+                    if message["type"] == "http.response.start":
+                        root.set_attribute("http.status_code", message["status"])
+                        headers = list(message.get("headers", []))
+                        headers.append((b"x-request-id", request_id.encode("latin-1")))
+                        message = {**message, "headers": headers}
+                    await send(message)
+
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(rid_token)
@@ -0,0 +1,174 @@
+"""
+Memory-mapped binary Digital Twin files (.cdtwin).
+
+A twin file is a fixed header followed by contiguous little-endian arrays,
+each starting on a 64-byte boundary:
+
+    positions     (N, 3) float32   vertex positions
+    tooth_ids     (N,)   uint8     tooth segmentation (FDI numbers, 0 = gum)
+    color         (N, 3) float32   base shade, linear RGB
+    gloss         (N,)   float32
+    translucency  (N,)   float32
+
+open_twin() maps the file read-only and returns a DigitalTwin whose arrays
+are NumPy views straight into the mapping: nothing is copied or parsed, so
+opening costs the same for any file size, and every worker process that
+opens the same file shares its page-cache pages. Convert existing twins
+saved as .npz with
+
+    python -m CosDenOS.twin_file pack <in.npz> <out.cdtwin>
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from .twin_render import DigitalTwin, np
+
+PathLike = Union[str, Path]
+
+MAGIC = b"CDTWIN01"
+FORMAT_VERSION = 1
+
+_ALIGN = 64
+
+# magic, format version, vertex count, twin id (utf-8, NUL padded),
+# then (offset, byte length) for each array in _ARRAYS order
+_HEADER = struct.Struct("<8sIQ64s10Q")
+
+# name, dtype, columns (0 = 1-D)
+_ARRAYS: Tuple[Tuple[str, str, int], ...] = (
+    ("positions", "<f4", 3),
+    ("tooth_ids", "u1", 0),
+    ("color", "<f4", 3),
+    ("gloss", "<f4", 0),
+    ("translucency", "<f4", 0),
+)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _layout(vertex_count: int) -> List[Tuple[int, int]]:
+    """
+    (offset, byte length) of every array for a given vertex count.
+    """
+    layout = []
+    offset = _aligned(_HEADER.size)
+    for _, dtype, columns in _ARRAYS:
+        length = vertex_count * max(columns, 1) * np.dtype(dtype).itemsize
+        layout.append((offset, length))
+        offset = _aligned(offset + length)
+    return layout
+
+
+def write_twin(path: PathLike, twin: DigitalTwin) -> None:
+    """
+    Write a twin file atomically (temp file + rename), so readers never
+    map a half-written file.
+    """
+    n = twin.vertex_count
+    positions = twin.positions if twin.positions is not None else np.zeros((n, 3), np.float32)
+    tooth_ids = twin.tooth_ids if twin.tooth_ids is not None else np.zeros(n, np.uint8)
+    arrays = {
+        "positions": positions,
+        "tooth_ids": tooth_ids,
+        "color": twin.color,
+        "gloss": twin.gloss,
+        "translucency": twin.translucency,
+    }
+
+    twin_id = (twin.twin_id or "").encode()
+    if len(twin_id) > 64:
+        raise ValueError(f"twin_id longer than 64 bytes: {twin.twin_id}")
+
+    layout = _layout(n)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, n, twin_id, *(v for pair in layout for v in pair)
+    )
+
+    path = Path(path)
+    tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+    with tmp.open("wb") as f:
+        f.write(header)
+        for (name, dtype, _), (offset, _length) in zip(_ARRAYS, layout):
+            f.seek(offset)
+            f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def open_twin(path: PathLike) -> DigitalTwin:
+    """
+    Map a twin file read-only; the returned arrays are views into it.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mm) < _HEADER.size:
+        mm.close()
+        raise ValueError(f"Not a CosDen twin file (too short): {path}")
+    magic, fmt, n, raw_id, *offsets = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or fmt != FORMAT_VERSION:
+        mm.close()
+        raise ValueError(f"Not a CosDen twin file (format {fmt}): {path}")
+
+    # Validate the whole layout before any view exports the mapping:
+    # once one does, the mapping can no longer be closed here.
+    layout = []
+    try:
+        for i, (name, dtype, columns) in enumerate(_ARRAYS):
+            offset, length = offsets[2 * i], offsets[2 * i + 1]
+            count = n * max(columns, 1)
+            if offset + length > len(mm) or length != count * np.dtype(dtype).itemsize:
+                raise ValueError(f"Truncated or corrupt twin file ({name}): {path}")
+            layout.append((name, dtype, columns, count, offset))
+        twin_id = raw_id.rstrip(b"\0").decode() or None
+    except ValueError:
+        mm.close()
+        raise
+
+    views = {}
+    for name, dtype, columns, count, offset in layout:
+        # The views keep the mapping alive; it is unmapped once they are gone.
+        view = np.frombuffer(mm, dtype=dtype, count=count, offset=offset)
+        views[name] = view.reshape(n, columns) if columns else view
+
+    return DigitalTwin(
+        color=views["color"],
+        gloss=views["gloss"],
+        translucency=views["translucency"],
+        twin_id=twin_id,
+        positions=views["positions"],
+        tooth_ids=views["tooth_ids"],
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 3 or args[0] != "pack":
+        print("usage: python -m CosDenOS.twin_file pack <in.npz> <out.cdtwin>")
+        raise SystemExit(2)
+
+    with np.load(args[1]) as data:
+        twin = DigitalTwin(
+            color=data["color"],
+            gloss=data["gloss"],
+            translucency=data["translucency"],
+            twin_id=Path(args[2]).stem,
+            positions=data["positions"] if "positions" in data else None,
+            tooth_ids=data["tooth_ids"] if "tooth_ids" in data else None,
+        )
+    write_twin(args[2], twin)
+    print(f"packed {twin.vertex_count} vertices into {args[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Vectorized Digital Twin renderer.
+
+A DigitalTwin is a set of flat appearance arrays, one row per vertex (or
+per tooth, for coarse twins; the renderer does not care which):
+
+    color         (N, 3) float32, linear RGB in [0, 1]
+    gloss         (N,)   float32, [0, 1]
+    translucency  (N,)   float32, [0, 1]
+
+TwinRenderer applies an aggregated ProductEffect to those arrays with a
+handful of NumPy passes written into preallocated RenderBuffers, and
+produces a shade map (per-row perceived lightness). Nothing runs per
+vertex in Python, and steady-state renders allocate nothing.
+
+NumPy is an optional dependency: pip install "cosden[twin]".
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError as exc:  # pragma: no cover - optional dependency
+    raise ImportError(
+        "CosDenOS.twin_render needs NumPy: pip install 'cosden[twin]'"
+    ) from exc
+
+from .models import ProductEffect
+
+
+# -------------------------
+# Effect → appearance mapping (cosmetic preview only)
+# -------------------------
+
+# Rec. 709 luma weights, used for the shade map and tone neutralizing.
+LUMA = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+
+# Per-channel multipliers for tone shifts.
+TONE_TINTS: Dict[str, np.ndarray] = {
+    "cool": np.array([0.97, 0.99, 1.03], dtype=np.float32),
+    "warm": np.array([1.03, 1.00, 0.95], dtype=np.float32),
+}
+
+# "neutral" pulls chroma this far toward grey.
+NEUTRAL_DESATURATION = 0.15
+
+BRIGHTNESS_GAIN = 1.0
+GLOSS_GAIN = 1.0
+TRANSLUCENCY_GAIN = 1.0
+
+
+def _as_float32(array: np.ndarray, columns: Optional[int], name: str) -> np.ndarray:
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    expected = (columns,) if columns else ()
+    if array.ndim != 1 + len(expected) or array.shape[1:] != expected:
+        shape = f"(N, {columns})" if columns else "(N,)"
+        raise ValueError(f"Digital Twin {name} must have shape {shape}")
+    return array
+
+
+@dataclass
+class DigitalTwin:
+    """
+    Appearance arrays of a scanned smile, plus optional geometry
+    (positions, (N, 3)) and tooth segmentation (tooth_ids, (N,) uint8).
+
+    Arrays are converted to contiguous float32 / uint8 once, at
+    construction; arrays that already are (e.g. views into a mapped
+    twin_file) are used as-is, without copying.
+    """
+    color: np.ndarray
+    gloss: np.ndarray
+    translucency: np.ndarray
+    twin_id: Optional[str] = None
+    positions: Optional[np.ndarray] = None
+    tooth_ids: Optional[np.ndarray] = None
+
+    def __post_init__(self) -> None:
+        self.color = _as_float32(self.color, 3, "color")
+        self.gloss = _as_float32(self.gloss, None, "gloss")
+        self.translucency = _as_float32(self.translucency, None, "translucency")
+        lengths = {self.color.shape[0], self.gloss.shape[0], self.translucency.shape[0]}
+        if self.positions is not None:
+            self.positions = _as_float32(self.positions, 3, "positions")
+            lengths.add(self.positions.shape[0])
+        if self.tooth_ids is not None:
+            self.tooth_ids = np.ascontiguousarray(self.tooth_ids, dtype=np.uint8)
+            lengths.add(self.tooth_ids.shape[0])
+        if len(lengths) != 1:
+            raise ValueError("Digital Twin arrays must all have the same length")
+
+    @property
+    def vertex_count(self) -> int:
+        return int(self.color.shape[0])
+
+    def decimated(self, max_rows: int) -> "DigitalTwin":
+        """
+        Every k-th row, so that at most max_rows remain (a copy), or self
+        if the twin is already small enough.
+        """
+        n = self.vertex_count
+        if max_rows <= 0 or n <= max_rows:
+            return self
+        step = -(-n // max_rows)
+        return DigitalTwin(
+            color=self.color[::step],
+            gloss=self.gloss[::step],
+            translucency=self.translucency[::step],
+            twin_id=self.twin_id,
+            positions=self.positions[::step] if self.positions is not None else None,
+            tooth_ids=self.tooth_ids[::step] if self.tooth_ids is not None else None,
+        )
+
+
+@dataclass
+class RenderBuffers:
+    """
+    Output arrays of one render; reused across renders.
+    """
+    color: np.ndarray         # (N, 3) float32
+    gloss: np.ndarray         # (N,) float32
+    translucency: np.ndarray  # (N,) float32
+    shade_map: np.ndarray     # (N,) float32 perceived lightness in [0, 1]
+
+    @staticmethod
+    def allocate(vertex_count: int) -> "RenderBuffers":
+        return RenderBuffers(
+            color=np.empty((vertex_count, 3), dtype=np.float32),
+            gloss=np.empty(vertex_count, dtype=np.float32),
+            translucency=np.empty(vertex_count, dtype=np.float32),
+            shade_map=np.empty(vertex_count, dtype=np.float32),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.color.nbytes + self.gloss.nbytes + self.translucency.nbytes + self.shade_map.nbytes
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def effect_affine(effect: ProductEffect) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Brightness is a screen blend toward white (or a scale toward black
+    when negative); combined with the tone tint it is one per-channel
+    affine map: color * scale + offset. Returns (scale, offset), float32 (3,).
+    """
+    b = _clamp(effect.brightness_delta * BRIGHTNESS_GAIN, -1.0, 1.0)
+    if b >= 0.0:
+        scale = np.full(3, 1.0 - b, dtype=np.float32)
+        offset = np.full(3, b, dtype=np.float32)
+    else:
+        scale = np.full(3, 1.0 + b, dtype=np.float32)
+        offset = np.zeros(3, dtype=np.float32)
+    tint = TONE_TINTS.get(effect.tone_shift or "")
+    if tint is not None:
+        scale *= tint
+        offset *= tint
+    return scale, offset
+
+
+class TwinRenderer:
+    """
+    Renders ProductEffects onto one DigitalTwin.
+
+    render() writes into the renderer's own buffers unless `out` is given,
+    and returns them; they are overwritten by the next render(), so copy
+    what must outlive it. Concurrent callers should pass their own
+    RenderBuffers (see allocate_buffers()).
+    """
+
+    def __init__(self, twin: DigitalTwin) -> None:
+        self.twin = twin
+        self._buffers = RenderBuffers.allocate(twin.vertex_count)
+        self._lock = threading.Lock()
+
+    @property
+    def buffer_nbytes(self) -> int:
+        return self._buffers.nbytes
+
+    def allocate_buffers(self) -> RenderBuffers:
+        return RenderBuffers.allocate(self.twin.vertex_count)
+
+    def render(self, effect: ProductEffect, out: Optional[RenderBuffers] = None) -> RenderBuffers:
+        if out is None:
+            with self._lock:
+                return self._render(effect, self._buffers)
+        return self._render(effect, out)
+
+    def _render(self, effect: ProductEffect, out: RenderBuffers) -> RenderBuffers:
+        twin = self.twin
+
+        scale, offset = effect_affine(effect)
+        color = out.color
+        np.multiply(twin.color, scale, out=color)
+        np.add(color, offset, out=color)
+
+        if effect.tone_shift == "neutral":
+            np.matmul(color, LUMA, out=out.shade_map)
+            out.shade_map *= NEUTRAL_DESATURATION
+            color *= 1.0 - NEUTRAL_DESATURATION
+            color += out.shade_map[:, None]
+
+        np.clip(color, 0.0, 1.0, out=color)
+        np.matmul(color, LUMA, out=out.shade_map)
+
+        np.add(twin.gloss, np.float32(effect.gloss_delta * GLOSS_GAIN), out=out.gloss)
+        np.clip(out.gloss, 0.0, 1.0, out=out.gloss)
+
+        np.add(
+            twin.translucency,
+            np.float32(effect.opalescence_delta * TRANSLUCENCY_GAIN),
+            out=out.translucency,
+        )
+        np.clip(out.translucency, 0.0, 1.0, out=out.translucency)
+        return out
@@ -0,0 +1,319 @@
+"""
+Multi-twin store: many users' Digital Twins behind one engine.
+
+Twins are keyed by twin ID and held within a memory budget. The least
+recently used twin is evicted when a load would exceed the budget, except
+twins pinned by an active session. Evicted twins are reloaded lazily from
+the store directory (<dir>/<twin_id>.cdtwin, see twin_file) on next use.
+
+With lod_levels, every twin gets a level-of-detail pyramid when it is
+loaded: decimated copies of at most that many rows each, so a coarse
+preview can be rendered without first touching the full twin.
+
+    store = TwinStore("/var/lib/cosden/twins", memory_budget_bytes=2 << 30)
+    engine.attach_twin_store(store)
+
+    with store.session("smile-42"):   # pinned while the user is active
+        engine.render_twin(effect, twin_id="smile-42")
+"""
+
+from __future__ import annotations
+
+import itertools
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .errors import CosDenError
+
+if TYPE_CHECKING:  # NumPy is optional; twin modules are imported on first load.
+    from .twin_render import DigitalTwin, TwinRenderer
+
+PathLike = Union[str, Path]
+
+# Twin IDs become file names, so keep them to a safe alphabet.
+_TWIN_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class UnknownTwinError(CosDenError):
+    """Raised when a twin ID is neither loaded nor found in storage."""
+
+
+def twin_nbytes(twin: Any) -> int:
+    """
+    Bytes held by a twin's arrays (mapped pages included).
+    """
+    total = 0
+    for name in ("color", "gloss", "translucency", "positions", "tooth_ids"):
+        array = getattr(twin, name, None)
+        if array is not None:
+            total += int(array.nbytes)
+    return total
+
+
+@dataclass
+class _Entry:
+    twin: "DigitalTwin"
+    nbytes: int
+    version: int
+    pins: int = 0
+    # max rows -> decimated twin (the LOD pyramid)
+    lods: Dict[int, "DigitalTwin"] = field(default_factory=dict)
+    # resolution (None = full twin) -> renderer
+    renderers: Dict[Optional[int], "TwinRenderer"] = field(default_factory=dict)
+
+
+class TwinStore:
+    """
+    Each twin carries a version: its file's mtime for file-backed twins
+    (stable across eviction and reload), otherwise a counter bumped on
+    every put(). Listeners added with add_listener() are told the twin ID
+    whenever put() replaces a twin.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[PathLike] = None,
+        memory_budget_bytes: int = 1 << 30,
+        loader: Optional[Callable[[str], "DigitalTwin"]] = None,
+        lod_levels: Iterable[int] = (),
+    ) -> None:
+        self.directory = Path(directory) if directory is not None else None
+        self.memory_budget_bytes = memory_budget_bytes
+        self.lod_levels: Tuple[int, ...] = tuple(sorted({n for n in lod_levels if n > 0}))
+        self._loader = loader
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0}
+        self._versions = itertools.count(1)
+        self._listeners: List[Callable[[str], None]] = []
+
+    # ------------------------------
+    # Storage
+    # ------------------------------
+
+    def _path(self, twin_id: str) -> Path:
+        if not _TWIN_ID.match(twin_id):
+            raise UnknownTwinError(f"Invalid twin id: {twin_id!r}")
+        if self.directory is None:
+            raise UnknownTwinError(f"Unknown twin: {twin_id}")
+        return self.directory / f"{twin_id}.cdtwin"
+
+    def _load(self, twin_id: str) -> Tuple["DigitalTwin", int]:
+        if self._loader is not None:
+            return self._loader(twin_id), next(self._versions)
+        path = self._path(twin_id)
+        try:
+            version = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise UnknownTwinError(f"Unknown twin: {twin_id}") from None
+
+        from .twin_file import open_twin
+
+        return open_twin(path), version
+
+    # ------------------------------
+    # Residency
+    # ------------------------------
+
+    def _evict_for(self, incoming: int) -> None:
+        # Caller holds the lock. Pinned twins are skipped, so a store full
+        # of pinned twins may run over budget rather than fail a session.
+        for twin_id in list(self._entries):
+            if self._bytes + incoming <= self.memory_budget_bytes:
+                return
+            entry = self._entries[twin_id]
+            if entry.pins:
+                continue
+            del self._entries[twin_id]
+            self._bytes -= entry.nbytes
+            self._counts["evictions"] += 1
+
+    def _pyramid(self, twin: "DigitalTwin") -> Dict[int, "DigitalTwin"]:
+        lods: Dict[int, "DigitalTwin"] = {}
+        for max_rows in self.lod_levels:
+            lod = twin.decimated(max_rows)
+            if lod is twin:
+                break  # this and every larger level would be the full twin
+            lods[max_rows] = lod
+        return lods
+
+    def _insert(
+        self, twin_id: str, twin: "DigitalTwin", version: int, lods: Dict[int, "DigitalTwin"]
+    ) -> _Entry:
+        # Caller holds the lock; the pyramid is built before taking it.
+        nbytes = twin_nbytes(twin) + sum(twin_nbytes(lod) for lod in lods.values())
+        old = self._entries.pop(twin_id, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._evict_for(nbytes)
+        entry = _Entry(
+            twin=twin, nbytes=nbytes, version=version, pins=old.pins if old else 0, lods=lods
+        )
+        self._entries[twin_id] = entry
+        self._bytes += nbytes
+        return entry
+
+    def _entry(self, twin_id: str, pin: bool = False) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(twin_id)
+            if entry is not None:
+                self._entries.move_to_end(twin_id)
+                if pin:
+                    entry.pins += 1
+                else:
+                    self._counts["hits"] += 1
+                return entry
+            self._counts["misses"] += 1
+        # Decimating copies the twin, so load and build the pyramid without
+        # the lock; lookups of other twins go on meanwhile.
+        twin, version = self._load(twin_id)
+        lods = self._pyramid(twin)
+        with self._lock:
+            entry = self._entries.get(twin_id)
+            if entry is None:
+                entry = self._insert(twin_id, twin, version, lods)
+            else:
+                self._entries.move_to_end(twin_id)  # loaded or put meanwhile
+            if pin:
+                entry.pins += 1
+            return entry
+
+    def get(self, twin_id: str) -> "DigitalTwin":
+        return self._entry(twin_id).twin
+
+    def version(self, twin_id: str) -> int:
+        return self._entry(twin_id).version
+
+    def peek_version(self, twin_id: str) -> int:
+        """
+        Version of a twin without loading it: the resident entry's, else
+        the stored file's (UnknownTwinError if there is none). Only a
+        custom loader has to load the twin to answer.
+        """
+        with self._lock:
+            entry = self._entries.get(twin_id)
+            if entry is not None:
+                return entry.version
+        if self._loader is not None:
+            return self.version(twin_id)
+        try:
+            return self._path(twin_id).stat().st_mtime_ns
+        except FileNotFoundError:
+            raise UnknownTwinError(f"Unknown twin: {twin_id}") from None
+
+    def lods(self, twin_id: str) -> List[int]:
+        """
+        The twin's precomputed LOD levels (max rows), coarsest first. Levels
+        at or above the twin's size are left out: they are the full twin.
+        """
+        return sorted(self._entry(twin_id).lods)
+
+    def renderer(self, twin_id: str, resolution: Optional[int] = None) -> "TwinRenderer":
+        """
+        The twin's TwinRenderer for a resolution (max rendered rows, None
+        for the full twin), created on first use and dropped with the twin.
+        """
+        entry = self._entry(twin_id)
+        renderer = entry.renderers.get(resolution)
+        if renderer is None:
+            from .twin_render import TwinRenderer
+
+            extra = 0
+            twin = entry.lods.get(resolution) if resolution else entry.twin
+            if twin is None:
+                twin = entry.twin.decimated(resolution)
+                if twin is not entry.twin:
+                    extra += twin_nbytes(twin)
+            renderer = TwinRenderer(twin)
+            # Render buffers (and ad-hoc decimated copies) count against the budget.
+            extra += renderer.buffer_nbytes
+            with self._lock:
+                if resolution not in entry.renderers:
+                    entry.renderers[resolution] = renderer
+                    entry.nbytes += extra
+                    if self._entries.get(twin_id) is entry:
+                        self._bytes += extra
+                renderer = entry.renderers[resolution]
+        return renderer
+
+    def put(self, twin_id: str, twin: "DigitalTwin", persist: bool = True) -> None:
+        """
+        Add or replace a twin. With a store directory and persist=True it
+        is also written there, so it can be reloaded after eviction.
+        """
+        if persist and self.directory is not None:
+            from .twin_file import write_twin
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(twin_id)
+            write_twin(path, twin)
+            version = path.stat().st_mtime_ns
+        else:
+            version = next(self._versions)
+        lods = self._pyramid(twin)
+        with self._lock:
+            old = self._entries.get(twin_id)
+            if old is not None and old.version >= version:
+                version = old.version + 1  # coarse mtime: still a new version
+            self._insert(twin_id, twin, version, lods)
+        for listener in self._listeners:
+            listener(twin_id)
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        self._listeners.append(listener)
+
+    def __contains__(self, twin_id: object) -> bool:
+        return twin_id in self._entries
+
+    # ------------------------------
+    # Sessions
+    # ------------------------------
+
+    def pin(self, twin_id: str) -> "DigitalTwin":
+        """
+        Load (if needed) and protect a twin from eviction until unpin().
+        Pins are counted, so nested sessions on one twin are fine.
+        """
+        return self._entry(twin_id, pin=True).twin
+
+    def unpin(self, twin_id: str) -> None:
+        with self._lock:
+            entry = self._entries.get(twin_id)
+            if entry is not None and entry.pins > 0:
+                entry.pins -= 1
+            self._evict_for(0)
+
+    @contextmanager
+    def session(self, twin_id: str) -> Iterator["DigitalTwin"]:
+        twin = self.pin(twin_id)
+        try:
+            yield twin
+        finally:
+            self.unpin(twin_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "budget_bytes": self.memory_budget_bytes,
+                "pinned": sum(1 for e in self._entries.values() if e.pins),
+                **self._counts,
+            }
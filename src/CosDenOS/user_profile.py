@@ -1,10 +1,60 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from .age import AgeProfile
 
+if TYPE_CHECKING:
+    from .models import ProductEffect
+
+
+# Warmth (mean R - B of tooth pixels) beyond which a baseline reads as
+# warm / cool; in between it is neutral.
+WARM_THRESHOLD = 0.12
+COOL_THRESHOLD = 0.02
+
+
+@dataclass
+class ShadeBaseline:
+    """
+    A user's measured starting shade, estimated from HomeScan photos
+    (see homescan). Appearance measures only, all on a [0, 1] scale:
+
+    - lightness: mean perceived lightness (Rec. 709 luma) of tooth pixels
+    - lightness_std: spread of lightness across tooth pixels (evenness)
+    - warmth: mean red-minus-blue of tooth pixels (yellow/warm cast)
+    - tooth_lightness: per-region lightness, by tooth label
+    - pixels / scans: how much data the estimate rests on
+    """
+    lightness: float
+    lightness_std: float
+    warmth: float
+    tooth_lightness: Dict[int, float] = field(default_factory=dict)
+    pixels: int = 0
+    scans: int = 1
+
+    @property
+    def tone(self) -> str:
+        if self.warmth >= WARM_THRESHOLD:
+            return "warm"
+        if self.warmth <= COOL_THRESHOLD:
+            return "cool"
+        return "neutral"
+
+    def projected_lightness(self, effect: "ProductEffect") -> float:
+        """
+        Lightness after an effect, with the twin renderer's brightness map
+        (screen blend toward white, or scale toward black when negative).
+        """
+        b = max(-1.0, min(1.0, effect.brightness_delta))
+        if b >= 0.0:
+            return self.lightness + b * (1.0 - self.lightness)
+        return self.lightness * (1.0 + b)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "tone": self.tone}
+
 
 @dataclass
 class CosmeticUserProfile:
@@ -18,6 +68,7 @@ class CosmeticUserProfile:
     - sensitivity_flag: if True, planner should bias to gentler stacks
     - event_time_hours: when the user cares about looking best (None = general)
     - notes: freeform cosmetic-only notes (e.g. "coffee drinker", "photoshoot")
+    - baseline: measured starting shade from HomeScan, if the user has one
     """
     age_years: int
     age_profile: AgeProfile
@@ -25,6 +76,7 @@ class CosmeticUserProfile:
     sensitivity_flag: bool = False
     event_time_hours: Optional[int] = None
     notes: Optional[str] = None
+    baseline: Optional[ShadeBaseline] = None
 
     @staticmethod
     def from_age(
@@ -33,6 +85,7 @@ class CosmeticUserProfile:
         sensitivity_flag: bool = False,
         event_time_hours: Optional[int] = None,
         notes: Optional[str] = None,
+        baseline: Optional[ShadeBaseline] = None,
     ) -> "CosmeticUserProfile":
         from .age import AgeProfile as AP  # avoid cycle
 
@@ -43,4 +96,5 @@ class CosmeticUserProfile:
             sensitivity_flag=sensitivity_flag,
             event_time_hours=event_time_hours,
             notes=notes,
+            baseline=baseline,
         )
@@ -0,0 +1,20 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def json_response():
+    """
+    Factory for canned requests.Response objects: json_response(status, body).
+    """
+    requests = pytest.importorskip("requests")
+
+    def make(status, body):
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = json.dumps(body).encode()
+        resp.headers["Content-Type"] = "application/json"
+        return resp
+
+    return make
@@ -0,0 +1,42 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from CosDenOS.ar_preview import SmilePreviewer
+from CosDenOS.models import ProductEffect, SimulationResult
+
+
+def _frame(height=300, width=200):
+    rng = np.random.default_rng(3)
+    image = rng.integers(60, 200, (height, width, 3), dtype=np.uint8)
+    mask = np.zeros((height, width), dtype=bool)
+    mask[100:260, 40:160] = True
+    return image, mask
+
+
+def test_effect_applies_only_inside_mask_and_tiles_agree():
+    image, mask = _frame()
+    result = SimulationResult(
+        stack_codes=["A1"],
+        aggregated_effect=ProductEffect(brightness_delta=0.3, gloss_delta=0.2, tone_shift="neutral"),
+    )
+    with SmilePreviewer(tile_rows=32, workers=3) as tiled, SmilePreviewer(tile_rows=10_000, workers=1) as whole:
+        out = tiled.preview(image, mask, result)
+        np.testing.assert_array_equal(out, whole.preview(image, mask, result))
+
+    assert np.array_equal(out[~mask], image[~mask])
+    assert np.all(out[mask].astype(int).sum(axis=-1) > image[mask].astype(int).sum(axis=-1))
+
+
+def test_soft_mask_blends_and_stream_reuses_output():
+    image, mask = _frame()
+    effect = ProductEffect(brightness_delta=0.5)
+    previewer = SmilePreviewer(workers=1)
+    full = previewer.preview(image, mask, effect).astype(int)
+    half = previewer.preview(image, mask * np.float32(0.5), effect).astype(int)
+    np.testing.assert_allclose(half[mask], (image[mask] + full[mask]) / 2, atol=1)
+
+    frames = list(previewer.stream([(image, mask), (image, mask)], effect))
+    assert frames[0] is frames[1]
+    np.testing.assert_array_equal(frames[1], full)
+    assert previewer.preview(image, np.zeros_like(mask), effect) is not image
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from CosDenOS.api import create_app
+from CosDenOS.clients import AsyncCosDenClient, CosDenClientConfig, CosDenHTTPError
+
+
+def _client(max_concurrency=4):
+    config = CosDenClientConfig(base_url="http://cosden.test", max_concurrency=max_concurrency)
+    return AsyncCosDenClient(config, transport=httpx.ASGITransport(app=create_app()))
+
+
+def test_async_client_against_in_process_app():
+    async def scenario():
+        async with _client() as client:
+            health = await client.health()
+            plan = await client.plan(age_years=30, request_text="daily routine")
+            sim = await client.simulate(age_years=30, codes=["A1", "C1"])
+            with pytest.raises(CosDenHTTPError, match="400"):
+                await client.simulate(age_years=30, codes=["Z9"])
+            return health, plan, sim
+
+    health, plan, sim = asyncio.run(scenario())
+    assert health["status"] == "ok"
+    assert plan["cosmetic_only"] is True
+    assert sim["simulation"]["stack_codes"] == ["A1", "C1"]
+
+
+def test_simulate_many_respects_concurrency_bound():
+    in_flight = 0
+    peak = 0
+
+    async def scenario():
+        async with _client(max_concurrency=3) as client:
+            original = client._request
+
+            async def tracking_request(*args, **kwargs):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                try:
+                    await asyncio.sleep(0.01)
+                    return await original(*args, **kwargs)
+                finally:
+                    in_flight -= 1
+
+            client._request = tracking_request
+            return await client.simulate_many(
+                [{"age_years": 30, "codes": [code]} for code in ["A1", "C1", "E1", "D1"] * 3]
+            )
+
+    results = asyncio.run(scenario())
+    assert len(results) == 12
+    assert [r["simulation"]["stack_codes"][0] for r in results[:4]] == ["A1", "C1", "E1", "D1"]
+    assert peak == 3
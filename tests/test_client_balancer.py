@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from CosDenOS.clients import CosDenClient, CosDenClientConfig
+from CosDenOS.clients.balancer import EndpointBalancer, HealthProber
+
+
+def test_p2c_prefers_lower_score_and_ejects_failing_endpoints():
+    balancer = EndpointBalancer(["http://a", "http://b"], eject_after_failures=2)
+    a, b = balancer.endpoints
+    balancer.begin(a)
+    balancer.end(a, 0.5, ok=True)
+    balancer.begin(b)
+    balancer.end(b, 0.01, ok=True)
+    assert all(balancer.pick() is b for _ in range(20))
+
+    balancer.begin(b)
+    balancer.end(b, 0.01, ok=False)
+    balancer.begin(b)
+    balancer.end(b, 0.01, ok=False)
+    assert balancer.stats()["http://b"]["ejected"] == 1.0
+    assert all(balancer.pick() is a for _ in range(20))
+
+    # Everything ejected: fail open rather than having no target.
+    balancer.mark_health(a, healthy=False)
+    assert balancer.pick() in (a, b)
+
+    HealthProber(balancer, lambda url: url == "http://b", 60.0).check_once()
+    assert balancer.stats()["http://b"]["ejected"] == 0.0
+    assert balancer.stats()["http://a"]["ejected"] == 1.0
+
+
+class RoutingSession:
+    """Answers per replica: a callable(url) -> response or exception."""
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.urls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, json=None, headers=None, timeout=None):
+        with self._lock:
+            self.urls.append(url)
+        for prefix, handler in self.handlers.items():
+            if url.startswith(prefix):
+                outcome = handler()
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+        raise AssertionError(url)
+
+    def close(self):
+        pass
+
+
+def _config(**overrides):
+    return CosDenClientConfig(
+        endpoints=("http://a", "http://b"), backoff_base_seconds=0.0, **overrides
+    )
+
+
+def test_retries_move_to_another_replica(json_response):
+    session = RoutingSession({
+        "http://a": lambda: requests.exceptions.ConnectionError("down"),
+        "http://b": lambda: json_response(200, {"status": "ok"}),
+    })
+    client = CosDenClient(_config(eject_after_failures=1), session=session)
+    for _ in range(5):
+        assert client.health() == {"status": "ok"}
+    # At most one attempt ever reached the dead replica before it was ejected.
+    assert sum(url.startswith("http://a") for url in session.urls) <= 1
+
+
+def test_hedged_request_returns_the_faster_replica(json_response):
+    def slow():
+        time.sleep(0.5)
+        return json_response(200, {"replica": "slow"})
+
+    session = RoutingSession({
+        "http://a": slow,
+        "http://b": lambda: json_response(200, {"replica": "fast"}),
+    })
+    client = CosDenClient(_config(hedge_after_seconds=0.02), session=session)
+    client._balancer.endpoints[1].ewma_seconds = 1.0  # make "a" the first pick
+
+    start = time.monotonic()
+    assert client.health() == {"replica": "fast"}
+    assert time.monotonic() - start < 0.4
+    client.close()
@@ -1,3 +1,7 @@
+import json
+import time
+
+import pytest
 from fastapi.testclient import TestClient
 
 from CosDenOS.api import app
@@ -64,3 +68,183 @@ def test_simulate_endpoint_with_direct_codes():
     sim = data["simulation"]
     assert sim["stack_codes"] == ["A1", "C1", "E1"]
     assert sim["aggregated_effect"]["brightness_delta"] > 0.0
+    assert sim["projected_lightness"] is None
+
+    payload["user"]["baseline"] = {"lightness": 0.6, "warmth": 0.15}
+    sim = client.post("/simulate", json=payload).json()["simulation"]
+    assert sim["baseline_lightness"] == 0.6
+    assert sim["projected_lightness"] > 0.6
+
+
+def test_simulate_stream_ndjson_preserves_order_and_reports_errors():
+    user = {"age_years": 30}
+    rows = [
+        {"user": user, "codes": ["A1", "C1"]},
+        {"user": user, "codes": ["Z9"]},
+        {"user": user, "codes": ["E1"]},
+    ]
+
+    def body():
+        for row in rows:
+            yield (json.dumps(row) + "\n").encode()
+        yield b"not json\n"
+
+    resp = client.post("/simulate/stream", content=body())
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["line"] for line in lines] == [1, 2, 3, 4]
+    assert [line["status"] for line in lines] == [200, 400, 200, 422]
+    assert lines[0]["result"]["simulation"]["stack_codes"] == ["A1", "C1"]
+    assert lines[2]["result"]["simulation"]["stack_codes"] == ["E1"]
+
+
+def test_simulate_stream_caps_line_length_and_reports_internal_errors(monkeypatch):
+    import CosDenOS.api as api
+
+    monkeypatch.setattr(api, "COSDEN_STREAM_MAX_LINE_BYTES", 100)
+    row = (json.dumps({"user": {"age_years": 30}, "codes": ["A1"]}) + "\n").encode()
+
+    def body():
+        yield row
+        yield b'{"user": ' + b" " * 80  # a line split across chunks...
+        yield b" " * 80 + b"}\n"  # ...that ends up over the limit
+        yield row[:10]
+        yield row[10:]
+        yield b"x" * 500  # unterminated, still over the limit
+
+    resp = client.post("/simulate/stream", content=body())
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [(line["line"], line["status"]) for line in lines] == [(1, 200), (2, 413), (3, 200), (4, 413)]
+
+    def boom(engine, payload):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(api, "_run_simulation", boom)
+    lines = client.post("/simulate/stream", content=row + row).text.splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"line": 1, "status": 500, "detail": "Internal server error"},
+        {"line": 2, "status": 500, "detail": "Internal server error"},
+    ]
+
+
+def test_catalog_conditional_get_and_filters():
+    resp = client.get("/catalog", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    etag = resp.headers["etag"]
+    codes = {p["code"] for p in resp.json()["products"]}
+    assert {"A1", "C1", "E1"} <= codes
+
+    again = client.get(
+        "/catalog",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+    kids = client.get("/catalog", params={"age_years": 8}).json()["products"]
+    assert kids and all(not p["code"].startswith("A") for p in kids)
+
+    series_c = client.get("/catalog", params={"series": "c"}).json()["products"]
+    assert series_c and all(p["series"] == "C" for p in series_c)
+
+    assert client.get("/catalog", params={"series": "Z"}).status_code == 400
+
+
+def test_catalog_serves_brotli_with_the_api_extra():
+    pytest.importorskip("brotli")
+    resp = client.get("/catalog", headers={"Accept-Encoding": "br"})
+    assert resp.headers["content-encoding"] == "br"
+    assert {"A1", "C1", "E1"} <= {p["code"] for p in resp.json()["products"]}
+
+
+def test_admin_catalog_reload_swaps_catalog(monkeypatch):
+    import CosDenOS.api as api
+
+    monkeypatch.setattr(api, "COSDEN_ADMIN_TOKEN", "s3cret")
+    admin_client = TestClient(api.create_app())
+
+    products = admin_client.get("/catalog").json()["products"]
+    only_c1 = [p for p in products if p["code"] == "C1"]
+
+    denied = admin_client.post("/admin/catalog/reload", json={"products": only_c1})
+    assert denied.status_code == 401
+
+    resp = admin_client.post(
+        "/admin/catalog/reload",
+        json={"products": only_c1},
+        headers={"X-CosDen-Admin-Token": "s3cret"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["product_count"] == 1
+
+    codes = [p["code"] for p in admin_client.get("/catalog").json()["products"]]
+    assert codes == ["C1"]
+
+    def reload(**overrides):
+        return admin_client.post(
+            "/admin/catalog/reload",
+            json={"products": [{**only_c1[0], **overrides}]},
+            headers={"X-CosDen-Admin-Token": "s3cret"},
+        )
+
+    assert reload(age_max="17").status_code == 200  # coerced like the other fields
+    assert admin_client.get("/catalog").json()["products"][0]["age_max"] == 17
+    for bad in ({"age_max": "old"}, {"age_min": 13, "age_max": 5}):
+        resp = reload(**bad)
+        assert resp.status_code == 400
+        assert "products[0]" in json.dumps(resp.json())
+
+
+def test_simulate_etag_revalidation():
+    payload = {"user": {"age_years": 30}, "codes": ["A1"]}
+    first = client.post("/simulate", json=payload)
+    assert first.status_code == 200
+    assert first.headers["X-CosDen-Catalog-Version"]
+
+    again = client.post(
+        "/simulate", json=payload, headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert again.status_code == 304
+
+    other = client.post(
+        "/simulate",
+        json={"user": {"age_years": 30}, "codes": ["C1"]},
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert other.status_code == 200
+
+
+def test_device_telemetry_upload(monkeypatch):
+    import CosDenOS.api as api
+    from CosDenOS.telemetry import SESSION_END, encode_frame
+
+    monkeypatch.setattr(api, "COSDEN_ADMIN_TOKEN", "s3cret")
+    device_client = TestClient(api.create_app())
+    frame = encode_frame([(time.time() - 10, SESSION_END, 120.0)])
+
+    assert device_client.post("/devices/sb-7/telemetry", content=frame).status_code == 404
+    resp = device_client.put(
+        "/admin/devices/sb-7", json={"model": "ShineBar"}, headers={"X-CosDen-Admin-Token": "s3cret"}
+    )
+    assert resp.status_code == 200
+
+    resp = device_client.post(
+        "/devices/sb-7/telemetry",
+        content=frame,
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert resp.status_code == 202
+    assert resp.json()["accepted"] == 1
+    summary = device_client.get("/devices/sb-7/telemetry").json()
+    assert summary["sessions_completed"] == 1 and summary["usage_minutes"] == 2.0
+
+    monkeypatch.setattr(api, "COSDEN_TELEMETRY_MAX_BYTES", 64)
+    resp = device_client.post(
+        "/devices/sb-7/telemetry",
+        content=encode_frame([(time.time(), SESSION_END, 1.0)] * 10),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert resp.status_code == 413
@@ -1,4 +1,5 @@
 import json
+import os
 
 from CosDenOS import CosDenOS
 from CosDenOS.age import AgeProfile
@@ -65,3 +66,38 @@ def test_kid_goal_never_returns_A_series():
     codes = stack.codes()
     # Kids should not get A-series whitening
     assert all(not c.startswith("A") for c in codes)
+
+
+def test_catalog_swap_keeps_pinned_snapshot_and_runs_hooks():
+    os_ = CosDenOS()
+    os_.load_default_catalog()
+
+    prepared = []
+    os_.add_catalog_hook(lambda snap: prepared.append(snap.version))
+
+    pinned = os_.catalog_snapshot
+    os_.set_catalog({"C1": os_.get_product("C1")})
+
+    assert prepared == [pinned.version + 1]
+    assert os_.catalog_version == pinned.version + 1
+    assert [p.code for p in os_.list_products()] == ["C1"]
+    # A request that started on the old snapshot still resolves old codes.
+    assert os_.build_stack(["A1"], snapshot=pinned).codes() == ["A1"]
+
+
+def test_catalog_file_watcher_reloads_on_change(tmp_path):
+    from CosDenOS.catalog_snapshot import CatalogFileWatcher
+
+    os_ = CosDenOS()
+    os_.load_default_catalog()
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps([os_.get_product("E1").to_dict()]))
+
+    watcher = CatalogFileWatcher(os_, path)
+    assert watcher.check_once() is False  # unchanged since construction
+
+    path.write_text(json.dumps({"products": [os_.get_product("C1").to_dict()]}))
+    os.utime(path, ns=(0, 1))
+    assert watcher.check_once() is True
+    assert [p.code for p in os_.list_products()] == ["C1"]
+    assert os_.catalog_snapshot.source == str(path)
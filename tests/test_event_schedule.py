@@ -0,0 +1,153 @@
+import itertools
+import time
+from dataclasses import replace
+
+import pytest
+
+from CosDenOS import CosDenOS, CosmeticPlannerAgent, CosmeticUserProfile
+from CosDenOS.event_schedule import (
+    DECAY_PER_DAY,
+    INTENSIVE_GAP_HOURS,
+    MAX_SCHEDULE_STEPS,
+    ScheduleLimits,
+    _score,
+    _solve,
+    build_schedule,
+    cache_info,
+    candidates,
+    slot_hours_before,
+)
+from CosDenOS.goals import CosmeticGoal, CosmeticGoalType
+
+
+def _engine():
+    engine = CosDenOS()
+    engine.load_default_catalog()
+    return engine
+
+
+def _brute_force(options, slots, limits):
+    # Every assignment of at most max_steps options to distinct slots.
+    best = 0.0
+    choices = [None] + list(options)
+    for picks in itertools.product(choices, repeat=len(slots)):
+        used = [(o, h) for o, h in zip(picks, slots) if o is not None]
+        if len(used) > limits.max_steps or sum(o[1] for o, _ in used) > limits.intensity_budget:
+            continue
+        intensive = sorted(h for o, h in used if o[1] >= 2)
+        if any(b - a < INTENSIVE_GAP_HOURS for a, b in zip(intensive, intensive[1:])):
+            continue
+        raw = [0.0, 0.0, 0.0]
+        for (_, _, deltas, _), h in used:
+            for d in range(3):
+                raw[d] += deltas[d] * DECAY_PER_DAY[d] ** (h / 24.0)
+        best = max(best, _score(tuple(raw)))
+    return best
+
+
+def test_slots_are_finer_near_the_event():
+    assert slot_hours_before(0) == (0,)
+    assert slot_hours_before(7) == (0, 2, 4, 6)
+    hours = slot_hours_before(1000)
+    assert hours[:9] == (0, 2, 4, 6, 8, 10, 12, 18, 24) and hours[-1] == 7 * 24
+    assert slot_hours_before(30) == slot_hours_before(31)
+    assert all(b > a for a, b in zip(hours, hours[1:]))
+
+
+def test_search_matches_brute_force():
+    engine = _engine()
+    products = [p for p in engine.list_products() if p.code in ("A2", "C2", "E1", "F1")]
+    limits = ScheduleLimits(max_steps=3, intensity_budget=6)
+    options = candidates(products, limits, "cool")
+    slots = (0, 2, 4, 10, 24, 30)
+    score, plan = _solve(options, slots, limits)
+    assert score == pytest.approx(_brute_force(options, slots, limits), abs=0.01)
+    assert len(plan) <= 3
+
+
+def test_schedule_respects_limits_age_and_tone():
+    engine = _engine()
+    goal = CosmeticGoal(CosmeticGoalType.EVENT_MAXIMIZE, tone_preference="warm", target_event_hours=72)
+    schedule = engine.schedule_for_event(goal, age_years=30)
+    products = {p.code: p for p in engine.list_products()}
+
+    assert 0 < len(schedule.applications) <= goal.max_steps
+    assert "F1" not in schedule.codes()  # cool booster, warm preference
+    assert sum(products[c].intensity_level for c in schedule.codes()) <= 2 * goal.max_steps
+    intensive = [a.hours_before_event for a in schedule.applications if products[a.code].intensity_level >= 2]
+    assert all(a - b >= INTENSIVE_GAP_HOURS for a, b in zip(intensive, intensive[1:]))
+    assert [a.hours_from_now for a in schedule.applications] == sorted(
+        a.hours_from_now for a in schedule.applications
+    )
+    assert schedule.effect_at_event.brightness_delta > 0.3
+
+    teen = engine.schedule_for_event(goal, age_years=12, sensitivity_flag=True)
+    assert all(products[c].is_allowed_for_age(12) and products[c].intensity_level == 1 for c in teen.codes())
+    assert teen.score < schedule.score
+
+    with pytest.raises(ValueError):
+        engine.schedule_for_event(CosmeticGoal(CosmeticGoalType.DAILY_MAINTENANCE), age_years=30)
+
+
+def test_schedules_are_fast_and_shared_across_users():
+    engine = _engine()
+    goal = CosmeticGoal(CosmeticGoalType.EVENT_MAXIMIZE, target_event_hours=168)
+    _solve.cache_clear()
+    start = time.perf_counter()
+    first = engine.schedule_for_event(goal, age_years=35)
+    assert time.perf_counter() - start < 0.05
+
+    second = engine.schedule_for_event(goal, age_years=52)  # same eligible products
+    assert second.to_dict() == first.to_dict()
+    assert cache_info()["hits"] == 1
+
+    # Nearby event times share the slot grid, and so the solve.
+    engine.schedule_for_event(CosmeticGoal(CosmeticGoalType.EVENT_MAXIMIZE, target_event_hours=30), age_years=35)
+    engine.schedule_for_event(CosmeticGoal(CosmeticGoalType.EVENT_MAXIMIZE, target_event_hours=31), age_years=35)
+    assert cache_info()["hits"] == 2
+
+
+def test_long_schedules_stay_fast():
+    engine = _engine()
+    eligible = [p for p in engine.list_products() if p.is_allowed_for_age(30)]
+    # A 20-product catalog: the eligible products plus scaled-down copies.
+    products = eligible + [
+        replace(
+            p,
+            code=f"{p.code}x{i}",
+            effect=replace(
+                p.effect,
+                brightness_delta=p.effect.brightness_delta * (0.9 - 0.1 * i),
+                gloss_delta=p.effect.gloss_delta * (0.9 - 0.05 * i),
+                opalescence_delta=p.effect.opalescence_delta * (0.8 + 0.05 * i),
+            ),
+        )
+        for i in range(3)
+        for p in eligible
+    ][: 20 - len(eligible)]
+    assert len(products) == 20
+
+    _solve.cache_clear()
+    start = time.perf_counter()
+    schedule = build_schedule(products, event_hours=168, limits=ScheduleLimits.for_user(8))
+    assert time.perf_counter() - start < 0.05
+    assert len(schedule.applications) == MAX_SCHEDULE_STEPS
+
+
+def test_plan_includes_event_schedule():
+    engine = _engine()
+    planner = CosmeticPlannerAgent(engine)
+    user = CosmeticUserProfile.from_age(age_years=28)
+    plan = planner.plan_for_request(user, "Big event tomorrow, want max shine")
+    assert plan["interpreted_goal"]["target_event_hours"] == 24
+    schedule = plan["event_schedule"]
+    assert schedule["event_hours"] == 24 and schedule["applications"]
+    assert all(0 <= a["hours_from_now"] <= 24 for a in schedule["applications"])
+
+    daily = planner.plan_for_request(user, "daily routine")
+    assert daily["event_schedule"] is None
+
+
+def test_build_schedule_without_products():
+    schedule = build_schedule([], event_hours=10, limits=ScheduleLimits())
+    assert schedule.applications == [] and schedule.score == 0.0
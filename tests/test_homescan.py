@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from CosDenOS import CosDenOS, CosmeticPlannerAgent, CosmeticUserProfile
+from CosDenOS.homescan import estimate_baseline, main, region_stats, scan_folder
+
+
+def _scan(shade=(210, 185, 120)):
+    image = np.zeros((60, 80, 3), dtype=np.uint8)
+    labels = np.zeros((60, 80), dtype=np.uint8)
+    image[10:30, 10:30] = shade
+    labels[10:30, 10:30] = 11
+    image[10:30, 40:60] = (240, 240, 240)
+    labels[10:30, 40:60] = 21
+    return image, labels
+
+
+def test_region_stats_and_baseline():
+    image, labels = _scan()
+    stats = region_stats(image, labels)
+    assert sorted(stats) == [11, 21]
+    assert stats[11].pixels == 400
+    assert stats[11].mean_rgb == pytest.approx((210 / 255, 185 / 255, 120 / 255))
+    assert stats[11].lightness_std == pytest.approx(0.0, abs=1e-6)
+    assert stats[21].warmth == pytest.approx(0.0)
+
+    baseline = estimate_baseline([_scan(), (image, labels == 11)])
+    assert baseline.scans == 2 and baseline.pixels == 1200
+    assert baseline.tooth_lightness[21] == pytest.approx(240 / 255, rel=1e-5)
+    assert baseline.lightness_std > 0
+    assert baseline.tone == "warm"
+
+
+def test_baseline_feeds_plan_and_simulation():
+    engine = CosDenOS()
+    engine.load_default_catalog()
+    baseline = estimate_baseline([_scan()])
+    user = CosmeticUserProfile.from_age(age_years=30, baseline=baseline)
+
+    plan = CosmeticPlannerAgent(engine=engine).plan_for_request(user, "everyday brighter smile")
+    assert plan["interpreted_goal"]["tone_preference"] == "cool"  # counters the warm cast
+    assert plan["user"]["baseline"]["tone"] == "warm"
+    sim = plan["simulation"]
+    assert sim["baseline_lightness"] == pytest.approx(baseline.lightness)
+    assert sim["projected_lightness"] >= baseline.lightness
+
+
+def test_scan_folder_reports_baselines_and_bad_files(tmp_path, capsys):
+    for i in range(3):
+        image, labels = _scan(shade=(150 + 20 * i,) * 3)
+        np.savez(tmp_path / f"user{i}.npz", image=image, labels=labels)
+    np.savez(tmp_path / "broken.npz", image=np.zeros((4, 4, 3), np.uint8))
+
+    baselines, errors = scan_folder(tmp_path, workers=2)
+    assert sorted(baselines) == ["user0", "user1", "user2"]
+    assert baselines["user2"].lightness > baselines["user0"].lightness
+    assert list(errors) == ["broken"]
+
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), "1"])
+    assert capsys.readouterr().out.count('"baseline"') == 3
+
+
+def test_scan_folder_reports_corrupt_files(tmp_path):
+    image, labels = _scan(shade=(180,) * 3)
+    np.savez(tmp_path / "good.npz", image=image, labels=labels)
+    (tmp_path / "truncated.npz").write_bytes((tmp_path / "good.npz").read_bytes()[:60])
+    (tmp_path / "garbage.npz").write_bytes(b"\x93NUMPY" + b"\x00" * 54)
+
+    for workers in (1, 2):
+        baselines, errors = scan_folder(tmp_path, workers=workers)
+        assert list(baselines) == ["good"]
+        assert sorted(errors) == ["garbage", "truncated"]
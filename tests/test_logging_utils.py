@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from CosDenOS import logging_utils
+from CosDenOS.logging_utils import BackgroundLogWriter
+
+
+def test_background_writer_batches_and_flushes_on_stop():
+    stream = io.StringIO()
+    logging_utils.start_background_logging(stream=stream)
+    try:
+        for i in range(100):
+            logging_utils.log_event("unit_test", extra={"i": i})
+    finally:
+        stats = logging_utils.log_stats()
+        logging_utils.stop_background_logging()
+
+    assert stats["enqueued_total"] == 100
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["i"] for line in lines] == list(range(100))
+
+
+def test_background_writer_drops_when_full():
+    writer = BackgroundLogWriter(stream=io.StringIO(), max_queue=2, full_policy="drop")
+    # Not started: nothing drains the queue.
+    assert writer.submit("a\n") is True
+    assert writer.submit("b\n") is True
+    assert writer.submit("c\n") is False
+    assert writer.stats()["dropped_total"] == 1
+    assert writer.stats()["queued"] == 2
+
+
+def test_level_gating_and_sampling_short_circuit(capsys, monkeypatch):
+    monkeypatch.setenv("COSDEN_LOG_SAMPLE", "health_check=0")
+    logging_utils.configure_logging(level="WARN")
+    try:
+        logging_utils.log_event("plan_request")
+        logging_utils.log_event("health_check", level="ERROR")
+        logging_utils.log_event("plan_request_error", level="warn")
+    finally:
+        monkeypatch.delenv("COSDEN_LOG_SAMPLE")
+        logging_utils.configure_logging()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["event"] for line in lines] == ["plan_request_error"]
+    assert lines[0]["level"] == "WARN"
+    assert lines[0]["ts"].endswith("Z") and len(lines[0]["ts"]) == 24
+
+
+def test_bad_log_config_falls_back_to_defaults(tmp_path, monkeypatch):
+    monkeypatch.setenv("COSDEN_LOG_SAMPLE", "simulate_request=abc,health_check=0.5")
+    monkeypatch.setenv("COSDEN_LOG_CONFIG", str(tmp_path / "missing.json"))
+    with pytest.warns(RuntimeWarning):
+        config = logging_utils.load_log_config()
+    assert config.sample_rates == {"health_check": 0.5}
+    assert config.min_level == logging_utils.LogConfig().min_level
+
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json")
+    monkeypatch.setenv("COSDEN_LOG_CONFIG", str(bad))
+    monkeypatch.setenv("COSDEN_LOG_LEVEL", "LOUD")
+    with pytest.warns(RuntimeWarning):
+        assert logging_utils.load_log_config().min_level == logging_utils.LogConfig().min_level
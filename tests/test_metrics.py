@@ -0,0 +1,76 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+from CosDenOS.api import create_app
+from CosDenOS.metrics import LoadSampler, MetricsRegistry, label_set
+
+
+def test_per_thread_shards_merge_on_scrape():
+    registry = MetricsRegistry()
+    registry.counter("hits_total", "Hits.")
+    registry.histogram("work_seconds", "Work.", buckets=(0.1, 1.0))
+
+    def worker():
+        for _ in range(1000):
+            registry.inc("hits_total", label_set(kind="a"))
+            registry.observe("work_seconds", (), 0.5)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert registry.counter_value("hits_total", label_set(kind="a")) == 4000
+    text = registry.render()
+    assert 'hits_total{kind="a"} 4000' in text
+    assert 'work_seconds_bucket{le="0.1"} 0' in text
+    assert 'work_seconds_bucket{le="1"} 4000' in text
+    assert "work_seconds_count 4000" in text
+
+    # Shards of exited threads are folded away, keeping their totals.
+    assert registry._shards == []
+    registry.inc("hits_total", label_set(kind="a"))
+    assert registry.counter_value("hits_total", label_set(kind="a")) == 4001
+    assert len(registry._shards) == 1
+
+
+def test_metrics_endpoint_reports_requests_errors_and_stages():
+    with TestClient(create_app()) as client:
+        client.post(
+            "/plan",
+            json={"user": {"age_years": 30}, "request_text": "daily routine"},
+        )
+        client.post("/simulate", json={"user": {"age_years": 30}, "codes": ["Z9"]})
+        resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    text = resp.text
+    assert 'cosden_requests_total{endpoint="/plan",method="POST",status="200"}' in text
+    assert 'cosden_request_errors_total{endpoint="/simulate",error="UnknownProductError"}' in text
+    for stage in ("interpret", "recommend", "simulate", "serialize"):
+        assert f'cosden_stage_latency_seconds_count{{stage="{stage}"}}' in text
+    assert 'cosden_cache_entries{cache="catalog_payloads"}' in text
+    assert "cosden_threadpool_queue_depth 0" in text
+
+
+def test_load_sampler_reports_window_figures():
+    registry = MetricsRegistry()
+    registry.histogram("cosden_request_latency_seconds", "latency")
+    registry.counter("cosden_cache_requests_total", "cache")
+    sampler = LoadSampler(registry)
+
+    for _ in range(99):
+        registry.observe("cosden_request_latency_seconds", (), 0.003)
+    registry.observe("cosden_request_latency_seconds", (), 2.0)
+    registry.inc("cosden_cache_requests_total", label_set(cache="c", result="hit"), 3)
+    registry.inc("cosden_cache_requests_total", label_set(cache="c", result="miss"))
+
+    load = sampler.sample()
+    assert load["qps"] > 0
+    assert 2.5 <= load["latency_p50_ms"] <= 5.0
+    assert load["latency_p99_ms"] <= 5.0
+    assert load["cache_hit_ratio"] == 0.75
+
+    assert sampler.sample()["qps"] == 0.0
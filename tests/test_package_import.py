@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+# Generous wall-clock budget for importing the engine in a fresh interpreter;
+# the point is to catch the web stack creeping back into the import path.
+IMPORT_BUDGET_SECONDS = 1.0
+
+
+def _run(code: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_engine_import_skips_web_stack_and_fits_budget():
+    result = _run(
+        "import json, sys, time\n"
+        "t0 = time.perf_counter()\n"
+        "from CosDenOS import CosDenOS\n"
+        "elapsed = time.perf_counter() - t0\n"
+        "print(json.dumps({'elapsed': elapsed, 'loaded': sorted(\n"
+        "    m for m in ('fastapi', 'pydantic', 'starlette', 'CosDenOS.api')\n"
+        "    if m in sys.modules)}))\n"
+    )
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_BUDGET_SECONDS
+
+
+def test_api_import_defers_engine_setup_to_lifespan():
+    result = _run(
+        "import json\n"
+        "from fastapi.testclient import TestClient\n"
+        "from CosDenOS import app\n"
+        "before = getattr(app.state, 'services', None) is not None\n"
+        "with TestClient(app):\n"
+        "    after = app.state.services.engine.catalog_version > 0\n"
+        "print(json.dumps({'before': before, 'after': after}))\n"
+    )
+    assert result == {"before": False, "after": True}
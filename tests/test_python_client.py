@@ -0,0 +1,179 @@
+import threading
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from CosDenOS.clients import CosDenClient, CosDenClientConfig, CosDenHTTPError
+
+
+class FakeSession:
+    """Scripted stand-in for requests.Session."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, json=None, headers=None, timeout=None):
+        self.calls.append((method, url, json, timeout))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def close(self):
+        pass
+
+
+def _config(**overrides):
+    return CosDenClientConfig(
+        base_url="http://cosden.test/",
+        backoff_base_seconds=0.0,
+        **overrides,
+    )
+
+
+def test_retries_transient_statuses_then_succeeds(json_response):
+    session = FakeSession([
+        json_response(503, {"detail": "busy"}),
+        requests.exceptions.ConnectionError("reset"),
+        json_response(200, {"status": "ok"}),
+    ])
+    client = CosDenClient(_config(), session=session)
+
+    assert client.health(timeout=1.5) == {"status": "ok"}
+    assert len(session.calls) == 3
+    assert session.calls[0][:2] == ("GET", "http://cosden.test/health")
+    assert session.calls[0][3] == (1.5, 1.5)
+
+
+def test_gives_up_after_max_retries_and_does_not_retry_client_errors(json_response):
+    session = FakeSession([json_response(503, {"detail": "busy"})] * 3)
+    client = CosDenClient(_config(max_retries=2), session=session)
+    with pytest.raises(CosDenHTTPError, match="503"):
+        client.simulate(age_years=30, codes=["A1"])
+    assert len(session.calls) == 3
+
+    session = FakeSession([json_response(400, {"detail": "Unknown product code: Z9"})])
+    client = CosDenClient(_config(), session=session)
+    with pytest.raises(CosDenHTTPError, match="Z9"):
+        client.simulate(age_years=30, codes=["Z9"])
+    assert len(session.calls) == 1
+
+
+def test_default_session_is_pooled():
+    client = CosDenClient(CosDenClientConfig(base_url="http://x", pool_maxsize=7))
+    adapter = client._session.get_adapter("http://x")
+    assert adapter._pool_maxsize == 7
+    client.close()
+
+
+class RecordingSession:
+    """Routes client calls into the in-process app and records the paths."""
+
+    def __init__(self):
+        from fastapi.testclient import TestClient
+
+        from CosDenOS.api import create_app
+
+        self._app = TestClient(create_app())
+        self._lock = threading.Lock()
+        self.paths = []
+
+    def request(self, method, url, json=None, headers=None, timeout=None):
+        path = url.replace("http://cosden.test", "")
+        with self._lock:
+            self.paths.append(path)
+            return self._app.request(method, path, json=json, headers=headers)
+
+    def close(self):
+        pass
+
+
+def _simulate_concurrently(client, codes_list):
+    results = [None] * len(codes_list)
+
+    def call(i, codes):
+        try:
+            results[i] = client.simulate(age_years=30, codes=codes)
+        except CosDenHTTPError as exc:
+            results[i] = exc
+
+    threads = [
+        threading.Thread(target=call, args=(i, codes)) for i, codes in enumerate(codes_list)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_calls_are_batched_and_split_back():
+    session = RecordingSession()
+    client = CosDenClient(
+        _config(batch_max_size=4, batch_flush_interval_seconds=5.0), session=session
+    )
+    results = _simulate_concurrently(client, [["A1"], ["C1"], ["Z9"], ["A1", "C1"]])
+    client.close()
+
+    assert session.paths == ["/simulate/batch"]
+    assert results[0]["simulation"]["stack_codes"] == ["A1"]
+    assert results[3]["simulation"]["stack_codes"] == ["A1", "C1"]
+    assert isinstance(results[2], CosDenHTTPError) and results[2].status_code == 400
+
+
+def test_batching_falls_back_when_server_has_no_batch_endpoint(json_response):
+    class NoBatchSession(RecordingSession):
+        def request(self, method, url, json=None, headers=None, timeout=None):
+            if url.endswith("/batch"):
+                with self._lock:
+                    self.paths.append("/simulate/batch")
+                return json_response(404, {"detail": "Not Found"})
+            return super().request(method, url, json=json, headers=headers, timeout=timeout)
+
+    session = NoBatchSession()
+    client = CosDenClient(
+        _config(batch_max_size=2, batch_flush_interval_seconds=5.0), session=session
+    )
+    results = _simulate_concurrently(client, [["A1"], ["C1"]])
+    assert [r["simulation"]["stack_codes"] for r in results] == [["A1"], ["C1"]]
+    assert session.paths.count("/simulate") == 2
+
+    client.simulate(age_years=30, codes=["A1"])
+    assert session.paths.count("/simulate/batch") == 1
+    client.close()
+
+
+def test_malformed_batch_replies_fail_every_caller(json_response):
+    for reply in ({"results": [{"status": 200, "body": {}}]}, {"detail": "odd"}):
+        session = FakeSession([json_response(200, reply)])
+        client = CosDenClient(
+            _config(batch_max_size=2, batch_flush_interval_seconds=5.0), session=session
+        )
+        results = _simulate_concurrently(client, [["A1"], ["C1"]])
+        client.close()
+
+        assert len(session.calls) == 1
+        assert all(isinstance(r, CosDenHTTPError) for r in results)
+        assert "batch of 2" in str(results[0])
+
+
+def test_simulate_cache_serves_hits_revalidates_and_drops_on_catalog_change():
+    session = RecordingSession()
+    client = CosDenClient(
+        _config(simulate_cache_size=8, simulate_cache_ttl_seconds=60.0), session=session
+    )
+    first = client.simulate(age_years=30, codes=["A1", "C1"])
+    assert client.simulate(age_years=30, codes=["A1", "C1"]) == first
+    assert session.paths == ["/simulate"]
+
+    # Expired entry: revalidated with If-None-Match, answered by a 304.
+    client._simulate_cache.ttl_seconds = 0.0
+    assert client.simulate(age_years=30, codes=["A1", "C1"]) == first
+    assert len(session.paths) == 2
+
+    # A different catalog version invalidates everything cached.
+    client._simulate_cache.observe_catalog_version("new-catalog")
+    assert len(client._simulate_cache) == 0
+    client.close()
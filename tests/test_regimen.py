@@ -0,0 +1,69 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from CosDenOS import CosDenOS
+from CosDenOS.errors import AgeGateError
+from CosDenOS.regimen import CEILING, DECAY, Regimen, RegimenStep, dose_array, simulate_doses
+
+
+def _engine():
+    engine = CosDenOS()
+    engine.load_default_catalog()
+    return engine
+
+
+def test_trajectory_builds_up_saturates_and_decays():
+    engine = _engine()
+    daily = Regimen([RegimenStep("A1", end_day=20), RegimenStep("F1", start_day=5, end_day=6)])
+    once = Regimen([RegimenStep("A1", end_day=1)])
+    traj = engine.simulate_regimen([daily, once, daily], days=30, age_years=[30, 30, 30])
+
+    assert traj.users == 3
+    assert traj.brightness[1, 0] == pytest.approx(0.3, rel=0.05)  # day 1 ≈ simulate_stack
+    assert traj.brightness[1, 1] == pytest.approx(traj.brightness[1, 0] * DECAY[0], rel=0.02)
+    gains = np.diff(traj.brightness[0, :20])
+    assert np.all(gains > 0) and np.all(np.diff(gains) < 0)  # diminishing returns
+    assert traj.brightness[0].max() < CEILING[0]
+    assert traj.brightness[0, 29] < traj.brightness[0, 19]  # fades after the last day
+    np.testing.assert_array_equal(traj.brightness[0], traj.brightness[2])
+    assert [row["tone_shift"] for row in traj.user(0)][4:7] == [None, "cool", "cool"]
+
+    lightness = traj.lightness(np.array([0.5, 0.5, 0.7]))
+    assert lightness.shape == (3, 30) and np.all(lightness >= 0.5)
+
+    with pytest.raises(AgeGateError):
+        engine.simulate_regimen([daily], days=5, age_years=[12])
+
+
+def test_vectorized_scan_matches_day_by_day_recurrence():
+    engine = _engine()
+    products = engine.list_products()
+    rng = np.random.default_rng(11)
+    doses = (rng.random((50, 70, len(products))) < 0.3).astype(np.float32)
+    traj = simulate_doses(doses, products)
+
+    effects = np.array(
+        [(p.effect.brightness_delta, p.effect.gloss_delta, p.effect.opalescence_delta) for p in products]
+    )
+    raw = np.zeros((50, 3))
+    for day in range(70):
+        raw = DECAY * raw + doses[:, day] @ effects
+        expected = CEILING * np.tanh(raw / CEILING)
+        np.testing.assert_allclose(traj.brightness[:, day], expected[:, 0], atol=1e-5)
+        np.testing.assert_allclose(traj.gloss[:, day], expected[:, 1], atol=1e-5)
+        np.testing.assert_allclose(traj.opalescence[:, day], expected[:, 2], atol=1e-5)
+
+    # Fast decays shorten the scan blocks instead of overflowing float32.
+    fast = np.array([0.001, 0.05, 0.5])
+    traj = simulate_doses(doses, products, decay=fast)
+    raw = np.zeros((50, 3))
+    for day in range(70):
+        raw = fast * raw + doses[:, day] @ effects
+        expected = CEILING * np.tanh(raw / CEILING)
+        np.testing.assert_allclose(traj.brightness[:, day], expected[:, 0], atol=1e-5)
+        np.testing.assert_allclose(traj.gloss[:, day], expected[:, 1], atol=1e-5)
+
+    assert dose_array([Regimen([RegimenStep("C1", every_days=3)])], ["C1"], 7)[0, :, 0].tolist() == [
+        1, 0, 0, 1, 0, 0, 1
+    ]
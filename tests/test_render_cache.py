@@ -0,0 +1,97 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from CosDenOS import CosDenOS
+from CosDenOS.render_cache import RenderCache, RenderKey
+from CosDenOS.twin_render import DigitalTwin, RenderBuffers
+from CosDenOS.twin_store import TwinStore
+
+
+def _twin(n=200, shade=0.5):
+    return DigitalTwin(color=np.full((n, 3), shade), gloss=np.zeros(n), translucency=np.zeros(n))
+
+
+def _engine(tmp_path, cache):
+    engine = CosDenOS()
+    engine.load_default_catalog()
+    store = TwinStore(tmp_path / "twins")
+    store.put("smile", _twin())
+    engine.attach_twin_store(store)
+    engine.attach_render_cache(cache)
+    return engine, store
+
+
+def test_previews_are_cached_and_invalidated(tmp_path):
+    cache = RenderCache()
+    engine, store = _engine(tmp_path, cache)
+
+    first = engine.render_preview(["A1", "C1"], "smile")
+    assert engine.render_preview(["A1", "C1"], "smile") is first
+    assert not first.color.flags.writeable
+    low = engine.render_preview(["A1", "C1"], "smile", resolution=50)
+    assert low.color.shape == (50, 3)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    store.put("smile", _twin(shade=0.2))  # twin changed
+    assert cache.stats()["entries"] == 0
+    assert engine.render_preview(["A1", "C1"], "smile").color[0, 0] < first.color[0, 0]
+
+    engine.set_catalog(engine.catalog_snapshot.products)  # catalog changed
+    assert cache.stats()["entries"] == 0
+
+
+def test_evicted_previews_spill_to_disk_and_come_back(tmp_path):
+    buffers = [RenderBuffers.allocate(100) for _ in range(3)]
+    for i, b in enumerate(buffers):
+        for array in (b.color, b.gloss, b.translucency, b.shade_map):
+            array.fill(i / 10)
+    cache = RenderCache(memory_budget_bytes=2 * buffers[0].nbytes, spill_dir=tmp_path / "spill")
+    keys = [RenderKey("t", 1, 1, (str(i),)) for i in range(3)]
+    for key, b in zip(keys, buffers):
+        cache.put(key, b)
+
+    assert cache.stats()["spilled_entries"] == 1
+    restored = cache.get(keys[0])
+    np.testing.assert_array_equal(restored.color, buffers[0].color)
+    assert cache.stats()["spill_hits"] == 1
+
+
+def test_progressive_preview_refines_through_lod_levels(tmp_path):
+    engine = CosDenOS()
+    engine.load_default_catalog()
+    store = TwinStore(tmp_path / "twins", lod_levels=[10, 50, 10_000])
+    store.put("smile", _twin(n=200))
+    engine.attach_twin_store(store)
+    engine.attach_render_cache(RenderCache())
+    assert store.lods("smile") == [10, 50]
+
+    updates = []
+    progressive = engine.render_progressive(
+        ["A1"], "smile", on_update=lambda res, buf: updates.append((res, buf.color.shape[0]))
+    )
+    assert progressive.resolution == 10
+    assert progressive.preview.color.shape == (10, 3)
+    full = progressive.refined.result(timeout=5)
+    assert full.color.shape == (200, 3)
+    assert updates == [(50, 50), (None, 200)]
+    assert engine.render_preview(["A1"], "smile") is full
+
+
+def test_spill_write_errors_drop_the_entry_instead_of_raising(tmp_path, monkeypatch):
+    buffers = [RenderBuffers.allocate(100) for _ in range(2)]
+    spill_dir = tmp_path / "spill"
+    cache = RenderCache(memory_budget_bytes=buffers[0].nbytes, spill_dir=spill_dir)
+
+    def disk_full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(np, "savez", disk_full)
+    cache.put(RenderKey("t", 1, 1, ("0",)), buffers[0])
+    assert cache.put(RenderKey("t", 1, 1, ("1",)), buffers[1]) is buffers[1]
+
+    stats = cache.stats()
+    assert stats["spill_errors"] == 1
+    assert stats["entries"] == 1 and stats["spilled_entries"] == 0
+    assert list(spill_dir.iterdir()) == []
+    assert cache.get(RenderKey("t", 1, 1, ("0",))) is None
@@ -0,0 +1,49 @@
+from CosDenOS import CosDenOS
+from CosDenOS.catalog import build_default_catalog
+from CosDenOS.shared_catalog import SharedCatalogView, publish_catalog
+
+
+def test_published_snapshot_round_trips_products(tmp_path):
+    catalog = build_default_catalog()
+    version = publish_catalog(tmp_path, catalog)
+    assert version == 1
+
+    view = SharedCatalogView(tmp_path / "catalog-v1.snap")
+    assert view.version == 1
+    assert len(view) == len(catalog)
+    assert list(view) == list(catalog)
+    for code, product in catalog.items():
+        assert view[code] == product
+    assert "NOPE" not in view
+
+
+def test_engine_attaches_and_follows_new_versions(tmp_path):
+    catalog = build_default_catalog()
+    publish_catalog(tmp_path, catalog)
+
+    engine = CosDenOS()
+    assert engine.attach_shared_catalog(tmp_path) == 1
+    assert engine.get_product("A1") == catalog["A1"]
+    assert engine.refresh_shared_catalog() is False
+
+    smaller = {code: p for code, p in catalog.items() if code != "A1"}
+    assert publish_catalog(tmp_path, smaller) == 2
+    assert engine.refresh_shared_catalog() is True
+    assert {p.code for p in engine.list_products()} == set(smaller)
+
+
+def test_view_decodes_once_for_listing_and_caches_lookups(tmp_path):
+    catalog = build_default_catalog()
+    publish_catalog(tmp_path, catalog)
+    engine = CosDenOS()
+    engine.attach_shared_catalog(tmp_path)
+
+    listed = engine.list_products()
+    assert listed == list(catalog.values())
+    assert engine.list_products()[0] is listed[0]  # decoded once per version
+    assert engine.get_product(listed[0].code) is listed[0]
+
+    view = SharedCatalogView(tmp_path / "catalog-v1.snap", cache_size=2)
+    for code in catalog:
+        assert view[code] == catalog[code]
+    assert len(view._cache) == 2 and view._decoded is None
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from CosDenOS.stegcore_integration import StegCoreWorker
+
+
+class FakeRegistry:
+    """Local stand-in for stegcore.Registry."""
+
+    def __init__(self, gate=None, fail=False):
+        self.gate = gate
+        self.fail = fail
+        self.calls = []
+
+    def register(self, node, version, metadata):
+        self.calls.append(("register", node, metadata))
+
+    def heartbeat(self, node, version, metadata):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("registry down")
+        self.calls.append(("heartbeat", node, metadata))
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_worker_coalesces_heartbeats_and_attaches_load():
+    gate = threading.Event()
+    registry = FakeRegistry(gate=gate)
+    worker = StegCoreWorker(
+        "cosden-test",
+        "1.0",
+        "http://cosden.test",
+        registry_factory=lambda: registry,
+        load_fn=lambda: {"qps": 12.5, "latency_p99_ms": 3.0},
+    )
+    worker.start()
+    worker.register()
+    worker.heartbeat()  # picked up by the worker, then blocks on the gate
+    _wait_for(lambda: worker.stats()["queued"] == 0)
+
+    start = time.monotonic()
+    results = [worker.heartbeat() for _ in range(100)]
+    assert time.monotonic() - start < 0.5  # callers never wait on StegCore
+    assert results.count(True) == 1
+
+    gate.set()
+    worker.stop()
+
+    beats = [c for c in registry.calls if c[0] == "heartbeat"]
+    assert len(beats) == 2
+    assert beats[0][2] == {
+        "endpoint": "http://cosden.test",
+        "version": "1.0",
+        "load": {"qps": 12.5, "latency_p99_ms": 3.0},
+    }
+    assert registry.calls[0][0] == "register"
+    assert worker.stats()["coalesced"] == 99
+
+
+def test_registry_failures_are_isolated():
+    worker = StegCoreWorker(
+        "cosden-test", None, None, registry_factory=lambda: FakeRegistry(fail=True)
+    )
+    worker.start()
+    worker.heartbeat()
+    worker.stop()
+    assert worker.stats()["failed"] == 1
+
+
+def test_stop_and_publishes_are_bounded_when_registry_hangs():
+    gate = threading.Event()  # never set until the end: StegCore is hung
+    worker = StegCoreWorker(
+        "cosden-test",
+        None,
+        None,
+        registry_factory=lambda: FakeRegistry(gate=gate),
+        max_queue=2,
+        call_timeout_seconds=0.05,
+    )
+    worker.start()
+    worker.heartbeat()
+    _wait_for(lambda: worker.stats()["queued"] == 0)
+    worker.register()
+    worker.register()  # queue is now full behind the hung call
+
+    start = time.monotonic()
+    worker.stop(timeout=1.0)
+    assert time.monotonic() - start < 1.0
+    # The hung call timed out; queued publishes failed fast behind it.
+    _wait_for(lambda: worker.stats()["failed"] == 3)
+    gate.set()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from CosDenOS import CosDenOS
+from CosDenOS.telemetry import (
+    SESSION_END,
+    SESSION_START,
+    USAGE,
+    DeviceInfo,
+    TelemetryFormatError,
+    TelemetryHub,
+    TelemetryWriteError,
+    UnknownDeviceError,
+    encode_frame,
+)
+
+T0 = 1_759_999_980.0  # a window boundary for 60 s windows
+
+
+def _hub(tmp_path=None, **kwargs):
+    engine = CosDenOS()
+    engine.register_device("sp-1", DeviceInfo("sp-1", "SonicPolish"))
+    engine.register_device("tf-1", DeviceInfo("tf-1", "TrayFormer"))
+    kwargs.setdefault("clock", lambda: T0 + 1000)
+    return TelemetryHub(engine.get_device, directory=tmp_path, **kwargs)
+
+
+def test_binary_and_ndjson_uploads_aggregate_into_windows():
+    hub = _hub()
+    body = encode_frame([(T0 + 1, SESSION_START, 0), (T0 + 121, SESSION_END, 120), (T0 + 200, 9, 0)])
+    body += encode_frame([(T0 + 61, USAGE, 30)])
+    result = hub.ingest("sp-1", body, binary=True)
+    assert (result.accepted, result.rejected) == (3, 1)
+
+    ndjson = b"\n".join(
+        json.dumps(line).encode()
+        for line in ({"ts": T0 + 5, "kind": "session_start"}, {"ts": T0 + 50, "kind": "session_end", "value": 45})
+    ) + b"\n{not json\n"
+    result = hub.ingest("tf-1", ndjson, binary=False)
+    assert (result.accepted, result.rejected) == (2, 1)
+
+    summary = hub.summary("sp-1")
+    assert summary["sessions_completed"] == 1
+    assert summary["usage_minutes"] == pytest.approx(2.5)
+    assert [w["window_start"] for w in summary["open_windows"]] == [T0, T0 + 60, T0 + 120]
+
+    closed = hub.close_windows(now=T0 + 60 + 60 + 120)
+    assert [(w.device_id, w.window_start) for w in closed] == [("sp-1", T0), ("tf-1", T0), ("sp-1", T0 + 60)]
+    assert closed[1].sessions_started == 1 and closed[1].usage_seconds == 45
+
+    with pytest.raises(UnknownDeviceError):
+        hub.ingest("nope", body, binary=True)
+    with pytest.raises(TelemetryFormatError):
+        hub.ingest("sp-1", body[:-3], binary=True)
+    with pytest.raises(ValueError):
+        DeviceInfo("x", "Toaster")
+
+
+def test_full_ring_drops_oldest_events():
+    hub = _hub(ring_capacity=4)
+    result = hub.ingest_events("sp-1", [(T0 + i, USAGE, 1.0) for i in range(6)])
+    assert result.dropped == 2
+    assert hub.summary("sp-1")["usage_minutes"] == pytest.approx(4 / 60, abs=1e-3)
+
+
+def test_consumer_writes_closed_windows_on_shutdown(tmp_path):
+    hub = _hub(tmp_path)
+
+    async def scenario():
+        task = asyncio.create_task(hub.run(interval_seconds=0.01))
+        hub.ingest_events("sp-1", [(T0 + 1, SESSION_END, 90.0)])
+        await asyncio.sleep(0.05)  # window is old: written by the loop
+        hub.ingest_events("sp-1", [(T0 + 1, SESSION_END, 30.0)])  # late event
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    (path,) = tmp_path.glob("telemetry-*.ndjson")
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["usage_seconds"] for r in records] == [90.0, 30.0]
+    assert hub.stats()["windows_written"] == 2
+
+
+def test_out_of_range_timestamps_are_rejected():
+    hub = _hub()
+    body = b"\n".join(
+        json.dumps(line).encode()
+        for line in (
+            {"ts": T0 + 1, "kind": "usage", "value": 5},
+            {"ts": T0 + 10**9, "kind": "usage", "value": 5},
+            {"ts": T0 - 30 * 86400, "kind": "usage", "value": 5},
+            {"ts": T0 + 2, "kind": "usage", "value": -1},
+        )
+    ) + b'\n{"ts": NaN, "kind": "usage", "value": 5}'
+    result = hub.ingest("sp-1", body, binary=False)
+    assert (result.accepted, result.rejected) == (1, 4)
+
+    kinds = b"\n".join(
+        b'{"ts": %d, "kind": %s}' % (T0 + 3, kind)
+        for kind in (b"1e999", b"1.5", b"9", b"true", b"2.0", b"10000000000000000000000")
+    )
+    result = hub.ingest("sp-1", kinds, binary=False)
+    assert (result.accepted, result.rejected) == (1, 5)
+    assert len(hub.summary("sp-1")["open_windows"]) == 1
+
+
+def test_consumer_survives_failed_writes(tmp_path, monkeypatch):
+    hub = _hub(tmp_path)
+    calls = []
+    real_write = hub.write
+
+    def flaky_write(windows):
+        calls.append(len(windows))
+        if len(calls) == 1 and windows:
+            raise ValueError("boom")
+        real_write(windows)
+
+    monkeypatch.setattr(hub, "write", flaky_write)
+
+    async def scenario():
+        task = asyncio.create_task(hub.run(interval_seconds=0.01))
+        hub.ingest_events("sp-1", [(T0 + 1, SESSION_END, 90.0)])
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    (path,) = tmp_path.glob("telemetry-*.ndjson")
+    assert [json.loads(line)["usage_seconds"] for line in path.read_text().splitlines()] == [90.0]
+
+
+def test_failed_day_file_is_retried_without_rewriting_the_others(tmp_path, monkeypatch):
+    hub = _hub(tmp_path, clock=lambda: T0 + 2 * 86400)
+    hub.ingest_events("sp-1", [(T0 + 1, USAGE, 10.0), (T0 + 86400, USAGE, 20.0)])
+    day_b = time.strftime("%Y%m%d", time.gmtime(T0 + 86400))
+    real_open = open
+
+    def failing_open(path, *args, **kwargs):
+        if day_b in str(path):
+            raise OSError(28, "No space left on device")
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", failing_open)
+    with pytest.raises(TelemetryWriteError):
+        hub._collect_and_write()
+    monkeypatch.undo()
+    hub._collect_and_write()
+
+    records = [
+        json.loads(line)["usage_seconds"]
+        for path in sorted(tmp_path.glob("telemetry-*.ndjson"))
+        for line in path.read_text().splitlines()
+    ]
+    assert records == [10.0, 20.0]
+    assert hub.stats()["windows_written"] == 2
@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+from CosDenOS import tracing
+from CosDenOS.api import create_app
+
+
+def test_plan_request_emits_nested_spans_with_request_id():
+    spans = []
+    tracing.add_span_exporter(spans.append)
+    try:
+        client = TestClient(create_app())
+        resp = client.post(
+            "/plan",
+            json={"user": {"age_years": 30}, "request_text": "big event tonight"},
+            headers={"X-Request-ID": "req-123"},
+        )
+    finally:
+        tracing.remove_span_exporter(spans.append)
+
+    assert resp.status_code == 200
+    assert resp.headers["x-request-id"] == "req-123"
+
+    by_name = {s.name: s for s in spans}
+    for name in (
+        "planner.interpret_goal",
+        "engine.recommend_stack_for_goal",
+        "engine.simulate_stack",
+        "planner.build_plan_response",
+        "api.build_response",
+        "api.serialize",
+    ):
+        assert by_name[name].parent_id == by_name["http.request"].span_id
+        assert by_name[name].request_id == "req-123"
+
+    assert len({s.trace_id for s in spans}) == 1
+    assert by_name["http.request"].attributes["http.status_code"] == 200
+
+
+def test_span_is_noop_when_disabled():
+    assert tracing.span("anything") is tracing.span("other")
+    with tracing.span("anything") as s:
+        s.set_attribute("k", "v")
+    assert tracing.current_span() is None
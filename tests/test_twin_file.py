@@ -0,0 +1,69 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from CosDenOS import CosDenOS
+from CosDenOS.models import ProductEffect
+from CosDenOS.twin_file import open_twin, write_twin
+from CosDenOS.twin_render import DigitalTwin
+
+
+def _twin(n=500):
+    rng = np.random.default_rng(3)
+    return DigitalTwin(
+        color=rng.random((n, 3)),
+        gloss=rng.random(n),
+        translucency=rng.random(n),
+        twin_id="smile-42",
+        positions=rng.standard_normal((n, 3)),
+        tooth_ids=rng.integers(11, 48, n),
+    )
+
+
+def test_round_trip_maps_arrays_without_copying(tmp_path):
+    twin = _twin()
+    path = tmp_path / "smile.cdtwin"
+    write_twin(path, twin)
+
+    mapped = open_twin(path)
+    assert mapped.twin_id == "smile-42"
+    for name in ("color", "gloss", "translucency", "positions", "tooth_ids"):
+        array = getattr(mapped, name)
+        np.testing.assert_array_equal(array, getattr(twin, name))
+        assert not array.flags.owndata and not array.flags.writeable
+
+
+def test_engine_loads_and_renders_twin_file(tmp_path):
+    path = tmp_path / "smile.cdtwin"
+    write_twin(path, _twin(10))
+
+    engine = CosDenOS()
+    engine.load_twin(str(path))
+    out = engine.render_twin(ProductEffect(brightness_delta=0.1))
+    assert out.color.shape == (10, 3)
+
+
+def test_rejects_foreign_and_truncated_files(tmp_path, monkeypatch):
+    import mmap
+
+    import CosDenOS.twin_file as twin_file
+
+    mapped = []
+
+    class _RecordingMmap(mmap.mmap):
+        def __init__(self, *args, **kwargs):
+            mapped.append(self)
+
+    monkeypatch.setattr(twin_file.mmap, "mmap", _RecordingMmap)
+
+    bogus = tmp_path / "bogus.cdtwin"
+    bogus.write_bytes(b"x" * 400)
+    with pytest.raises(ValueError):
+        open_twin(bogus)
+
+    path = tmp_path / "smile.cdtwin"
+    write_twin(path, _twin(100))
+    path.write_bytes(path.read_bytes()[:-64])
+    with pytest.raises(ValueError):
+        open_twin(path)
+    assert len(mapped) == 2 and all(mm.closed for mm in mapped)
@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from CosDenOS import CosDenOS
+from CosDenOS.errors import CosDenError
+from CosDenOS.models import ProductEffect
+from CosDenOS.twin_render import DigitalTwin, TwinRenderer
+
+
+def _twin(n=1000):
+    rng = np.random.default_rng(7)
+    return DigitalTwin(
+        color=rng.uniform(0.3, 0.7, (n, 3)),
+        gloss=np.full(n, 0.5),
+        translucency=np.full(n, 0.2),
+    )
+
+
+def test_render_applies_effect_into_reused_buffers():
+    twin = _twin()
+    renderer = TwinRenderer(twin)
+    out = renderer.render(ProductEffect(brightness_delta=0.5, gloss_delta=0.7, opalescence_delta=-0.5))
+
+    np.testing.assert_allclose(out.color, twin.color + 0.5 * (1 - twin.color), rtol=1e-6)
+    assert np.all(out.gloss == 1.0)
+    assert np.all(out.translucency == 0.0)
+    np.testing.assert_allclose(out.shade_map, out.color @ [0.2126, 0.7152, 0.0722], rtol=1e-5)
+
+    again = renderer.render(ProductEffect())
+    assert again.color is out.color  # rendered in place, no new arrays
+    np.testing.assert_allclose(again.color, twin.color)
+
+
+def test_tone_shifts_move_channels():
+    renderer = TwinRenderer(_twin())
+    base = renderer.render(ProductEffect()).color.copy()
+    cool = renderer.render(ProductEffect(tone_shift="cool")).color.copy()
+    warm = renderer.render(ProductEffect(tone_shift="warm")).color
+    assert np.all(cool[:, 2] > base[:, 2]) and np.all(warm[:, 0] > base[:, 0])
+
+
+def test_engine_renders_loaded_twin_only():
+    engine = CosDenOS()
+    engine.load_default_catalog()
+    with pytest.raises(CosDenError):
+        engine.render_twin(ProductEffect())
+
+    engine.load_twin(_twin(10))
+    out = engine.render_twin(ProductEffect(brightness_delta=0.2))
+    assert out.color.shape == (10, 3)
+
+
+def test_twin_validates_shapes():
+    with pytest.raises(ValueError):
+        DigitalTwin(color=np.zeros((4, 2)), gloss=np.zeros(4), translucency=np.zeros(4))
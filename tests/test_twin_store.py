@@ -0,0 +1,104 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from fastapi.testclient import TestClient
+
+from CosDenOS import CosDenOS
+from CosDenOS.twin_render import DigitalTwin
+from CosDenOS.twin_store import TwinStore, UnknownTwinError, twin_nbytes
+from CosDenOS.user_profile import CosmeticUserProfile
+
+
+def _twin(n=100):
+    return DigitalTwin(color=np.full((n, 3), 0.5), gloss=np.zeros(n), translucency=np.zeros(n))
+
+
+def test_lru_eviction_respects_pins_and_reloads_lazily(tmp_path):
+    size = twin_nbytes(_twin())
+    store = TwinStore(tmp_path, memory_budget_bytes=2 * size)
+    for twin_id in ("a", "b", "c"):
+        store.put(twin_id, _twin())
+    assert "a" not in store and store.stats()["evictions"] == 1
+
+    with store.session("b"):
+        store.get("a")  # reload "a" from disk; "c" is the LRU unpinned twin
+        assert "b" in store and "c" not in store
+        store.get("c")  # "b" is pinned, so "a" goes
+        assert "b" in store and "a" not in store
+
+    assert store.stats()["pinned"] == 0
+    with pytest.raises(UnknownTwinError):
+        store.get("missing")
+    with pytest.raises(UnknownTwinError):
+        store.get("../etc/passwd")
+
+
+def test_engine_simulates_against_store_twins(tmp_path):
+    store = TwinStore(tmp_path)
+    store.put("smile-1", _twin(10))
+    engine = CosDenOS()
+    engine.load_default_catalog()
+    engine.attach_twin_store(store)
+
+    stack = engine.build_stack(["A1"])
+    profile = CosmeticUserProfile.from_age(age_years=30).age_profile
+    result = engine.simulate_stack(stack, profile, 30, twin_id="smile-1")
+    assert result.twin_id == "smile-1"
+    assert any("smile-1" in note for note in result.notes)
+    assert engine.render_twin(result.aggregated_effect, twin_id="smile-1").color.shape == (10, 3)
+
+    with pytest.raises(UnknownTwinError):
+        engine.simulate_stack(stack, profile, 30, twin_id="nope")
+
+    # Simulating only checks that the twin exists; it is not loaded.
+    engine.attach_twin_store(TwinStore(tmp_path))
+    engine.simulate_stack(stack, profile, 30, twin_id="smile-1")
+    assert "smile-1" not in engine.twin_store
+
+
+def test_simulate_endpoint_accepts_twin_id(tmp_path, monkeypatch):
+    import CosDenOS.api as api
+
+    TwinStore(tmp_path).put("smile-2", _twin(10))
+    monkeypatch.setattr(api, "COSDEN_TWIN_DIR", str(tmp_path))
+    client = TestClient(api.create_app())
+
+    ok = client.post(
+        "/simulate", json={"user": {"age_years": 30}, "codes": ["A1"], "twin_id": "smile-2"}
+    )
+    assert ok.status_code == 200
+    assert ok.json()["simulation"]["twin_id"] == "smile-2"
+
+    # The ETag follows the twin's version, so a replaced twin is not a 304.
+    body = {"user": {"age_years": 30}, "codes": ["A1"], "twin_id": "smile-2"}
+    etag = {"If-None-Match": ok.headers["ETag"]}
+    assert client.post("/simulate", json=body, headers=etag).status_code == 304
+    client.app.state.services.engine.twin_store.put("smile-2", _twin(12))
+    assert client.post("/simulate", json=body, headers=etag).status_code == 200
+
+    missing = client.post(
+        "/simulate", json={"user": {"age_years": 30}, "codes": ["A1"], "twin_id": "nope"}
+    )
+    assert missing.status_code == 400
+
+
+def test_loading_a_twin_does_not_block_other_twins():
+    import threading
+
+    started, release = threading.Event(), threading.Event()
+
+    def loader(twin_id):
+        started.set()
+        release.wait(5)
+        return _twin(50)
+
+    store = TwinStore(loader=loader, lod_levels=(8,))
+    store.put("ready", _twin(50), persist=False)
+    worker = threading.Thread(target=store.pin, args=("slow",))
+    worker.start()
+    assert started.wait(5)
+    assert store.get("ready").color.shape == (50, 3)  # not stuck behind the load
+    release.set()
+    worker.join(5)
+    assert store.stats()["pinned"] == 1 and store.lods("slow") == [8]